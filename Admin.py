@@ -1,35 +1,24 @@
 # ===================== ADMIN.PY (Master Data Laundry) =====================
 import streamlit as st
 import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from Snapshot import get_store
+from Storage import get_storage, show_storage_status
+from Reconcile import show_reconcile
+from Idempotency import run_once, new_submission, show_idempotency_stats
 
 # ============ KONFIGURASI ============
-SPREADSHEET_ID = "1v_3sXsGw9lNmGPSbIHytYzHzPTxa4yp4HhfS9tgXweA"
 SHEET_ADMIN = "Admin"
 
-# ============ AUTH GOOGLE ============
-def authenticate_google():
-    creds_dict = st.secrets["gcp_service_account"]
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    credentials = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    client = gspread.authorize(credentials)
-    return client
-
-def get_worksheet(sheet_name):
-    client = authenticate_google()
-    sh = client.open_by_key(SPREADSHEET_ID)
-    return sh.worksheet(sheet_name)
-
 # ============ UI ADMIN ============
 def show():
     st.title("⚙️ Master Data Laundry")
 
-    ws = get_worksheet(SHEET_ADMIN)
-    df = pd.DataFrame(ws.get_all_records())
+    # snapshot bersama (kunci sama dengan Order); simpan di bawah memanggil bump → dimuat ulang
+    try:
+        df = get_store().get(SHEET_ADMIN, lambda: get_storage().read(SHEET_ADMIN))
+    except Exception as e:
+        st.warning(f"Gagal membaca sheet: {e}")
+        df = pd.DataFrame()
 
     # Kalau sheet masih kosong, buat header default
     if df.empty:
@@ -56,13 +45,31 @@ def show():
         if not jenis_pakaian or not jenis_layanan or harga_per_kg <= 0:
             st.error("⚠️ Jenis pakaian, layanan, dan harga wajib diisi.")
         else:
-            new_row = [jenis_pakaian, jenis_layanan, harga_per_kg, parfum]
+            new_row = {
+                "Jenis Pakaian": jenis_pakaian,
+                "Jenis Layanan": jenis_layanan,
+                "Harga per Kg": harga_per_kg,
+                "Parfum": parfum,
+            }
 
-            # Tambah ke Google Sheet
-            ws.append_row(new_row, value_input_option="USER_ENTERED")
-            st.success(f"✅ Data '{jenis_layanan}' berhasil disimpan.")
+            def simpan_harga():
+                # Tambah ke Google Sheet (skema baku, harga dikirim RAW sebagai angka)
+                get_storage().append(SHEET_ADMIN, new_row)
+                get_store().bump(SHEET_ADMIN)
+                return True
 
-            st.experimental_rerun()
+            _, ganda = run_once("admin", new_row, simpan_harga)
+            if ganda:
+                st.info("ℹ️ Data ini sudah tersimpan — simpan ganda diabaikan.")
+                st.button("➕ Simpan Lagi sebagai Data Baru", on_click=new_submission, args=("admin",))
+            else:
+                st.success(f"✅ Data '{jenis_layanan}' berhasil disimpan.")
+                st.experimental_rerun()
+
+    st.markdown("---")
+    show_storage_status()
+    show_reconcile()
+    show_idempotency_stats()
 
     st.markdown("---")
     st.caption("ℹ️ Halaman ini hanya untuk input master data harga, layanan, pakaian & parfum.")
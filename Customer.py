@@ -0,0 +1,236 @@
+# ===================== CUSTOMER.PY (Indeks Pelanggan per No HP) =====================
+import bisect
+import re
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ============ NORMALISASI NO HP ============
+def normalize_hp(no_hp):
+    """
+    Samakan format nomor WhatsApp: buang +, spasi, strip; awalan 0 → 62.
+    Dipakai untuk link wa.me dan sebagai kunci indeks pelanggan.
+    """
+    hp = str(no_hp).replace("+", "").replace(" ", "").replace("-", "")
+    if hp.startswith("0"):
+        hp = "62" + hp[1:]
+    elif not hp.startswith("62"):
+        hp = "62" + hp
+    return hp
+
+def normalize_hp_series(s):
+    """normalize_hp untuk satu kolom sekaligus (operasi string vektor, tanpa loop per baris)."""
+    hp = s.astype(str).str.replace(r"[+ \-]", "", regex=True)
+    nol = hp.str.startswith("0")
+    return ("62" + hp.str[1:]).where(nol, hp.where(hp.str.startswith("62"), "62" + hp))
+
+def parse_rp(x):
+    """Nilai rupiah dari sheet ('25000', '25.000', 'Rp 25.000,00', 25000.0) → int."""
+    if isinstance(x, (int, float)):
+        return int(round(x))
+    s = str(x).strip()
+    if not s:
+        return 0
+    if re.fullmatch(r"-?\d+(\.\d{1,2})?", s):
+        return int(round(float(s)))
+    digits = "".join(c for c in s.split(",")[0] if c.isdigit())
+    return int(digits) if digits else 0
+
+def _is_hp_query(q):
+    return bool(q) and all(c.isdigit() or c in "+- " for c in q)
+
+# ============ INDEKS PELANGGAN ============
+class CustomerIndex:
+    """
+    Indeks pelanggan dari sheet Order, kunci = No HP ternormalisasi.
+    Dibangun bertahap: tiap sync hanya membaca baris yang belum pernah dilihat.
+    Pencarian prefix (No HP / nama) pakai bisect di list terurut.
+    """
+
+    def __init__(self):
+        self.customers = {}
+        self.rows_seen = 0
+        self.last_sync = 0.0
+        self._header = []
+        self._notas = set()
+        self._hp_keys = []
+        self._name_keys = []
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.customers)
+
+    def reset(self):
+        with self._lock:
+            self.customers = {}
+            self.rows_seen = 0
+            self.last_sync = 0.0
+            self._header = []
+            self._notas = set()
+            self._hp_keys = []
+            self._name_keys = []
+
+    # ---------- UPDATE ----------
+    def add_order(self, row: dict):
+        """Masukkan satu baris order (dict per header). Nota yang sama diabaikan."""
+        hp = normalize_hp(row.get("No HP", ""))
+        if not hp[2:].isdigit() or len(hp) < 8:
+            return
+        nota = str(row.get("No Nota", "")).strip()
+        nama = str(row.get("Nama Pelanggan", "")).strip()
+        with self._lock:
+            if nota:
+                if nota in self._notas:
+                    return
+                self._notas.add(nota)
+            c = self.customers.get(hp)
+            if c is None:
+                c = {
+                    "No HP": str(row.get("No HP", "")).strip(),
+                    "Nama Pelanggan": nama,
+                    "Jumlah Kunjungan": 0,
+                    "Total Belanja": 0,
+                    "Parfum Terakhir": "",
+                    "Layanan Terakhir": "",
+                }
+                self.customers[hp] = c
+                bisect.insort(self._hp_keys, hp)
+                bisect.insort(self._name_keys, (nama.lower(), hp))
+            elif nama and nama != c["Nama Pelanggan"]:
+                old = (c["Nama Pelanggan"].lower(), hp)
+                i = bisect.bisect_left(self._name_keys, old)
+                if i < len(self._name_keys) and self._name_keys[i] == old:
+                    del self._name_keys[i]
+                bisect.insort(self._name_keys, (nama.lower(), hp))
+                c["Nama Pelanggan"] = nama
+            c["No HP"] = str(row.get("No HP", "")).strip() or c["No HP"]
+            c["Jumlah Kunjungan"] += 1
+            c["Total Belanja"] += parse_rp(row.get("Total", 0))
+            c["Parfum Terakhir"] = str(row.get("Parfum", "")).strip() or c["Parfum Terakhir"]
+            c["Layanan Terakhir"] = str(row.get("Jenis Layanan", "")).strip() or c["Layanan Terakhir"]
+
+    def sync(self, storage, sheet_name):
+        """Baca baris baru saja (mulai setelah rows_seen) dari sheet Order di storage aktif."""
+        with self._sync_lock:
+            if not self._header:
+                self._header = storage.header(sheet_name)
+            if not self._header:
+                return 0
+            rows = storage.rows_after(sheet_name, self.rows_seen, self._header)
+            for values in rows:
+                self.add_order(dict(zip(self._header, values)))
+            self.rows_seen += len(rows)
+            self.last_sync = time.time()
+            return len(rows)
+
+    # ---------- LOOKUP ----------
+    def lookup(self, q, limit=8):
+        """Cari pelanggan berdasarkan prefix No HP (jika angka) atau prefix nama."""
+        q = str(q).strip()
+        if not q:
+            return []
+        hasil = []
+        with self._lock:
+            if _is_hp_query(q):
+                prefix = q.replace("+", "").replace(" ", "").replace("-", "")
+                if not "62".startswith(prefix):
+                    prefix = normalize_hp(prefix)
+                i = bisect.bisect_left(self._hp_keys, prefix)
+                while i < len(self._hp_keys) and len(hasil) < limit and self._hp_keys[i].startswith(prefix):
+                    hasil.append(dict(self.customers[self._hp_keys[i]]))
+                    i += 1
+            else:
+                prefix = q.lower()
+                i = bisect.bisect_left(self._name_keys, (prefix,))
+                while i < len(self._name_keys) and len(hasil) < limit and self._name_keys[i][0].startswith(prefix):
+                    hasil.append(dict(self.customers[self._name_keys[i][1]]))
+                    i += 1
+        return hasil
+
+# ============ INDEKS BERSAMA (per proses) ============
+@st.cache_resource(show_spinner=False)
+def get_customer_index():
+    return CustomerIndex()
+
+def sync_customer_index(storage, sheet_name, min_interval=60):
+    """Sync indeks dari storage (Storage.get_storage) paling sering sekali per min_interval detik."""
+    idx = get_customer_index()
+    if time.time() - idx.last_sync >= min_interval:
+        try:
+            idx.sync(storage, sheet_name)
+        except Exception as e:
+            print("Error sync indeks pelanggan:", e)
+            idx.last_sync = time.time()
+    return idx
+
+# ============ ANALITIK PELANGGAN (vektor) ============
+def customer_analytics(df, today):
+    """
+    Dari frame Order bertipe (Tanggal Parsed, No HP, Total, Berat (Kg)), tanpa loop per baris:
+      pelanggan : satu baris per No HP ternormalisasi — belanja, kg, order, kunjungan,
+                  jeda rata-rata antar kunjungan, hari sejak kunjungan terakhir
+      retensi   : kohort bulan order pertama × bulan ke-n → jumlah pelanggan yang kembali
+      kurva     : % rata-rata pelanggan kohort yang masih datang di bulan ke-n
+    Order Batal dan No HP tidak valid (sama seperti CustomerIndex) tidak dihitung.
+    """
+    kosong = pd.DataFrame(), pd.DataFrame(), pd.Series(dtype="float64")
+    if df.empty or "No HP" not in df.columns:
+        return kosong
+    hp = normalize_hp_series(df["No HP"])
+    ok = hp.str.fullmatch(r"62\d{6,}") & df["Tanggal Parsed"].notna()
+    if "Status" in df.columns:
+        ok &= df["Status"].astype(str).str.lower() != "batal"
+    tgl = df.loc[ok, "Tanggal Parsed"]
+    d = pd.DataFrame({
+        "hp": hp[ok].to_numpy(),
+        "nama": df.loc[ok, "Nama Pelanggan"].astype(str).to_numpy(),
+        "total": df.loc[ok, "Total"].to_numpy(),
+        "kg": df.loc[ok, "Berat (Kg)"].astype("float64").to_numpy(),
+        "tgl": tgl.to_numpy(),
+        "bulan": (tgl.dt.year * 12 + tgl.dt.month - 1).to_numpy(),  # indeks bulan (int) → selisih bulan = pengurangan
+    })
+    if d.empty:
+        return kosong
+
+    g = d.groupby("hp", sort=False).agg(
+        nama=("nama", "last"), belanja=("total", "sum"), kg=("kg", "sum"), order=("total", "size"),
+        kunjungan=("tgl", "nunique"), pertama=("tgl", "min"), terakhir=("tgl", "max"), kohort=("bulan", "min"),
+    )
+    rentang = (g["terakhir"] - g["pertama"]).dt.days
+    pelanggan = pd.DataFrame({
+        "No HP": g.index,
+        "Nama Pelanggan": g["nama"].to_numpy(),
+        "Total Belanja": g["belanja"].to_numpy(),
+        "Total Kg": g["kg"].round(2).to_numpy(),
+        "Jumlah Order": g["order"].to_numpy(),
+        "Kunjungan": g["kunjungan"].to_numpy(),
+        "Jeda Rata-rata (hari)": (rentang / (g["kunjungan"] - 1).where(g["kunjungan"] > 1)).round(1).to_numpy(),
+        "Kunjungan Pertama": g["pertama"].to_numpy(),
+        "Kunjungan Terakhir": g["terakhir"].to_numpy(),
+        "Hari Sejak Terakhir": (pd.Timestamp(today) - g["terakhir"]).dt.days.to_numpy(),
+    })
+
+    # kohort: satu baris per (pelanggan, bulan aktif) → pivot kohort × umur (bulan ke-n)
+    aktif = d[["hp", "bulan"]].drop_duplicates()
+    kohort = aktif["hp"].map(g["kohort"])
+    umur = aktif["bulan"] - kohort
+    retensi = pd.crosstab(kohort, umur).sort_index()
+    retensi = retensi.reindex(columns=range(int(umur.max()) + 1), fill_value=0)
+    ukuran = retensi[0]
+
+    # kurva rata-rata: bulan ke-n hanya atas kohort yang sudah berumur ≥ n bulan
+    # (kohort bertanggal masa depan tidak pernah layak); tanpa kohort layak → NaN
+    bulan_ini = today.year * 12 + today.month - 1
+    layak = np.arange(retensi.shape[1])[None, :] <= (bulan_ini - retensi.index.to_numpy())[:, None]
+    kembali = (retensi.to_numpy() * layak).sum(axis=0)
+    basis = (layak * ukuran.to_numpy()[:, None]).sum(axis=0).astype("float64")
+    basis[basis == 0] = np.nan
+    kurva = pd.Series(kembali / basis * 100, index=pd.Index(retensi.columns, name="Bulan ke-"))
+    retensi = retensi.astype("float64").where(layak)  # bulan yang belum terjadi → kosong, bukan 0
+    retensi.index = [f"{k // 12}-{k % 12 + 1:02d}" for k in retensi.index]
+    retensi.index.name = "Kohort"
+    retensi.columns.name = "Bulan ke-"
+    return pelanggan, retensi, kurva
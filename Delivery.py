@@ -0,0 +1,290 @@
+# ===================== DELIVERY.PY (Antar Jemput: Peta, Rute, KML) =====================
+import os
+import time
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+from Customer import normalize_hp
+from Pelanggan import load_status_index, SHEET_ORDER
+from Setting import load_config
+from Snapshot import get_store, show_data_age
+
+try:
+    import geopandas as gpd
+    import folium
+    from folium.plugins import FastMarkerCluster
+    from streamlit_folium import st_folium
+    import simplekml
+    GEO_ERROR = None
+except ImportError as e:  # paket peta belum terpasang
+    GEO_ERROR = str(e)
+
+GEOCODE_FILE = "geocode_cache.csv"
+GEOCODE_COLS = ["No HP", "Nama Pelanggan", "Alamat", "Lat", "Lon", "Sumber"]
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+GEOCODE_PER_KLIK = 20   # Nominatim: maks 1 request/detik
+
+# =============== TABEL GEOCODE LOKAL ===============
+def load_geocode():
+    """Lokasi pelanggan (kunci: No HP ternormalisasi) dari CSV lokal."""
+    if os.path.exists(GEOCODE_FILE):
+        df = pd.read_csv(GEOCODE_FILE, dtype={"No HP": str, "Nama Pelanggan": str, "Alamat": str, "Sumber": str})
+    else:
+        df = pd.DataFrame(columns=GEOCODE_COLS)
+    for c in GEOCODE_COLS:
+        if c not in df.columns:
+            df[c] = None
+    df["Lat"] = pd.to_numeric(df["Lat"], errors="coerce")
+    df["Lon"] = pd.to_numeric(df["Lon"], errors="coerce")
+    return df[GEOCODE_COLS]
+
+def save_geocode(df):
+    df = df.copy()
+    df["No HP"] = df["No HP"].map(normalize_hp)
+    df = df[df["No HP"] != ""].drop_duplicates("No HP", keep="last")
+    df[GEOCODE_COLS].to_csv(GEOCODE_FILE, index=False)
+
+def geocode_alamat(alamat):
+    """Alamat → (lat, lon) lewat Nominatim; None bila tidak ketemu."""
+    res = requests.get(
+        NOMINATIM_URL,
+        params={"q": alamat, "format": "json", "limit": 1, "countrycodes": "id"},
+        headers={"User-Agent": "TR-Laundry-Kasir/1.0"},
+        timeout=10,
+    )
+    res.raise_for_status()
+    hasil = res.json()
+    if not hasil:
+        return None
+    return float(hasil[0]["lat"]), float(hasil[0]["lon"])
+
+def geocode_missing(geo):
+    """Isi Lat/Lon untuk baris yang punya Alamat tapi belum ada koordinat."""
+    todo = geo.index[geo["Alamat"].fillna("").str.strip().ne("") & geo["Lat"].isna()][:GEOCODE_PER_KLIK]
+    ok = 0
+    for i in todo:
+        try:
+            hasil = geocode_alamat(geo.at[i, "Alamat"])
+        except Exception:
+            hasil = None
+        if hasil:
+            geo.at[i, "Lat"], geo.at[i, "Lon"] = hasil
+            geo.at[i, "Sumber"] = "nominatim"
+            ok += 1
+        time.sleep(1)
+    return ok, len(todo)
+
+# =============== ORDER SIAP DIAMBIL ===============
+def siap_diambil():
+    """Order berstatus Siap Diambil dari indeks status (tanpa baca sheet penuh)."""
+    df = load_status_index()
+    if df.empty or "Status Antrian" not in df.columns:
+        return pd.DataFrame(columns=["No Nota", "Nama Pelanggan", "No HP", "hp"])
+    df = df[df["Status Antrian"].astype(str).str.strip().str.lower() == "siap diambil"]
+    hp = df["No HP"] if "No HP" in df.columns else pd.Series("", index=df.index)
+    return pd.DataFrame({
+        "No Nota": df["No Nota"].astype(str),
+        "Nama Pelanggan": df["Nama Pelanggan"].astype(str),
+        "No HP": hp.astype(str),
+        "hp": hp.astype(str).map(normalize_hp),
+    })
+
+# =============== INDEKS SPASIAL & RUTE ===============
+def zone_labels(gm, radius_m):
+    """
+    Kelompok wilayah: titik yang saling berjarak <= radius (berantai) satu zona.
+    Pasangan tetangga dari sindex.query(dwithin), lalu komponen terhubung.
+    """
+    n = len(gm)
+    left, right = gm.sindex.query(gm.geometry, predicate="dwithin", distance=radius_m)
+    labels = np.arange(n)
+    while True:
+        prev = labels.copy()
+        np.minimum.at(labels, left, labels[right])
+        labels = labels[labels]
+        if np.array_equal(prev, labels):
+            return labels
+
+def nearest_stop(gm):
+    """Tetangga terdekat tiap titik (selain dirinya) via sindex.nearest → (posisi, jarak meter)."""
+    n = len(gm)
+    near = np.full(n, -1)
+    dist = np.full(n, np.nan)
+    if n > 1:
+        (src, dst), d = gm.sindex.nearest(gm.geometry, return_all=False, return_distance=True, exclusive=True)
+        near[src], dist[src] = dst, d
+    return near, dist
+
+def plan_routes(gm, base_xy, radius_m, max_stops):
+    """
+    Rute per zona: dari toko, ambil titik terdekat berikutnya (greedy) sampai
+    max_stops, lalu kembali ke toko dan mulai rute baru. Zona terdekat dulu.
+    """
+    xy = np.column_stack([gm.geometry.x.to_numpy(), gm.geometry.y.to_numpy()])
+    zones = zone_labels(gm, radius_m)
+    base = np.asarray(base_xy, dtype=float)
+    d_base = np.hypot(*(xy - base).T)
+    rute = np.zeros(len(gm), dtype=int)
+    urutan = np.zeros(len(gm), dtype=int)
+    zona_urut = sorted(np.unique(zones), key=lambda z: d_base[zones == z].min())
+    rid = 0
+    for z in zona_urut:
+        sisa = np.flatnonzero(zones == z)
+        while sisa.size:
+            rid += 1
+            pos = base
+            for k in range(1, max_stops + 1):
+                if not sisa.size:
+                    break
+                j = np.argmin(np.hypot(*(xy[sisa] - pos).T))
+                i = sisa[j]
+                rute[i], urutan[i] = rid, k
+                pos = xy[i]
+                sisa = np.delete(sisa, j)
+    return rute, urutan, d_base
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def plan_delivery(_titik, data_key, base, radius_km, max_stops):
+    """
+    Titik (Lat/Lon) → tabel rute. Hasil di-cache per versi data + parameter,
+    jadi rerun (geser peta, klik tombol lain) tidak menghitung ulang.
+    """
+    gdf = gpd.GeoDataFrame(_titik, geometry=gpd.points_from_xy(_titik["Lon"], _titik["Lat"]), crs="EPSG:4326")
+    metric = gdf.to_crs(gdf.estimate_utm_crs())
+    base_m = gpd.GeoSeries(gpd.points_from_xy([base[1]], [base[0]]), crs="EPSG:4326").to_crs(metric.crs).iloc[0]
+    rute, urutan, d_base = plan_routes(metric, (base_m.x, base_m.y), radius_km * 1000, max_stops)
+    near, d_near = nearest_stop(metric)
+    out = pd.DataFrame(_titik.drop(columns=["geometry"], errors="ignore")).reset_index(drop=True)
+    out["Rute"] = rute
+    out["Urutan"] = urutan
+    out["Jarak Toko (km)"] = np.round(d_base / 1000, 2)
+    out["Terdekat"] = np.where(near >= 0, out["Nama Pelanggan"].to_numpy()[near], "")
+    out["Jarak Terdekat (km)"] = np.round(d_near / 1000, 2)
+    return out.sort_values(["Rute", "Urutan"]).reset_index(drop=True)
+
+# =============== PETA & KML ===============
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_map(_plan, data_key, base):
+    """
+    Peta folium dibangun sekali per versi data: semua pin dalam satu
+    FastMarkerCluster (cluster dihitung di browser dari satu array data),
+    garis rute satu PolyLine per rute.
+    """
+    m = folium.Map(location=list(base), zoom_start=13, control_scale=True)
+    folium.Marker(list(base), tooltip="🧺 Toko", icon=folium.Icon(color="red", icon="home")).add_to(m)
+    label = (
+        _plan["Rute"].astype(str) + "." + _plan["Urutan"].astype(str) + " "
+        + _plan["Nama Pelanggan"].astype(str) + " (" + _plan["No Nota"].astype(str) + ")"
+    )
+    data = list(zip(_plan["Lat"].tolist(), _plan["Lon"].tolist(), label.tolist()))
+    callback = """
+    function (row) {
+        var marker = L.marker(new L.LatLng(row[0], row[1]));
+        marker.bindTooltip(row[2]);
+        return marker;
+    };
+    """
+    FastMarkerCluster(data, callback=callback, name="Siap Diambil").add_to(m)
+    for rid, grp in _plan.groupby("Rute", sort=True):
+        coords = [list(base)] + grp[["Lat", "Lon"]].to_numpy().tolist()
+        folium.PolyLine(coords, weight=2, opacity=0.6, tooltip=f"Rute {rid}").add_to(m)
+    if len(_plan):
+        m.fit_bounds([[_plan["Lat"].min(), _plan["Lon"].min()], [_plan["Lat"].max(), _plan["Lon"].max()]])
+    return m
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def build_kml(_plan, data_key, base, nama_toko):
+    """KML untuk kurir: satu folder per rute (garis + titik berurutan)."""
+    plan = _plan
+    kml = simplekml.Kml(name=f"Antar Jemput {nama_toko}")
+    kml.newpoint(name=nama_toko, coords=[(base[1], base[0])])
+    for rid, grp in plan.groupby("Rute", sort=True):
+        fol = kml.newfolder(name=f"Rute {rid}")
+        line = fol.newlinestring(name=f"Rute {rid}", coords=[(base[1], base[0])] + list(zip(grp["Lon"], grp["Lat"])))
+        line.style.linestyle.width = 3
+        for r in grp.to_dict("records"):
+            p = fol.newpoint(name=f"{r['Urutan']}. {r['Nama Pelanggan']}", coords=[(r["Lon"], r["Lat"])])
+            alamat = r["Alamat"] if isinstance(r["Alamat"], str) and r["Alamat"] else "-"
+            p.description = f"Nota: {r['No Nota']}\nHP: {r['No HP']}\nAlamat: {alamat}"
+    return kml.kml().encode("utf-8")
+
+# =============== HALAMAN ===============
+def show():
+    st.title("🛵 Antar Jemput")
+    if GEO_ERROR:
+        st.error(f"❌ Paket peta belum terpasang: {GEO_ERROR}")
+        return
+
+    cfg = load_config()
+    nama_toko = cfg.get("nama_toko", "TR Laundry")
+    base = (float(cfg.get("lat", 0.4657)), float(cfg.get("lon", 101.3723)))
+
+    orders = siap_diambil()
+    show_data_age(f"{SHEET_ORDER}:index")
+    geo = load_geocode()
+    geo_hp = geo.assign(hp=geo["No HP"].map(normalize_hp)).drop_duplicates("hp", keep="last")
+    titik = orders.merge(geo_hp[["hp", "Alamat", "Lat", "Lon"]], on="hp", how="left")
+    ada = titik.dropna(subset=["Lat", "Lon"]).reset_index(drop=True)
+    belum = titik[titik["Lat"].isna() | titik["Lon"].isna()]
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Siap Diambil", len(orders))
+    c2.metric("📍 Ada Lokasi", len(ada))
+    c3.metric("❓ Belum Ada Lokasi", len(belum))
+
+    c1, c2 = st.columns(2)
+    radius_km = c1.slider("Radius zona (km)", 0.5, 5.0, 1.5, 0.5, key="antar_radius")
+    max_stops = c2.slider("Maks. titik per rute", 3, 20, 8, key="antar_maks")
+
+    if len(ada):
+        mtime = os.path.getmtime(GEOCODE_FILE) if os.path.exists(GEOCODE_FILE) else 0
+        data_key = (get_store().info(f"{SHEET_ORDER}:index")[0], mtime, len(ada))
+        plan = plan_delivery(ada, data_key, base, radius_km, max_stops)
+
+        st_folium(
+            build_map(plan, (data_key, radius_km, max_stops), base),
+            height=480, use_container_width=True, returned_objects=[], key="peta_antar",
+        )
+
+        st.subheader(f"🗺️ {plan['Rute'].nunique()} Rute")
+        st.dataframe(
+            plan[["Rute", "Urutan", "No Nota", "Nama Pelanggan", "No HP", "Jarak Toko (km)", "Terdekat", "Jarak Terdekat (km)"]],
+            use_container_width=True, hide_index=True,
+        )
+        st.download_button(
+            "📥 Download KML untuk Kurir",
+            build_kml(plan, (data_key, radius_km, max_stops), base, nama_toko),
+            file_name="antar_jemput.kml",
+            mime="application/vnd.google-earth.kml+xml",
+        )
+    else:
+        st.info("Belum ada order Siap Diambil yang punya lokasi.")
+
+    # ---------- LOKASI PELANGGAN ----------
+    with st.expander(f"📍 Lokasi Pelanggan ({len(belum)} belum ada)", expanded=bool(len(belum)) and not len(ada)):
+        st.caption("Isi koordinat langsung, atau isi alamat lalu klik Cari Koordinat (OpenStreetMap).")
+        baru = belum.drop_duplicates("hp")[["No HP", "Nama Pelanggan", "Alamat"]].assign(Lat=np.nan, Lon=np.nan, Sumber="")
+        baru["No HP"] = belum.drop_duplicates("hp")["hp"]
+        tabel = pd.concat([baru[~baru["No HP"].isin(geo_hp["hp"])], geo], ignore_index=True)[GEOCODE_COLS]
+        edited = st.data_editor(
+            tabel, use_container_width=True, hide_index=True, num_rows="dynamic", key="geocode_editor",
+            column_config={
+                "Lat": st.column_config.NumberColumn(format="%.6f"),
+                "Lon": st.column_config.NumberColumn(format="%.6f"),
+                "Sumber": st.column_config.TextColumn(disabled=True),
+            },
+        )
+        c1, c2 = st.columns(2)
+        if c1.button("💾 Simpan Lokasi", use_container_width=True):
+            manual = edited["Lat"].notna() & edited["Sumber"].fillna("").eq("")
+            edited.loc[manual, "Sumber"] = "manual"
+            save_geocode(edited)
+            st.success("✅ Lokasi disimpan.")
+            st.rerun()
+        if c2.button("🔎 Cari Koordinat dari Alamat", use_container_width=True):
+            with st.spinner("Mencari koordinat..."):
+                ok, n = geocode_missing(edited)
+            save_geocode(edited)
+            st.success(f"✅ {ok} dari {n} alamat ditemukan.")
+            st.rerun()
@@ -11,40 +11,56 @@ import streamlit as st
 import pandas as pd
 import datetime
 import os
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import json
+import uuid
+from Schema import validate_row
+from Sheets import to_typed_frame
+from Snapshot import get_store, show_data_age
+from Idempotency import run_once, new_submission
+from Storage import get_storage
 
 # =============== KONFIGURASI ===============
-SPREADSHEET_ID = "1v_3sXsGw9lNmGPSbIHytYzHzPTxa4yp4HhfS9tgXweA"
 SHEET_PENGELUARAN = "Pengeluaran"
 CACHE_FILE = "pengeluaran_cache.csv"
-
-# =============== AUTH GOOGLE ===============
-def authenticate_google():
-    creds_dict = st.secrets["gcp_service_account"]
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    credentials = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    client = gspread.authorize(credentials)
-    return client
-
-def get_worksheet(sheet_name):
-    client = authenticate_google()
-    sh = client.open_by_key(SPREADSHEET_ID)
-    return sh.worksheet(sheet_name)
+ID_COL = "ID Lokal"   # id per baris cache (bagian kunci klaim upload), tidak ditulis ke sheet
 
 # =============== CACHE CSV ===============
 def load_local_data():
     if os.path.exists(CACHE_FILE):
-        return pd.read_csv(CACHE_FILE)
-    return pd.DataFrame(columns=["Tanggal", "Keterangan", "Nominal", "Jenis", "uploaded", "Jenis Transaksi"])
+        df = pd.read_csv(CACHE_FILE)
+        if ID_COL not in df.columns or df[ID_COL].isna().any():
+            # baris lama tanpa id: beri sekali lalu simpan → kunci klaim sama di setiap rerun / sesi
+            ids = df[ID_COL] if ID_COL in df.columns else pd.Series(None, index=df.index, dtype=object)
+            df[ID_COL] = [v if isinstance(v, str) and v else uuid.uuid4().hex for v in ids]
+            save_local_data(df)
+        return df
+    return pd.DataFrame(columns=["Tanggal", "Keterangan", "Nominal", "Jenis", "uploaded", "Jenis Transaksi", ID_COL])
 
 def save_local_data(df):
     df.to_csv(CACHE_FILE, index=False)
 
+def mark_uploaded(row_id):
+    """Tandai satu baris cache terupload (baca-ubah-simpan, tidak menimpa baris sesi lain)."""
+    df = load_local_data()
+    df.loc[df[ID_COL] == row_id, "uploaded"] = True
+    save_local_data(df)
+
+# =============== UPLOAD SEKALI ===============
+def payload_of_row(row):
+    """Isi baku baris (Schema.validate_row) + ID Lokal → kunci klaim; sama untuk simpan, cache & rekonsiliasi."""
+    data = {k: v for k, v in row.items() if k not in ("uploaded", ID_COL)}
+    return {**validate_row(SHEET_PENGELUARAN, data), ID_COL: row[ID_COL]}
+
+def upload_row(row):
+    """
+    Tulis satu baris pengeluaran ke storage sekali saja: klaim global (run_once) atas
+    payload_of_row sebelum tulis. Return (written, ganda); ganda=True → baris sudah /
+    sedang ditulis sesi lain (written = hasil pertama, None bila masih diproses).
+    Exception dari tulis diteruskan (klaim dilepas, boleh dicoba lagi).
+    """
+    data = {k: v for k, v in row.items() if k not in ("uploaded", ID_COL)}
+    return run_once("pengeluaran", payload_of_row(row), lambda: append_to_sheet(SHEET_PENGELUARAN, data), scope="global")
+
 # =============== UPLOAD ULANG CACHE ===============
 def sync_local_cache():
     df = load_local_data()
@@ -55,28 +71,32 @@ def sync_local_cache():
         st.info(f"🔁 Mengupload ulang {len(not_uploaded)} data pengeluaran lokal...")
         for _, row in not_uploaded.iterrows():
             try:
-                append_to_sheet(SHEET_PENGELUARAN, row.to_dict())
-                df.loc[df["Keterangan"] == row["Keterangan"], "uploaded"] = True
+                written, ganda = upload_row(row.to_dict())
             except Exception as e:
                 st.warning(f"Gagal upload pengeluaran '{row['Keterangan']}': {e}")
-        save_local_data(df)
+                continue
+            if written is None:
+                continue  # sesi lain sedang mengupload baris ini
+            mark_uploaded(row[ID_COL])  # segera per baris: rerun yang memotong loop tidak mengupload ulang
+            if not ganda:
+                apply_to_snapshot(written)
         st.success("✅ Sinkronisasi cache selesai!")
 
+def apply_to_snapshot(written):
+    """Baris yang sudah tertulis → snapshot bersama. Gagal di sini tidak membatalkan tulis."""
+    try:
+        get_store().apply_append(SHEET_PENGELUARAN, written, typer=lambda d: to_typed_frame(d, canonical=True))
+    except Exception as e:
+        print("Gagal update snapshot pengeluaran:", e)
+
 # =============== SPREADSHEET OPS ===============
 def append_to_sheet(sheet_name, data: dict):
-    ws = get_worksheet(sheet_name)
-    headers = ws.row_values(1)
-    # Pastikan header Jenis Transaksi selalu ada
-    if "Jenis Transaksi" not in headers:
-        ws.update_cell(1, len(headers)+1, "Jenis Transaksi")
-        headers.append("Jenis Transaksi")
-    row = [data.get(h, "") for h in headers]
-    ws.append_row(row, value_input_option="USER_ENTERED")
+    # Skema baku: header Jenis Transaksi ditambah otomatis, Nominal dikirim RAW sebagai angka
+    return get_storage().append(sheet_name, data)
 
 def read_sheet(sheet_name):
-    ws = get_worksheet(sheet_name)
-    df = pd.DataFrame(ws.get_all_records())
-    return df
+    """Baca dari snapshot bersama; storage hanya dibaca ulang bila snapshot basi."""
+    return get_store().get(sheet_name, lambda: get_storage().read(sheet_name))
 
 # =============== HALAMAN APP ===============
 def show():
@@ -107,17 +127,26 @@ def show():
                     "Jenis Transaksi": jenis_transaksi
                 }
 
-                df = load_local_data()
-                df = pd.concat([df, pd.DataFrame([data])], ignore_index=True)
-
-                try:
-                    append_to_sheet(SHEET_PENGELUARAN, data)
-                    df.loc[df["Keterangan"] == keterangan, "uploaded"] = True
+                def simpan_pengeluaran():
+                    # simpan ke cache dulu: gagal / crash sesudah tulis → sinkronisasi memakai klaim yang sama
+                    row = {**data, ID_COL: uuid.uuid4().hex}
+                    save_local_data(pd.concat([load_local_data(), pd.DataFrame([row])], ignore_index=True))
+                    try:
+                        written, _ = upload_row(row)
+                    except Exception as e:
+                        st.warning(f"⚠️ Gagal upload ke Sheet: {e}. Disimpan lokal.")
+                        return "lokal"
+                    mark_uploaded(row[ID_COL])
+                    apply_to_snapshot(written)
+                    return "sheet"
+
+                payload = {k: v for k, v in data.items() if k != "uploaded"}
+                tujuan, ganda = run_once("pengeluaran", payload, simpan_pengeluaran)
+                if ganda:
+                    st.info("ℹ️ Pengeluaran ini sudah tersimpan — simpan ganda diabaikan.")
+                    st.button("➕ Simpan Lagi sebagai Pengeluaran Baru", on_click=new_submission, args=("pengeluaran",))
+                elif tujuan == "sheet":
                     st.success("✅ Pengeluaran berhasil disimpan ke Google Sheet!")
-                except Exception as e:
-                    st.warning(f"⚠️ Gagal upload ke Sheet: {e}. Disimpan lokal.")
-
-                save_local_data(df)
 
     # ---------------- TAB RIWAYAT ----------------
     with tab2:
@@ -128,6 +157,7 @@ def show():
             df_pengeluaran = pd.DataFrame()
 
         if not df_pengeluaran.empty:
+            show_data_age(SHEET_PENGELUARAN)
             st.subheader("📅 Filter")
             col1, col2 = st.columns(2)
             with col1:
@@ -135,9 +165,8 @@ def show():
             with col2:
                 end_date = st.date_input("Sampai Tanggal", value=datetime.date.today())
 
-            # Convert date format
-            df_pengeluaran["Tanggal_dt"] = pd.to_datetime(df_pengeluaran["Tanggal"], format="%d/%m/%Y", errors="coerce")
-            mask = (df_pengeluaran["Tanggal_dt"] >= pd.to_datetime(start_date)) & (df_pengeluaran["Tanggal_dt"] <= pd.to_datetime(end_date))
+            # Tanggal Parsed sudah datetime64 (Schema.compact_frame)
+            mask = (df_pengeluaran["Tanggal Parsed"] >= pd.to_datetime(start_date)) & (df_pengeluaran["Tanggal Parsed"] <= pd.to_datetime(end_date))
             filtered = df_pengeluaran[mask]
 
             st.dataframe(filtered[["Tanggal", "Keterangan", "Nominal", "Jenis", "Jenis Transaksi"]])
@@ -0,0 +1,244 @@
+# ===================== FAKESHEETS.PY (Backend Google Sheets Palsu untuk Tes Beban) =====================
+import datetime
+import re
+import threading
+import time
+import gspread
+from oauth2client.service_account import ServiceAccountCredentials
+
+# Header awal tiap sheet (sama dengan sheet produksi sesudah migrasi format baku)
+DEFAULT_HEADERS = {
+    "Order": [
+        "No Nota", "Tanggal Masuk", "Estimasi Selesai", "Nama Pelanggan", "No HP", "Jenis Pakaian",
+        "Jenis Layanan", "Berat (Kg)", "Harga per Kg", "Subtotal", "Diskon", "Total", "Parfum",
+        "Jenis Transaksi", "Status", "Uploaded", "Status Antrian", "Tanggal Masuk ISO", "Estimasi Selesai ISO",
+    ],
+    "Pengeluaran": ["Tanggal", "Keterangan", "Nominal", "Jenis", "uploaded", "Jenis Transaksi", "Tanggal ISO"],
+    "Admin": ["Jenis Pakaian", "Jenis Layanan", "Harga per Kg", "Parfum"],
+}
+
+# ------------------- A1 NOTATION -------------------
+def col_index(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch.upper()) - 64)
+    return n
+
+def parse_a1(a1):
+    """"'Order'!A2:C" → (sheet|None, r1, c1, r2, c2); batas terbuka = None."""
+    sheet = None
+    if "!" in a1:
+        sheet, a1 = a1.rsplit("!", 1)
+        sheet = sheet.strip("'")
+    parts = a1.split(":")
+    if len(parts) == 1:
+        parts = parts * 2
+    out = []
+    for p in parts:
+        m = re.fullmatch(r"([A-Za-z]*)(\d*)", p)
+        out.append((col_index(m.group(1)) if m.group(1) else None, int(m.group(2)) if m.group(2) else None))
+    (c1, r1), (c2, r2) = out
+    return sheet, r1 or 1, c1 or 1, r2, c2
+
+def _formatted(v):
+    """Tampilan ala locale id_ID (koma desimal), seperti FORMATTED_VALUE."""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float):
+        return str(int(v)) if v.is_integer() else str(v).replace(".", ",")
+    return "" if v is None else str(v)
+
+def _trim(rows):
+    rows = [list(r) for r in rows]
+    for r in rows:
+        while r and r[-1] in ("", None):
+            r.pop()
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+# ------------------- BACKEND -------------------
+class FakeBackend:
+    """
+    Penyimpanan sheet di memori. Tiap panggilan API dihitung dan diberi jeda
+    `latency` detik (meniru latensi Sheets API). modifiedTime naik tiap tulis.
+    """
+
+    def __init__(self, latency=0.0, headers=None):
+        self.latency = latency
+        self.sheets = {name: [list(h)] for name, h in (headers or DEFAULT_HEADERS).items()}
+        self.calls = {}
+        self.modified = 0
+        self.lock = threading.RLock()
+
+    def hit(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def touch(self):
+        with self.lock:
+            self.modified += 1
+
+    def modified_time(self):
+        base = datetime.datetime(2025, 1, 1)
+        return (base + datetime.timedelta(seconds=self.modified)).isoformat() + "Z"
+
+    def read(self, sheet, a1, render=None, major="ROWS"):
+        _, r1, c1, r2, c2 = parse_a1(a1)
+        with self.lock:
+            data = self.sheets[sheet]
+            r2 = r2 or len(data)
+            c2 = c2 or max((len(r) for r in data), default=0)
+            rows = []
+            for r in range(r1, r2 + 1):
+                src = data[r - 1] if r - 1 < len(data) else []
+                vals = [src[c - 1] if c - 1 < len(src) else "" for c in range(c1, c2 + 1)]
+                rows.append(vals if render == "UNFORMATTED_VALUE" else [_formatted(v) for v in vals])
+        if major == "COLUMNS":
+            cols = [list(c) for c in zip(*rows)] if rows else []
+            return _trim(cols)
+        return _trim(rows)
+
+    def write_cell(self, sheet, r, c, v):
+        with self.lock:
+            data = self.sheets[sheet]
+            while len(data) < r:
+                data.append([])
+            row = data[r - 1]
+            while len(row) < c:
+                row.append("")
+            row[c - 1] = v
+            self.touch()
+
+    def append(self, sheet, values):
+        with self.lock:
+            data = self.sheets[sheet]
+            # seperti API: tulis setelah baris terakhir yang berisi
+            last = len(data)
+            while last > 1 and not any(v not in ("", None) for v in data[last - 1]):
+                last -= 1
+            del data[last:]
+            data.append(list(values))
+            self.touch()
+
+# ------------------- OBJEK MIRIP GSPREAD -------------------
+class FakeCell:
+    def __init__(self, row, col, value):
+        self.row, self.col, self.value = row, col, value
+
+class FakeWorksheet:
+    def __init__(self, backend, title):
+        self.backend, self.title = backend, title
+
+    @property
+    def col_count(self):
+        return max(26, max((len(r) for r in self.backend.sheets[self.title]), default=0))
+
+    def add_cols(self, n):
+        self.backend.hit("add_cols")
+
+    def row_values(self, row, value_render_option=None):
+        self.backend.hit("row_values")
+        rows = self.backend.read(self.title, f"A{row}:ZZ{row}", value_render_option)
+        return rows[0] if rows else []
+
+    def col_values(self, col, value_render_option=None):
+        self.backend.hit("col_values")
+        L = gspread.utils.rowcol_to_a1(1, col)[:-1]
+        return [r[0] if r else "" for r in self.backend.read(self.title, f"{L}1:{L}", value_render_option)]
+
+    def get_all_values(self, value_render_option=None, **kwargs):
+        self.backend.hit("get_all_values")
+        return self.backend.read(self.title, "A1:ZZ", value_render_option)
+
+    def get_all_records(self, value_render_option=None, **kwargs):
+        self.backend.hit("get_all_records")
+        rows = self.backend.read(self.title, "A1:ZZ", value_render_option)
+        if not rows:
+            return []
+        header = rows[0]
+        return [dict(zip(header, r + [""] * (len(header) - len(r)))) for r in rows[1:]]
+
+    def get(self, range_name, value_render_option=None, **kwargs):
+        self.backend.hit("get")
+        return self.backend.read(self.title, range_name, value_render_option)
+
+    def batch_get(self, ranges, value_render_option=None, **kwargs):
+        self.backend.hit("batch_get")
+        return [self.backend.read(self.title, r, value_render_option) for r in ranges]
+
+    def append_row(self, values, value_input_option="RAW", **kwargs):
+        self.backend.hit("append_row")
+        self.backend.append(self.title, values)
+
+    def update_cell(self, row, col, value):
+        self.backend.hit("update_cell")
+        self.backend.write_cell(self.title, row, col, value)
+
+    def batch_update(self, data, value_input_option="RAW", **kwargs):
+        self.backend.hit("batch_update")
+        for item in data:
+            _, r1, c1, _, _ = parse_a1(item["range"])
+            for i, row in enumerate(item["values"]):
+                for j, v in enumerate(row):
+                    self.backend.write_cell(self.title, r1 + i, c1 + j, v)
+
+    def delete_rows(self, start_index, end_index=None):
+        self.backend.hit("delete_rows")
+        with self.backend.lock:
+            del self.backend.sheets[self.title][start_index - 1:(end_index or start_index)]
+            self.backend.touch()
+
+    def find(self, query, in_row=None, in_column=None, **kwargs):
+        self.backend.hit("find")
+        with self.backend.lock:
+            for r, row in enumerate(self.backend.sheets[self.title], start=1):
+                if in_row and r != in_row:
+                    continue
+                for c, v in enumerate(row, start=1):
+                    if in_column and c != in_column:
+                        continue
+                    if str(v) == str(query):
+                        return FakeCell(r, c, v)
+        return None
+
+class FakeSpreadsheet:
+    def __init__(self, backend, key):
+        self.backend, self.id, self.client = backend, key, None
+
+    def worksheet(self, title):
+        self.backend.hit("worksheet")
+        if title not in self.backend.sheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return FakeWorksheet(self.backend, title)
+
+    def values_batch_get(self, ranges, params=None):
+        self.backend.hit("values_batch_get")
+        params = params or {}
+        out = []
+        for r in ranges:
+            sheet = parse_a1(r)[0]
+            values = self.backend.read(sheet, r.split("!", 1)[1], params.get("valueRenderOption"), params.get("majorDimension", "ROWS"))
+            out.append({"range": r, "values": values} if values else {"range": r})
+        return {"valueRanges": out}
+
+    def get_lastUpdateTime(self):
+        self.backend.hit("drive_metadata")
+        return self.backend.modified_time()
+
+class FakeClient:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def open_by_key(self, key):
+        self.backend.hit("open_by_key")
+        return FakeSpreadsheet(self.backend, key)
+
+# ------------------- PASANG -------------------
+def install(backend):
+    """Arahkan gspread.authorize ke backend palsu (kredensial tidak dibaca)."""
+    gspread.authorize = lambda credentials: FakeClient(backend)
+    ServiceAccountCredentials.from_json_keyfile_dict = staticmethod(lambda creds, scope: None)
+    return backend
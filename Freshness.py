@@ -0,0 +1,123 @@
+# ===================== FRESHNESS.PY (Cek Murah: Sheet Berubah atau Tidak) =====================
+import os
+import threading
+import time
+
+# Probe dipakai SnapshotStore sebelum fetch penuh:
+#   token(sheet)                  → dicatat bersama snapshot saat fetch dimulai
+#   unchanged(sheet, token, frame) → True jika snapshot masih sama dengan sheet
+
+# ------------------- DRIVE modifiedTime -------------------
+def drive_modified_time(sh):
+    """modifiedTime spreadsheet dari Drive API (gspread 6: get_lastUpdateTime, gspread 5: request manual)."""
+    if hasattr(sh, "get_lastUpdateTime"):
+        return sh.get_lastUpdateTime()
+    url = f"https://www.googleapis.com/drive/v3/files/{sh.id}"
+    res = sh.client.request("get", url, params={"supportsAllDrives": True, "fields": "modifiedTime"})
+    return res.json()["modifiedTime"]
+
+class DriveProbe:
+    """
+    Token = modifiedTime spreadsheet (berlaku untuk semua sheet di dalamnya).
+    Satu request kecil; hasil dipakai ulang beberapa detik supaya beberapa
+    sheet dalam satu rerun tidak masing-masing bertanya ke Drive.
+    """
+
+    def __init__(self, spreadsheet_getter, memo_seconds=2):
+        self.spreadsheet_getter = spreadsheet_getter
+        self.memo_seconds = memo_seconds
+        self._memo = (0.0, None)
+        self._lock = threading.Lock()
+
+    def token(self, sheet):
+        with self._lock:
+            t, tok = self._memo
+            if tok is not None and time.time() - t < self.memo_seconds:
+                return tok
+        tok = drive_modified_time(self.spreadsheet_getter())
+        with self._lock:
+            self._memo = (time.time(), tok)
+        return tok
+
+    def unchanged(self, sheet, token, frame):
+        return token is not None and self.token(sheet) == token
+
+# ------------------- JUMLAH BARIS TERPAKAI -------------------
+def last_sheet_row(frame):
+    """Nomor baris sheet terakhir yang tercakup snapshot (header = baris 1)."""
+    if "_row" in frame.columns and len(frame):
+        return int(frame["_row"].max())
+    return len(frame) + 1
+
+class RowCountProbe:
+    """
+    Cek batas baris: sel A di baris terakhir snapshot harus terisi dan baris
+    sesudahnya kosong. Dua sel dalam satu values_batch_get.
+    Menangkap baris baru / terhapus, tidak menangkap edit sel di tengah.
+    """
+
+    def __init__(self, spreadsheet_getter):
+        self.spreadsheet_getter = spreadsheet_getter
+
+    def token(self, sheet):
+        return None
+
+    def unchanged(self, sheet, token, frame):
+        last = last_sheet_row(frame)
+        res = self.spreadsheet_getter().values_batch_get([f"'{sheet}'!A{last}", f"'{sheet}'!A{last + 1}"])
+        vrs = res.get("valueRanges", [])
+        filled = [bool(vr.get("values")) for vr in vrs] + [False, False]
+        return (filled[0] or last == 1) and not filled[1]
+
+# ------------------- PENGGANTI LOKAL (TES) -------------------
+class LocalProbe:
+    """
+    Pengganti lokal untuk tes / tanpa internet: token = penghitung per sheet
+    (naik lewat mark_changed), ditambah mtime file bila path diberikan.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.counters = {}
+
+    def mark_changed(self, sheet):
+        self.counters[sheet] = self.counters.get(sheet, 0) + 1
+
+    def token(self, sheet):
+        mtime = os.stat(self.path).st_mtime_ns if self.path and os.path.exists(self.path) else 0
+        return (mtime, self.counters.get(sheet, 0))
+
+    def unchanged(self, sheet, token, frame):
+        return tuple(token or ()) == self.token(sheet)
+
+# ------------------- STORAGE LOKAL (SQLite) -------------------
+class StorageProbe:
+    """Token = versi tulis per sheet di storage SQLite (naik di transaksi tulis); satu query lokal."""
+
+    def __init__(self, storage_getter):
+        self.storage_getter = storage_getter
+
+    def token(self, sheet):
+        return self.storage_getter().version(sheet)
+
+    def unchanged(self, sheet, token, frame):
+        return token is not None and self.token(sheet) == token
+
+# ------------------- PILIH PROBE -------------------
+def make_probe(kind=None):
+    """CCKASIR_PROBE = drive (default) | rows | local | storage | none. Storage SQLite → storage."""
+    from Storage import storage_kind
+    kind = (kind or os.environ.get("CCKASIR_PROBE", "drive")).lower()
+    if storage_kind() == "sqlite" and kind != "none":
+        kind = "storage"  # data dibaca dari SQLite, bukan dari sheet
+    if kind == "none":
+        return None
+    if kind == "storage":
+        from Storage import get_storage
+        return StorageProbe(get_storage)
+    if kind == "local":
+        return LocalProbe(os.environ.get("CCKASIR_PROBE_FILE"))
+    from Sheets import get_spreadsheet
+    if kind == "rows":
+        return RowCountProbe(get_spreadsheet)
+    return DriveProbe(get_spreadsheet)
@@ -0,0 +1,89 @@
+# ===================== IDEMPOTENCY.PY (Cegah Tulis Ganda: Klik Ganda & Rerun) =====================
+import hashlib
+import json
+import time
+import uuid
+import streamlit as st
+from SharedCache import shared_or_local
+
+# Setiap pengiriman form punya kunci aksi:
+#   sesi   → token form di session_state + sidik isi form (klik ganda di tablet yang sama)
+#   global → sidik isi saja (mis. nota + status baru: dua tablet menekan tombol yang sama)
+# Kunci diklaim di cache bersama (add = set jika belum ada) SEBELUM tulis ke sheet.
+# Pengiriman berikutnya dengan kunci yang sama tidak menulis lagi; hasil pertama
+# dikembalikan dan counter "ganda" form itu naik.
+
+CLAIM_TTL = 6 * 3600
+WAIT_SECONDS = 15
+FORMS = {"order": "🧾 Transaksi", "pengeluaran": "💸 Pengeluaran", "status": "📌 Status Nota", "admin": "⚙️ Master Harga"}
+
+def _default(o):
+    return o.item() if hasattr(o, "item") else str(o)
+
+# ------------------- TOKEN -------------------
+def form_token(form):
+    key = f"idem_token_{form}"
+    if key not in st.session_state:
+        st.session_state[key] = uuid.uuid4().hex
+    return st.session_state[key]
+
+def new_submission(form):
+    """Token baru: isi form yang sama boleh disimpan sekali lagi (disengaja)."""
+    st.session_state[f"idem_token_{form}"] = uuid.uuid4().hex
+
+def action_key(form, payload: dict, scope="sesi"):
+    sidik = hashlib.sha1(json.dumps(payload, sort_keys=True, default=_default).encode()).hexdigest()[:20]
+    token = form_token(form) if scope == "sesi" else "global"
+    return f"idem:{form}:{token}:{sidik}"
+
+# ------------------- JALANKAN SEKALI -------------------
+def run_once(form, payload: dict, action, scope="sesi"):
+    """
+    Jalankan action() sekali per kunci aksi. Return (hasil, ganda).
+    - Hasil falsy / exception → klaim dilepas (boleh dicoba lagi), exception diteruskan.
+    - ganda=True: aksi sudah pernah jalan, hasil = hasil pertama (None bila masih diproses).
+    """
+    backend = shared_or_local()
+    key = action_key(form, payload, scope)
+    if backend.add(key, json.dumps({"status": "proses"}).encode(), ttl=CLAIM_TTL):
+        try:
+            hasil = action()
+        except Exception:
+            backend.delete(key)
+            raise
+        if not hasil:
+            backend.delete(key)
+            return hasil, False
+        backend.set(key, json.dumps({"status": "selesai", "hasil": hasil}, default=_default).encode(), ttl=CLAIM_TTL)
+        return hasil, False
+
+    backend.counter(f"idem_ganda:{form}")
+    batas = time.time() + WAIT_SECONDS
+    while True:
+        raw = backend.get(key)
+        rec = json.loads(raw) if raw else None
+        if rec is None:
+            return None, True  # klaim dilepas (aksi pertama gagal) → biarkan pengguna coba lagi
+        if rec.get("status") == "selesai":
+            return rec.get("hasil"), True
+        if time.time() > batas:
+            return None, True
+        time.sleep(0.25)
+
+def suppressed_counts():
+    backend = shared_or_local()
+    return {form: backend.count(f"idem_ganda:{form}") for form in FORMS}
+
+# ------------------- TAMPILAN -------------------
+def show_idempotency_stats():
+    """Jumlah tulis ganda yang dicegah (semua sesi / replika yang berbagi cache)."""
+    with st.expander("🛡️ Tulis Ganda Dicegah"):
+        try:
+            counts = suppressed_counts()
+        except Exception as e:
+            st.warning(f"Gagal membaca counter: {e}")
+            return
+        cols = st.columns(len(FORMS))
+        for col, (form, label) in zip(cols, FORMS.items()):
+            col.metric(label, counts.get(form, 0))
+        st.caption("Klik ganda / rerun yang tidak jadi menulis ke sheet, dihitung sejak server (atau cache bersama) berjalan.")
@@ -3,36 +3,23 @@ import streamlit as st
 import pandas as pd
 import datetime
 import os
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import json
 import requests
 import urllib.parse
 from Setting import load_config
+from Customer import normalize_hp, sync_customer_index
+from Sheets import to_typed_frame
+from Snapshot import get_store
+from SharedCache import get_shared_cache
+from Storage import get_storage
+from Idempotency import run_once, new_submission
 import streamlit.components.v1 as components
 
 # ============ KONFIGURASI ============
-SPREADSHEET_ID = "1v_3sXsGw9lNmGPSbIHytYzHzPTxa4yp4HhfS9tgXweA"
 SHEET_ORDER = "Order"
 SHEET_ADMIN = "Admin"
 CONFIG_FILE = "config.json"
 
-# ============ AUTH GOOGLE ============
-def authenticate_google():
-    creds_dict = st.secrets.get("gcp_service_account")
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    credentials = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    client = gspread.authorize(credentials)
-    return client
-
-def get_worksheet(sheet_name):
-    client = authenticate_google()
-    sh = client.open_by_key(SPREADSHEET_ID)
-    return sh.worksheet(sheet_name)
-
 # ============ WIB TANGGAL ============
 @st.cache_data(ttl=300)
 def get_cached_internet_datetime():
@@ -48,47 +35,89 @@ def get_cached_internet_datetime():
 
 # ============ NOMOR NOTA ============
 def get_next_nota_from_sheet(sheet_name, prefix):
-    try:
-        ws = get_worksheet(sheet_name)
-        data = ws.col_values(1)
-        if len(data) <= 1:
-            return f"{prefix}0000001"
-        last_nota = None
-        for val in reversed(data):
-            if val.strip():
-                last_nota = val.strip()
-                break
-        if last_nota and last_nota.startswith(prefix):
-            num = int(last_nota.replace(prefix, ""))
-        else:
-            num = 0
-        return f"{prefix}{num+1:07d}"
-    except Exception as e:
-        print("Error nota:", e)
-        return f"{prefix}0000001"
+    """Nota berikutnya dari storage aktif (reservasi atomik, lihat Storage.*.next_nota)."""
+    return get_storage().next_nota(sheet_name, prefix)
 
 # ============ HARGA LAYANAN ============
-@st.cache_data(ttl=120)
+HARGA_TTL = 600  # edit langsung di Google Sheet (bukan lewat menu Admin) ikut terbaca paling lambat 10 menit
+
 def get_admin_prices():
-    ws = get_worksheet(SHEET_ADMIN)
-    df = pd.DataFrame(ws.get_all_records())
+    """
+    Harga per layanan. Dengan cache bersama: katalog per versi sheet Admin dipakai
+    semua replika (simpan di menu Admin menaikkan versi). Tanpa itu: dari snapshot Admin.
+    """
+    shared = get_shared_cache()
+    key = None
+    if shared is not None:
+        try:
+            key = f"harga:{shared.version(SHEET_ADMIN)}"
+            cached = shared.get_json(key)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            print("Cache harga bersama gagal:", e)
+            key = None
+    df = get_store().get(SHEET_ADMIN, lambda: get_storage().read(SHEET_ADMIN))
     if df.empty:
         return {}
     if "Jenis Layanan" not in df.columns or "Harga per Kg" not in df.columns:
         return {}
     harga_dict = {row["Jenis Layanan"]: row["Harga per Kg"] for _, row in df.iterrows()}
+    if key is not None:
+        try:
+            shared.set_json(key, harga_dict, ttl=HARGA_TTL)
+        except Exception as e:
+            print("Cache harga bersama gagal:", e)
     return harga_dict
 
 # ============ SIMPAN ORDER ============
 def append_to_sheet(sheet_name, data: dict):
-    ws = get_worksheet(sheet_name)
-    headers = ws.row_values(1)
-    if "Status Antrian" not in headers:
-        ws.update_cell(1, len(headers) + 1, "Status Antrian")
-        headers.append("Status Antrian")
+    """Tulis lewat skema baku (angka RAW + ISO); Status Antrian default 'Antrian'."""
     data.setdefault("Status Antrian", "Antrian")
-    row = [data.get(h, "") for h in headers]
-    ws.append_row(row, value_input_option="USER_ENTERED")
+    return get_storage().append(sheet_name, data)
+
+# ============ AUTOFILL PELANGGAN ============
+def autofill_pelanggan(c, layanan_list, parfum_list):
+    """Isi form dari data pelanggan lama (sekali per pilihan, sesudahnya bebas diedit)."""
+    if st.session_state.get("autofill_hp") == c["No HP"]:
+        return
+    st.session_state["autofill_hp"] = c["No HP"]
+    st.session_state["nama_pelanggan"] = c["Nama Pelanggan"]
+    st.session_state["no_hp"] = c["No HP"]
+    if c["Layanan Terakhir"] in layanan_list:
+        st.session_state["jenis_layanan"] = c["Layanan Terakhir"]
+    if c["Parfum Terakhir"] in parfum_list:
+        st.session_state["parfum_pilihan"] = c["Parfum Terakhir"]
+        st.session_state["parfum_custom"] = ""
+    elif c["Parfum Terakhir"]:
+        st.session_state["parfum_custom"] = c["Parfum Terakhir"]
+
+# ============ FRAGMENT ============
+# Rerun sebagian (streamlit >= 1.37 st.fragment, 1.33 experimental_fragment); versi lama → fungsi biasa
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+@fragment
+def rincian_harga(admin_harga, layanan_list):
+    """
+    Layanan, harga, berat, diskon + total live. Hanya bagian ini yang rerun saat
+    angka diketik; nilai dibaca form simpan lewat session_state.
+    """
+    jenis_layanan = st.selectbox("Jenis Layanan", layanan_list, key="jenis_layanan")
+    # harga ikut layanan (juga sesudah autofill), sesudahnya bebas diubah
+    if st.session_state.get("harga_layanan") != jenis_layanan:
+        st.session_state["harga_layanan"] = jenis_layanan
+        st.session_state["harga_per_kg"] = float(admin_harga.get(jenis_layanan, 0))
+    harga_per_kg = st.number_input("Harga per Kg", min_value=0.0, step=500.0, format="%.0f", key="harga_per_kg")
+
+    st.subheader("Berat Pakaian")
+    kg = st.number_input("Kg", min_value=0, step=1, key="berat_kg")
+    gram = st.number_input("Gram", min_value=0, max_value=999, step=50, key="berat_gram")
+    berat = kg + gram / 1000
+    st.markdown(f"**Berat total:** {berat:.2f} Kg")
+
+    diskon = st.number_input("Diskon (Rp)", min_value=0.0, step=100.0, key="diskon")
+    total = berat * harga_per_kg - diskon
+    st.markdown(f"### 💰 Total: Rp {total:,.0f}".replace(",", "."))
 
 # ============ UI ============
 def show():
@@ -97,79 +126,119 @@ def show():
 
     # Ambil waktu terkini (cached)
     now = get_cached_internet_datetime()
-
-    tanggal_masuk = st.date_input("Tanggal Masuk", value=now.date())
-    estimasi_selesai = st.date_input("Estimasi Selesai", value=(now + datetime.timedelta(days=3)).date())
     jam_otomatis = now.strftime("%H:%M")
 
-    nama = st.text_input("Nama Pelanggan")
-    no_hp = st.text_input("Nomor WhatsApp")
+    layanan_list = ["Cuci Lipat", "Cuci Setrika", "Cuci Lipat Express", "Cuci Setrika Express"]
+    parfum_list = ["Sakura", "Gardenia", "Lily", "Jasmine", "Violet", "Lavender", "Ocean Fresh", "Snappy", "Sweet Poppy", "Aqua Fresh"]
 
-    jenis_pakaian = st.selectbox(
-        "Jenis Pakaian",
-        ["Baju Biasa", "Sprei", "Selimut", "Bed Cover", "Jas", "Jacket", "Sepatu"]
-    )
+    # === Pelanggan lama: cari No HP / nama → isi otomatis (di luar form: perlu rerun) ===
+    idx = sync_customer_index(get_storage(), SHEET_ORDER)
+    cari = st.text_input("🔎 Pelanggan Lama (ketik No HP / Nama)", key="cari_pelanggan")
+    if cari.strip():
+        hasil = idx.lookup(cari)
+        if hasil:
+            labels = [
+                f"{c['Nama Pelanggan']} — {c['No HP']} ({c['Jumlah Kunjungan']}x, Rp {c['Total Belanja']:,.0f})".replace(",", ".")
+                for c in hasil
+            ]
+            pilih = st.selectbox("Pilih Pelanggan", ["-"] + labels, key="pilih_pelanggan")
+            if pilih != "-":
+                autofill_pelanggan(hasil[labels.index(pilih)], layanan_list, parfum_list)
+        else:
+            st.caption("Pelanggan belum pernah order.")
 
-    layanan_list = ["Cuci Lipat", "Cuci Setrika", "Cuci Lipat Express", "Cuci Setrika Express"]
-    jenis_layanan = st.selectbox("Jenis Layanan", layanan_list)
+    # === Harga & total: fragment sendiri ===
+    rincian_harga(get_admin_prices(), layanan_list)
 
-    admin_harga = get_admin_prices()
-    harga_default = admin_harga.get(jenis_layanan, 0)
-    harga_per_kg = st.number_input("Harga per Kg", value=float(harga_default), min_value=0.0, step=500.0, format="%.0f")
+    # === Data order: dikirim sekali saat Simpan ===
+    with st.form("form_order", border=False):
+        tanggal_masuk = st.date_input("Tanggal Masuk", value=now.date())
+        estimasi_selesai = st.date_input("Estimasi Selesai", value=(now + datetime.timedelta(days=3)).date())
 
-    st.subheader("Berat Pakaian")
-    kg = st.number_input("Kg", min_value=0, step=1)
-    gram = st.number_input("Gram", min_value=0, max_value=999, step=50)
-    berat = kg + gram / 1000
-    st.markdown(f"**Berat total:** {berat:.2f} Kg")
+        nama = st.text_input("Nama Pelanggan", key="nama_pelanggan")
+        no_hp = st.text_input("Nomor WhatsApp", key="no_hp")
 
-    parfum_list = ["Sakura", "Gardenia", "Lily", "Jasmine", "Violet", "Lavender", "Ocean Fresh", "Snappy", "Sweet Poppy", "Aqua Fresh"]
-    parfum_pilihan = st.selectbox("Pilih Parfum", parfum_list)
-    parfum_custom = st.text_input("Parfum Custom (opsional)")
-    parfum_final = parfum_custom if parfum_custom else parfum_pilihan
+        jenis_pakaian = st.selectbox(
+            "Jenis Pakaian",
+            ["Baju Biasa", "Sprei", "Selimut", "Bed Cover", "Jas", "Jacket", "Sepatu"]
+        )
 
-    diskon = st.number_input("Diskon (Rp)", min_value=0.0, step=100.0)
-    jenis_transaksi = st.radio("Jenis Transaksi", ["Cash", "Transfer"], horizontal=True)
-    status = st.radio("Status Pembayaran", ["BELUM BAYAR", "LUNAS"], horizontal=True)
+        parfum_pilihan = st.selectbox("Pilih Parfum", parfum_list, key="parfum_pilihan")
+        parfum_custom = st.text_input("Parfum Custom (opsional)", key="parfum_custom")
 
-    subtotal = berat * harga_per_kg
-    total = subtotal - diskon
-    st.markdown(f"### 💰 Total: Rp {total:,.0f}".replace(",", "."))
+        jenis_transaksi = st.radio("Jenis Transaksi", ["Cash", "Transfer"], horizontal=True)
+        status = st.radio("Status Pembayaran", ["BELUM BAYAR", "LUNAS"], horizontal=True)
+
+        simpan = st.form_submit_button("💾 Simpan Transaksi")
+
+    if simpan:
+        parfum_final = parfum_custom if parfum_custom else parfum_pilihan
+        jenis_layanan = st.session_state["jenis_layanan"]
+        harga_per_kg = st.session_state["harga_per_kg"]
+        berat = st.session_state["berat_kg"] + st.session_state["berat_gram"] / 1000
+        diskon = st.session_state["diskon"]
+        subtotal = berat * harga_per_kg
+        total = subtotal - diskon
 
-    if st.button("💾 Simpan Transaksi"):
         if not nama or not no_hp or berat <= 0 or harga_per_kg <= 0:
             st.error("⚠️ Nama, No HP, berat, dan harga harus diisi.")
             return
 
-        nota = get_next_nota_from_sheet(SHEET_ORDER, "TRX/")
-        tanggal_masuk_str = f"{tanggal_masuk.strftime('%d/%m/%Y')} - {jam_otomatis}"
-        estimasi_selesai_str = f"{estimasi_selesai.strftime('%d/%m/%Y')} - {jam_otomatis}"
-
-        order_data = {
-            "No Nota": nota,
-            "Tanggal Masuk": tanggal_masuk_str,
-            "Estimasi Selesai": estimasi_selesai_str,
-            "Nama Pelanggan": nama,
-            "No HP": no_hp,
-            "Jenis Pakaian": jenis_pakaian,
-            "Jenis Layanan": jenis_layanan,
-            "Berat (Kg)": berat,
-            "Harga per Kg": harga_per_kg,
-            "Subtotal": subtotal,
-            "Diskon": diskon,
-            "Total": total,
-            "Parfum": parfum_final,
-            "Jenis Transaksi": jenis_transaksi,
-            "Status": status,
-            "Uploaded": True
+        # sidik pengiriman: isi form tanpa jam (klik ganda bisa melewati pergantian menit)
+        payload = {
+            "nama": nama, "no_hp": no_hp, "pakaian": jenis_pakaian, "layanan": jenis_layanan,
+            "berat": berat, "harga": harga_per_kg, "diskon": diskon, "parfum": parfum_final,
+            "transaksi": jenis_transaksi, "status": status,
+            "masuk": str(tanggal_masuk), "estimasi": str(estimasi_selesai),
         }
 
+        def simpan_order():
+            # nota direservasi di dalam aksi: pengiriman ganda tidak memakai nomor baru
+            nota = get_next_nota_from_sheet(SHEET_ORDER, "TRX/")
+            order_data = {
+                "No Nota": nota,
+                "Tanggal Masuk": f"{tanggal_masuk.strftime('%d/%m/%Y')} - {jam_otomatis}",
+                "Estimasi Selesai": f"{estimasi_selesai.strftime('%d/%m/%Y')} - {jam_otomatis}",
+                "Nama Pelanggan": nama,
+                "No HP": no_hp,
+                "Jenis Pakaian": jenis_pakaian,
+                "Jenis Layanan": jenis_layanan,
+                "Berat (Kg)": berat,
+                "Harga per Kg": harga_per_kg,
+                "Subtotal": subtotal,
+                "Diskon": diskon,
+                "Total": total,
+                "Parfum": parfum_final,
+                "Jenis Transaksi": jenis_transaksi,
+                "Status": status,
+                "Uploaded": True
+            }
+            row = append_to_sheet(SHEET_ORDER, order_data)
+            # sudah tertulis: gagal di cache tidak boleh membatalkan (run_once akan melepas klaim → tulis ganda)
+            try:
+                idx.add_order(order_data)
+                get_store().apply_append(SHEET_ORDER, row, typer=lambda d: to_typed_frame(d, canonical=True))
+            except Exception as e:
+                print("Gagal update cache order:", e)
+            return {k: order_data[k] for k in ("No Nota", "Tanggal Masuk", "Estimasi Selesai")}
+
         try:
-            append_to_sheet(SHEET_ORDER, order_data)
-            st.success(f"✅ Transaksi Laundry {nota} berhasil disimpan!")
+            hasil, ganda = run_once("order", payload, simpan_order)
         except Exception as e:
-            st.error(f"❌ Gagal simpan ke Google Sheet: {e}")
+            st.error(f"❌ Gagal simpan transaksi: {e}")
             return
+        if not hasil:
+            st.warning("⏳ Transaksi yang sama masih diproses. Tunggu sebentar lalu cek halaman Pelanggan.")
+            return
+
+        nota = hasil["No Nota"]
+        tanggal_masuk_str = hasil["Tanggal Masuk"]
+        estimasi_selesai_str = hasil["Estimasi Selesai"]
+        if ganda:
+            st.info(f"ℹ️ Transaksi ini sudah tersimpan sebagai {nota} — simpan ganda diabaikan.")
+            st.button("➕ Simpan Lagi sebagai Transaksi Baru", on_click=new_submission, args=("order",))
+        else:
+            st.success(f"✅ Transaksi Laundry {nota} berhasil disimpan!")
 
         # === Nota WhatsApp ===
         msg = f"""NOTA ELEKTRONIK
@@ -195,11 +264,7 @@ Total    = Rp {total:,.0f}
 =======================
 Terima kasih 🙏
 """
-        hp = str(no_hp).replace("+", "").replace(" ", "").replace("-", "")
-        if hp.startswith("0"):
-            hp = "62" + hp[1:]
-        elif not hp.startswith("62"):
-            hp = "62" + hp
+        hp = normalize_hp(no_hp)
         wa_link = f"https://wa.me/{hp}?text={requests.utils.quote(msg)}"
         st.markdown(f"[📲 KIRIM NOTA VIA WHATSAPP]({wa_link})", unsafe_allow_html=True)
 
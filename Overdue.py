@@ -0,0 +1,178 @@
+# ===================== OVERDUE.PY (Order Terlambat & Belum Diambil) =====================
+import datetime
+import urllib.parse
+import numpy as np
+import pandas as pd
+import streamlit as st
+from Customer import normalize_hp
+
+WAKTU_FORMAT = "%d/%m/%Y - %H:%M"
+
+# ------------------- PARSE -------------------
+def parse_waktu_series(s):
+    """'dd/mm/YYYY - HH:MM' (atau format lain yang bisa ditebak) → datetime64, kosong → NaT."""
+    teks = s.astype(object).fillna("").astype(str).str.strip()
+    parsed = pd.to_datetime(teks, format=WAKTU_FORMAT, errors="coerce")
+    sisa = parsed.isna() & teks.ne("")
+    if sisa.any():
+        parsed[sisa] = pd.to_datetime(teks[sisa], dayfirst=True, errors="coerce")
+    return parsed
+
+def _waktu_col(df, col):
+    """Kolom ISO (sudah datetime64 dari compact_frame) bila ada, cadangan dari teks tampilan."""
+    iso = f"{col} ISO"
+    out = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    if iso in df.columns and pd.api.types.is_datetime64_any_dtype(df[iso]):
+        out = df[iso].astype("datetime64[ns]")
+    if col in df.columns:
+        kosong = out.isna()
+        if kosong.any():
+            out = out.where(~kosong, parse_waktu_series(df.loc[kosong, col]).astype("datetime64[ns]").reindex(df.index))
+    return out
+
+def _status(df):
+    antrian = df["Status Antrian"].astype(object).fillna("").astype(str).str.strip().str.lower()
+    if "Status" in df.columns:
+        status = df["Status"].astype(object).fillna("").astype(str).str.strip().str.lower()
+        antrian = antrian.where(~((antrian == "") & (status != "")), status)
+    return antrian
+
+# ------------------- INDEKS -------------------
+class OverdueIndex:
+    """
+    Estimasi Selesai (order Antrian) dan Tanggal Siap (order Siap Diambil)
+    di-parse sekali ke array datetime64 terurut. Setiap pertanyaan cukup
+    dua np.searchsorted lalu slice posisi baris, tanpa scan frame.
+    Tanggal Siap kosong (order lama) → pakai Estimasi Selesai.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        if df.empty or "Status Antrian" not in df.columns:
+            self._due_t = self._ready_t = np.array([], dtype="datetime64[ns]")
+            self._due_pos = self._ready_pos = np.array([], dtype=np.int64)
+            return
+        status = _status(df).to_numpy()
+        estimasi = _waktu_col(df, "Estimasi Selesai")
+        siap = _waktu_col(df, "Tanggal Siap").fillna(estimasi)
+        self._due_t, self._due_pos = self._sorted(estimasi, (status == "") | (status == "antrian"))
+        self._ready_t, self._ready_pos = self._sorted(siap, status == "siap diambil")
+
+    @staticmethod
+    def _sorted(waktu, mask):
+        t = waktu.to_numpy(dtype="datetime64[ns]")
+        pos = np.flatnonzero(mask & ~np.isnat(t))
+        order = np.argsort(t[pos], kind="stable")
+        return t[pos][order], pos[order]
+
+    @staticmethod
+    def _t(waktu):
+        return np.datetime64(pd.Timestamp(waktu).tz_localize(None).to_datetime64(), "ns")
+
+    def _rows(self, pos):
+        return self.df.iloc[pos]
+
+    def overdue(self, now):
+        """Antrian dengan Estimasi Selesai < now (paling lama terlambat dulu)."""
+        i = np.searchsorted(self._due_t, self._t(now), side="left")
+        return self._rows(self._due_pos[:i])
+
+    def due_within(self, now, hours):
+        """Antrian yang jatuh tempo dalam [now, now + hours)."""
+        t = self._t(now)
+        a = np.searchsorted(self._due_t, t, side="left")
+        b = np.searchsorted(self._due_t, t + np.timedelta64(int(hours * 3600), "s"), side="left")
+        return self._rows(self._due_pos[a:b])
+
+    def uncollected(self, now, days):
+        """Siap Diambil sejak lebih dari `days` hari."""
+        i = np.searchsorted(self._ready_t, self._t(now) - np.timedelta64(int(days * 86400), "s"), side="left")
+        return self._rows(self._ready_pos[:i])
+
+    def counts(self, now, hours, days):
+        return len(self.overdue(now)), len(self.due_within(now, hours)), len(self.uncollected(now, days))
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_overdue_index(_df, snapshot_id):
+    """Satu indeks per versi snapshot (dibagi antar sesi), dibangun ulang hanya saat data berubah."""
+    return OverdueIndex(_df)
+
+# ------------------- PENGINGAT WA -------------------
+def pesan_pengingat(nama, notas, jenis, nama_toko):
+    daftar = ", ".join(notas)
+    if jenis == "ambil":
+        return f"""Halo {nama},
+Laundry anda dengan nomor Nota {daftar} sudah siap dan menunggu untuk diambil. 🧺
+Silakan mampir ke toko kami ya.
+
+Terima Kasih,
+{nama_toko}"""
+    return f"""Halo {nama},
+Mohon maaf, laundry anda dengan nomor Nota {daftar} masih dalam proses dan sedikit terlambat dari estimasi. 🙏
+Kami kabari lagi begitu siap diambil.
+
+Terima Kasih,
+{nama_toko}"""
+
+def wa_links(df, jenis, nama_toko):
+    """Satu link per nomor HP (nota digabung) → list (nama, nota, link)."""
+    if df.empty:
+        return []
+    hp = df["No HP"].astype(object).fillna("").astype(str).map(normalize_hp) if "No HP" in df.columns else pd.Series("", index=df.index)
+    out = []
+    for no_hp, grp in df.assign(_hp=hp).groupby("_hp", sort=False):
+        if not (no_hp.isdigit() and len(no_hp) >= 10):
+            continue
+        nama = str(grp["Nama Pelanggan"].iloc[0])
+        notas = grp["No Nota"].astype(str).tolist()
+        msg = pesan_pengingat(nama, notas, jenis, nama_toko)
+        out.append((nama, ", ".join(notas), f"https://wa.me/{no_hp}?text={urllib.parse.quote(msg)}"))
+    return out
+
+# ------------------- TAMPILAN -------------------
+def _tabel(df, waktu_col, now, label="Telat (jam)", arah=1):
+    cols = [c for c in ["No Nota", "Nama Pelanggan", "No HP", "Estimasi Selesai", "Tanggal Siap"] if c in df.columns]
+    out = df[cols].astype(object).fillna("").astype(str).reset_index(drop=True)
+    if waktu_col:
+        t = _waktu_col(df, waktu_col).reset_index(drop=True)
+        if waktu_col == "Tanggal Siap":
+            t = t.fillna(_waktu_col(df, "Estimasi Selesai").reset_index(drop=True))
+        jam = (pd.Timestamp(now).tz_localize(None) - t).dt.total_seconds() / 3600
+        out[label] = (jam * arah).round(1)
+    return out
+
+def _links(items):
+    for nama, notas, link in items:
+        st.markdown(f"- [📲 {nama} — {notas}]({link})")
+
+def render_overdue_tab(idx, now, hours, days, nama_toko):
+    """Isi tab Terlambat di halaman Pelanggan."""
+    telat = idx.overdue(now)
+    segera = idx.due_within(now, hours)
+    belum = idx.uncollected(now, days)
+
+    st.markdown(f"#### ⏰ Lewat Estimasi ({len(telat)})")
+    if len(telat):
+        st.dataframe(_tabel(telat, "Estimasi Selesai", now), use_container_width=True, hide_index=True)
+        with st.expander("📲 Kirim Permintaan Maaf (WA)"):
+            _links(wa_links(telat, "telat", nama_toko))
+    else:
+        st.success("Tidak ada order yang lewat estimasi.")
+
+    st.markdown(f"#### ⌛ Jatuh Tempo ≤ {hours} Jam ({len(segera)})")
+    if len(segera):
+        st.dataframe(_tabel(segera, "Estimasi Selesai", now, "Sisa (jam)", -1), use_container_width=True, hide_index=True)
+    else:
+        st.info("Tidak ada order yang jatuh tempo dalam waktu dekat.")
+
+    st.markdown(f"#### 📦 Siap Diambil > {days} Hari ({len(belum)})")
+    if len(belum):
+        st.dataframe(_tabel(belum, "Tanggal Siap", now, "Menunggu (jam)"), use_container_width=True, hide_index=True)
+        with st.expander("📲 Kirim Pengingat Ambil (WA)"):
+            _links(wa_links(belum, "ambil", nama_toko))
+    else:
+        st.success("Semua order siap sudah diambil tepat waktu.")
+
+def now_jakarta():
+    tz = datetime.timezone(datetime.timedelta(hours=7))
+    return datetime.datetime.now(tz).replace(tzinfo=None)
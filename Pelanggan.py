@@ -4,74 +4,102 @@ import pandas as pd
 import datetime
 import json
 import os
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import urllib.parse
+from Customer import normalize_hp
+from Snapshot import get_store, show_data_age
+from Overdue import get_overdue_index, render_overdue_tab, now_jakarta
+from Idempotency import run_once
+from Storage import get_storage
 
 # ------------------- PAGE CONFIG -------------------
 st.set_page_config(page_title="Pelanggan — Status Laundry", page_icon="🧺", layout="wide")
 
 # ------------------- CONFIG -------------------
 CONFIG_FILE = "config.json"
-SPREADSHEET_ID = "1v_3sXsGw9lNmGPSbIHytYzHzPTxa4yp4HhfS9tgXweA"
 SHEET_ORDER = "Order"
 
-# ------------------- AUTH GOOGLE -------------------
-def authenticate_google():
-    creds_dict = st.secrets["gcp_service_account"]
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    credentials = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    client = gspread.authorize(credentials)
-    return client
-
-def get_worksheet(sheet_name):
-    client = authenticate_google()
-    sh = client.open_by_key(SPREADSHEET_ID)
-    return sh.worksheet(sheet_name)
-
-# ------------------- READ SHEET (cached) -------------------
-@st.cache_data(ttl=60)
+# ------------------- READ SHEET (snapshot bersama) -------------------
 def read_sheet_once(sheet_name):
-    ws = get_worksheet(sheet_name)
-    df = pd.DataFrame(ws.get_all_records())
-    return df
+    return get_storage().read(sheet_name)
+
+# ------------------- READ PER HALAMAN (ranged) -------------------
+# Kolom ringan untuk indeks status: cukup untuk hitung counter, filter & urutan halaman
+INDEX_COLS = [
+    "No Nota", "Tanggal Masuk", "Nama Pelanggan", "No HP", "Status", "Status Antrian",
+    "Estimasi Selesai", "Estimasi Selesai ISO", "Tanggal Siap",
+]
+
+def read_status_index(sheet_name):
+    """
+    Indeks status: hanya kolom INDEX_COLS (+ nomor baris di '_row'), lewat storage:
+    Sheets = satu values_batch_get berproyeksi kolom, SQLite = kolom yang sama dari
+    file lokal → jauh lebih kecil dari baca penuh.
+    """
+    df = get_storage().read(sheet_name, INDEX_COLS)
+    df["_row"] = range(2, len(df) + 2)
+    if "No Nota" in df.columns:
+        df = df[df["No Nota"].astype(str).str.strip() != ""]
+    return df.reset_index(drop=True)
+
+@st.cache_data(max_entries=200)
+def read_rows_by_number(sheet_name, rows: tuple, snapshot_id=None):
+    """
+    Baris lengkap hanya untuk nomor baris tertentu (storage.read_rows: satu batch, range per blok).
+    snapshot_id (versi + waktu fetch indeks) ikut jadi kunci cache: halaman dibaca ulang hanya jika indeks berubah.
+    """
+    if not rows:
+        return pd.DataFrame()
+    return get_storage().read_rows(sheet_name, list(rows))
 
-def clear_sheet_cache_and_reload():
+def load_df():
+    """Frame Order lengkap dari snapshot bersama (satu salinan untuk semua sesi)."""
+    try:
+        return get_store().get(SHEET_ORDER, lambda: read_sheet_once(SHEET_ORDER))
+    except Exception as e:
+        st.warning(f"Gagal membaca sheet: {e}")
+        return pd.DataFrame()
+
+def load_status_index():
+    return get_store().get(f"{SHEET_ORDER}:index", lambda: read_status_index(SHEET_ORDER), sheet=SHEET_ORDER, schema=INDEX_COLS)
+
+def clear_all_caches():
     try:
-        read_sheet_once.clear()
+        read_rows_by_number.clear()
     except Exception:
         pass
-    return read_sheet_once(SHEET_ORDER)
 
-def load_df():
-    if "df_cache" not in st.session_state:
-        try:
-            st.session_state.df_cache = read_sheet_once(SHEET_ORDER)
-        except Exception as e:
-            st.warning(f"Gagal membaca sheet: {e}")
-            st.session_state.df_cache = pd.DataFrame()
-    return st.session_state.df_cache.copy()
+def ubah_status(no_nota, updates: dict):
+    """
+    Update status nota sekali saja: klik ganda, rerun, atau tablet lain dengan
+    tombol yang sama tidak menulis ulang. Return (ok, ganda).
+    """
+    hasil, ganda = run_once(
+        "status", {"nota": str(no_nota), "status": updates["Status Antrian"]},
+        lambda: update_sheet_row_by_nota(SHEET_ORDER, no_nota, updates), scope="global",
+    )
+    if hasil and not ganda:
+        refresh_after_update()
+    if ganda and not hasil:
+        st.warning(f"⏳ Nota {no_nota} sedang diperbarui dari sesi lain.")
+    return bool(hasil), ganda
+
+def refresh_after_update():
+    """Snapshot sudah diperbarui oleh update_sheet_row_by_nota; cukup buang cache halaman."""
+    try:
+        read_rows_by_number.clear()
+    except Exception:
+        pass
 
 def reload_df():
-    try:
-        st.session_state.df_cache = clear_sheet_cache_and_reload()
-    except Exception as e:
-        st.warning(f"Gagal reload sheet: {e}")
-        st.session_state.df_cache = pd.DataFrame()
+    """Paksa fetch ulang Order di rerun berikutnya (untuk semua sesi)."""
+    clear_all_caches()
+    get_store().bump(SHEET_ORDER)
 
 # ------------------- UPDATE SHEET -------------------
 def update_sheet_row_by_nota(sheet_name, nota, updates: dict):
     try:
-        ws = get_worksheet(sheet_name)
-        cell = ws.find(str(nota))
-        if not cell:
-            raise ValueError(f"Tidak ditemukan nota {nota}")
-        row = cell.row
-        headers = ws.row_values(1)
-        for k, v in updates.items():
-            if k in headers:
-                col = headers.index(k) + 1
-                ws.update_cell(row, col, v)
+        row = get_storage().update_by_key(sheet_name, "No Nota", nota, updates)
+        get_store().apply_update(sheet_name, "No Nota", nota, {k: row[k] for k in updates})
         return True
     except Exception as e:
         st.error(f"Gagal update sheet {sheet_name} untuk nota {nota}: {e}")
@@ -96,7 +124,7 @@ def format_rp(n):
         return str(n)
 
 # ------------------- WA KONFIRMASI -------------------
-def kirim_wa_konfirmasi(nama, no_nota, no_hp, total, jenis_transaksi, nama_toko):
+def kirim_wa_konfirmasi(nama, no_nota, no_hp, total, jenis_transaksi, nama_toko, auto_open=True):
     msg = f"""Halo {nama},
 Laundry anda dengan nomor Nota {no_nota} sudah selesai diproses dan siap untuk diambil. 🧺
 
@@ -105,14 +133,12 @@ Pembayaran: {jenis_transaksi}
 
 Terima Kasih,
 {nama_toko}"""
-    no_hp_clean = str(no_hp).replace("+","").replace(" ","").replace("-","")
-    if no_hp_clean.startswith("0"):
-        no_hp_clean = "62" + no_hp_clean[1:]
-    elif not no_hp_clean.startswith("62"):
-        no_hp_clean = "62" + no_hp_clean
+    no_hp_clean = normalize_hp(no_hp)
     if no_hp_clean.isdigit() and len(no_hp_clean) >= 10:
         wa_link = f"https://wa.me/{no_hp_clean}?text={urllib.parse.quote(msg)}"
         st.markdown(f"[📲 Kirim Konfirmasi Ambil]({wa_link})", unsafe_allow_html=True)
+        if not auto_open:
+            return
         js = f"""
         <script>
         setTimeout(function(){{
@@ -137,25 +163,42 @@ st.markdown(STYLE, unsafe_allow_html=True)
 
 # ------------------- DATAFRAME PREP -------------------
 def prepare_df_for_view(df):
-    for col in ["Tanggal Masuk","No Nota","Nama Pelanggan","No HP","Jenis Pakaian","Jenis Layanan","Total","Status","Status Antrian"]:
-        if col not in df.columns:
-            df[col] = ""
+    """Frame baru untuk tampilan (kolom diganti lewat assign, frame cache tidak disentuh)."""
+    missing = {col: "" for col in ["Tanggal Masuk","No Nota","Nama Pelanggan","No HP","Jenis Pakaian","Jenis Layanan","Total","Status","Status Antrian"] if col not in df.columns}
+    df = df.assign(**missing)
     # isi Status Antrian default dari Status lama jika kosong
-    df["Status Antrian"] = df["Status Antrian"].fillna("").astype(str).str.strip()
-    mask_copy = (df["Status Antrian"] == "") & (df["Status"].astype(str).str.strip() != "")
-    df.loc[mask_copy, "Status Antrian"] = df.loc[mask_copy, "Status"]
-    df["Tanggal_parsed"] = pd.to_datetime(df["Tanggal Masuk"].astype(str).str[:10], errors="coerce", dayfirst=True)
-    return df
+    antrian = df["Status Antrian"].astype(object).fillna("").astype(str).str.strip()
+    status = df["Status"].astype(object).fillna("").astype(str).str.strip()
+    antrian = antrian.where(~((antrian == "") & (status != "")), status)
+    if "Tanggal Parsed" in df.columns:
+        tanggal = df["Tanggal Parsed"]
+    else:
+        tanggal = pd.to_datetime(df["Tanggal Masuk"].astype(str).str[:10], errors="coerce", dayfirst=True)
+    return df.assign(**{"Status Antrian": antrian.astype("category"), "Tanggal_parsed": tanggal})
 
 # ------------------- RENDER CARD -------------------
+# Rerun sebagian (streamlit >= 1.37 st.fragment, 1.33 experimental_fragment); versi lama → fungsi biasa
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+CARD_STATUS_PREFIX = "card_status_"
+
+def set_card_status(no_nota, status):
+    """Status baru kartu (dipakai saat kartu rerun sendiri, sebelum halaman dimuat ulang)."""
+    st.session_state[f"{CARD_STATUS_PREFIX}{no_nota}"] = status
+
+def clear_card_status():
+    for k in [k for k in st.session_state if str(k).startswith(CARD_STATUS_PREFIX)]:
+        del st.session_state[k]
+
+@fragment
 def render_card_entry(row, cfg, active_status):
+    """Satu kartu = satu fragment: klik tombol hanya merender ulang kartu ini."""
     no_nota = row.get("No Nota","")
     nama = row.get("Nama Pelanggan","")
     no_hp = row.get("No HP","")
     jenis_pakaian = row.get("Jenis Pakaian","")
     jenis_layanan = row.get("Jenis Layanan","")
     total = format_rp(row.get("Total",0))
-    status_antrian = (row.get("Status Antrian") or "").strip()
+    status_antrian = st.session_state.get(f"{CARD_STATUS_PREFIX}{no_nota}", (row.get("Status Antrian") or "").strip())
     jenis_transaksi = row.get("Jenis Transaksi","Cash")
 
     header_label = f"🧾 {no_nota} — {nama} — {jenis_pakaian} ({status_antrian or 'Antrian'})"
@@ -170,35 +213,37 @@ def render_card_entry(row, cfg, active_status):
         # ---------- ACTIONS ----------
         # Antrian → Siap Diambil
         if (status_antrian == "" or status_antrian.lower() == "antrian") and active_status=="Antrian":
-            if st.button("✅ Siap Diambil (Simpan & Kirim WA)", key=f"ambil_{no_nota}"):
+            if st.button("✅ Siap Diambil (Simpan & Kirim WA)", key=f"ambil_{no_nota}_{row.name}"):
                 updates = {
                     "Status Antrian": "Siap Diambil",
                     "Status": "Siap Diambil",
-                    "Jenis Transaksi": jenis_transaksi
+                    "Jenis Transaksi": jenis_transaksi,
+                    "Tanggal Siap": get_waktu_jakarta().strftime("%d/%m/%Y - %H:%M"),
                 }
-                ok = update_sheet_row_by_nota(SHEET_ORDER, no_nota, updates)
+                ok, ganda = ubah_status(no_nota, updates)
                 if ok:
-                    read_sheet_once.clear()
-                    reload_df()
-                    kirim_wa_konfirmasi(nama, no_nota, no_hp, total, jenis_transaksi, cfg['nama_toko'])
-                    st.success(f"Nota {no_nota} → Siap Diambil")
+                    set_card_status(no_nota, "Siap Diambil")
+                    # pengiriman ulang: link tetap ada, WA tidak dibuka otomatis lagi
+                    kirim_wa_konfirmasi(nama, no_nota, no_hp, total, jenis_transaksi, cfg['nama_toko'], auto_open=not ganda)
+                    if ganda:
+                        st.info(f"Nota {no_nota} sudah Siap Diambil — klik ganda diabaikan.")
+                    else:
+                        st.success(f"Nota {no_nota} → Siap Diambil")
 
         # Siap Diambil → Selesai / Batal
         elif status_antrian.lower() == "siap diambil" and active_status=="Siap Diambil":
             c1,c2 = st.columns(2)
             with c1:
-                if st.button("✔️ Selesai", key=f"selesai_{no_nota}"):
-                    ok = update_sheet_row_by_nota(SHEET_ORDER, no_nota, {"Status Antrian":"Selesai","Status":"Selesai"})
+                if st.button("✔️ Selesai", key=f"selesai_{no_nota}_{row.name}"):
+                    ok, _ = ubah_status(no_nota, {"Status Antrian":"Selesai","Status":"Selesai"})
                     if ok:
-                        read_sheet_once.clear()
-                        reload_df()
+                        set_card_status(no_nota, "Selesai")
                         st.success(f"Nota {no_nota} → Selesai")
             with c2:
-                if st.button("❌ Batal", key=f"batal_{no_nota}"):
-                    ok = update_sheet_row_by_nota(SHEET_ORDER, no_nota, {"Status Antrian":"Batal","Status":"Batal"})
+                if st.button("❌ Batal", key=f"batal_{no_nota}_{row.name}"):
+                    ok, _ = ubah_status(no_nota, {"Status Antrian":"Batal","Status":"Batal"})
                     if ok:
-                        read_sheet_once.clear()
-                        reload_df()
+                        set_card_status(no_nota, "Batal")
                         st.warning(f"Nota {no_nota} → Batal")
         else:
             st.info(f"📌 Status Antrian: {status_antrian or 'Antrian'}")
@@ -207,16 +252,31 @@ def render_card_entry(row, cfg, active_status):
 def show():
     cfg = load_config()
     st.title("📱 Pelanggan — Status Laundry & Kirim WA")
+    # rerun penuh: data snapshot sudah terbaru, status sementara kartu dibuang
+    clear_card_status()
 
     # reload
     colr,colr2 = st.columns([1,4])
     with colr:
         if st.button("🔄 Reload Data"):
-            read_sheet_once.clear()
             reload_df()
             st.rerun()
+    with colr2:
+        # storage lokal: baca penuh sudah murah, paging per baris sheet tidak perlu
+        paging = get_storage().remote and st.toggle("⚡ Mode hemat data (muat per halaman)", value=True, key="paging_mode")
 
-    df = load_df()
+    if paging:
+        # hanya indeks status yang dibaca penuh; isi kartu diambil per halaman
+        try:
+            df = load_status_index()
+        except Exception as e:
+            st.warning(f"Gagal membaca indeks sheet: {e}")
+            df = pd.DataFrame(columns=INDEX_COLS + ["_row"])
+    else:
+        df = load_df()
+    data_key = f"{SHEET_ORDER}:index" if paging else SHEET_ORDER
+    show_data_age(data_key)
+    overdue_idx = get_overdue_index(df, (data_key,) + tuple(get_store().info(data_key)[:2]))
     df = prepare_df_for_view(df)
 
     # statistics
@@ -231,7 +291,17 @@ def show():
     s3.markdown(f'<div class="stat-card card-green">✅<br>Selesai<br><div style="font-size:18px">{total_selesai}</div></div>',unsafe_allow_html=True)
     s4.markdown(f'<div class="stat-card card-red">❌<br>Batal<br><div style="font-size:18px">{total_batal}</div></div>',unsafe_allow_html=True)
 
-    tab_antrian,tab_siap,tab_selesai,tab_batal = st.tabs(["🕒 Antrian","📢 Siap Diambil","✅ Selesai","❌ Batal"])
+    # terlambat / jatuh tempo / belum diambil (indeks Estimasi Selesai)
+    now = now_jakarta()
+    jam_tempo = st.session_state.get("tempo_jam", 3)
+    hari_ambil = st.session_state.get("ambil_hari", 3)
+    n_telat, n_segera, n_belum = overdue_idx.counts(now, jam_tempo, hari_ambil)
+    o1,o2,o3 = st.columns(3)
+    o1.metric("⏰ Lewat Estimasi", n_telat)
+    o2.metric(f"⌛ Jatuh Tempo ≤ {jam_tempo} Jam", n_segera)
+    o3.metric(f"📦 Belum Diambil > {hari_ambil} Hari", n_belum)
+
+    tab_antrian,tab_siap,tab_selesai,tab_batal,tab_telat = st.tabs(["🕒 Antrian","📢 Siap Diambil","✅ Selesai","❌ Batal","⏰ Terlambat"])
 
     # filter
     with st.expander("🔧 Filter & Cari"):
@@ -245,7 +315,7 @@ def show():
         q = st.text_input("Cari Nama / Nota")
 
     def apply_filters(df_in):
-        df_out = df_in.copy()
+        df_out = df_in
         if tipe_filter=="Per Hari":
             df_out = df_out[df_out["Tanggal_parsed"].dt.date==tanggal_pilih]
         elif tipe_filter=="Per Bulan":
@@ -266,7 +336,15 @@ def show():
         page=st.number_input(f"Halaman ({active_status})", 1, pages, 1, key=f"page_{active_status}")
         start=(page-1)*per_page
         end=start+per_page
-        for idx,row in df_tab.iloc[start:end].iterrows():
+        df_page = df_tab.iloc[start:end]
+        if paging:
+            try:
+                snapshot_id = get_store().info(f"{SHEET_ORDER}:index")[:2]
+                df_page = prepare_df_for_view(read_rows_by_number(SHEET_ORDER, tuple(int(r) for r in df_page["_row"]), snapshot_id))
+            except Exception as e:
+                st.warning(f"Gagal membaca halaman: {e}")
+                return
+        for idx,row in df_page.iterrows():
             render_card_entry(row, cfg, active_status)
 
     with tab_antrian:
@@ -277,6 +355,11 @@ def show():
         show_tab(df[df["Status Antrian"].str.lower()=="selesai"], "Selesai")
     with tab_batal:
         show_tab(df[df["Status Antrian"].str.lower()=="batal"], "Batal")
+    with tab_telat:
+        c1,c2 = st.columns(2)
+        c1.number_input("Jatuh tempo dalam (jam)", 1, 72, 3, key="tempo_jam")
+        c2.number_input("Belum diambil lebih dari (hari)", 1, 60, 3, key="ambil_hari")
+        render_overdue_tab(overdue_idx, now, jam_tempo, hari_ambil, cfg["nama_toko"])
 
 if __name__=="__main__":
     show()
@@ -0,0 +1,428 @@
+# ===================== RECONCILE.PY (Cocokkan Sheet vs Data Lokal per Bulan) =====================
+import threading
+from collections import Counter
+import numpy as np
+import pandas as pd
+import streamlit as st
+from Customer import parse_rp
+from Schema import WRITE_SCHEMA, parse_waktu
+from Freshness import drive_modified_time
+from Sheets import get_spreadsheet, get_worksheet, col_letter, render_option
+from Snapshot import get_store
+from Storage import get_storage, storage_kind
+
+# Kolom yang dibandingkan per sheet (kolom bool/ISO/turunan tidak ikut)
+RECONCILE_SPECS = {
+    "Order": {
+        "key": "No Nota", "date": "Tanggal Masuk",
+        "cols": ["No Nota", "Tanggal Masuk", "Estimasi Selesai", "Nama Pelanggan", "No HP", "Jenis Pakaian",
+                 "Jenis Layanan", "Berat (Kg)", "Harga per Kg", "Subtotal", "Diskon", "Total", "Parfum",
+                 "Jenis Transaksi"],
+    },
+    "Pengeluaran": {
+        "key": None, "date": "Tanggal",
+        "cols": ["Tanggal", "Keterangan", "Nominal", "Jenis", "Jenis Transaksi"],
+    },
+}
+
+# Jenis masalah
+HILANG = "Hilang di sheet"
+GANDA = "Ganda di sheet"
+BEDA = "Isi berbeda"
+
+# ------------------- SUMBER LOKAL -------------------
+# Baris lokal wajib ada di sheet (lokal = sumber kebenaran baris itu, mis. cache/outbox).
+# Sheet boleh punya baris lain. Salinan sheet itu sendiri (snapshot) bukan sumber:
+# ia diisi ulang dari sheet, jadi selalu "cocok".
+LOCAL_SOURCES = []
+
+def _storage_append(sheet, row):
+    return get_storage().append(sheet, {k: v for k, v in row.items() if k in WRITE_SCHEMA[sheet]})
+
+def register_source(sheet, name, loader, on_written=None, write=_storage_append):
+    """
+    Daftarkan sumber lokal: loader() → DataFrame baris (kolom sama dengan sheet).
+    write(sheet, baris lokal) menulis satu baris yang hilang di sheet lewat storage;
+    hasil falsy = belum tertulis. on_written(index) dipanggil sesudah baris lokal
+    (index loader) ditulis ulang.
+    """
+    LOCAL_SOURCES[:] = [s for s in LOCAL_SOURCES if s["name"] != name]
+    LOCAL_SOURCES.append({"sheet": sheet, "name": name, "loader": loader, "on_written": on_written, "write": write})
+
+def _expense_cache():
+    from Expense import load_local_data
+    return load_local_data()
+
+
+def _expense_upload(sheet, row):
+    # klaim yang sama dengan simpan & sinkronisasi cache → tidak ganda dengan sesi lain
+    from Expense import upload_row
+    written, ganda = upload_row(row)
+    return None if ganda else written
+
+def _expense_uploaded(index):
+    # tandai terupload supaya sync_local_cache tidak menulis ulang (baris ganda)
+    from Expense import load_local_data, save_local_data
+    df = load_local_data()
+    df.loc[df.index.isin(index), "uploaded"] = True
+    save_local_data(df)
+
+def _sqlite_rows(sheet):
+    return lambda: get_storage().local_rows(sheet)
+
+def _sqlite_resend(sheet, row):
+    # baris sudah ada di SQLite → antrikan ulang lewat outbox (Replicator: urutan + penanda replika)
+    return get_storage().resend(sheet, int(row["_id"]))
+
+register_source("Pengeluaran", "Cache CSV Pengeluaran", _expense_cache, _expense_uploaded, write=_expense_upload)
+if storage_kind() == "sqlite":
+    # SQLite = sumber kebenaran; sheet hanya replika → tulisan lokal yang sudah terkirim wajib ada di sheet
+    register_source("Order", "SQLite utama Order", _sqlite_rows("Order"), write=_sqlite_resend)
+    register_source("Pengeluaran", "SQLite utama Pengeluaran", _sqlite_rows("Pengeluaran"), write=_sqlite_resend)
+
+# ------------------- BENTUK BAKU & DIGEST -------------------
+def _teks(s):
+    return s.astype(object).where(s.notna(), "").astype(str).str.strip()
+
+def _tanggal(s, fmt):
+    """Teks tanggal → bentuk tampilan baku; yang tidak bisa diparse dibiarkan apa adanya."""
+    def one(v):
+        try:
+            return parse_waktu(v).strftime(fmt)
+        except ValueError:
+            return v
+    teks = _teks(s)
+    uniq = pd.unique(teks)
+    return teks.map(dict(zip(uniq, [one(v) if v else "" for v in uniq]))).astype(object).fillna("").astype(str)
+
+def _angka(s):
+    num = pd.to_numeric(s, errors="coerce")
+    sisa = num.isna() & _teks(s).ne("")
+    if sisa.any():
+        num[sisa] = s[sisa].map(parse_rp)
+    return num.fillna(0).astype("float64")
+
+def canonical_rows(df, sheet):
+    """
+    Baris → frame baku untuk dibandingkan (rupiah int, kg gram int, tanggal teks baku,
+    teks di-strip) + kolom 'bulan' (YYYY-MM) dan '_h' (hash isi baris, uint64).
+    """
+    spec = RECONCILE_SPECS[sheet]
+    schema = WRITE_SCHEMA[sheet]
+    out = {}
+    for col in spec["cols"]:
+        s = df[col] if col in df.columns else pd.Series("", index=df.index)
+        tipe = schema.get(col, "text")
+        if tipe == "rupiah":
+            out[col] = _angka(s).round().astype("int64")
+        elif tipe == "kg":
+            out[col] = (_angka(s).round(3) * 1000).round().astype("int64")
+        elif tipe == "tanggal":
+            out[col] = _tanggal(s, "%d/%m/%Y")
+        elif tipe == "waktu":
+            out[col] = _tanggal(s, "%d/%m/%Y - %H:%M")
+        else:
+            out[col] = _teks(s)
+    canon = pd.DataFrame(out, index=df.index)
+    tgl = pd.to_datetime(canon[spec["date"]].str.split(" - ").str[0], format="%d/%m/%Y", errors="coerce")
+    canon["bulan"] = tgl.dt.strftime("%Y-%m").fillna("????")
+    canon["_h"] = pd.util.hash_pandas_object(canon[spec["cols"]], index=False).to_numpy(np.uint64)
+    return canon
+
+def month_digests(canon):
+    """{bulan: (jumlah baris, jumlah hash mod 2^64)} — tidak bergantung urutan, baris ganda ikut terhitung."""
+    if canon.empty:
+        return {}
+    bulan = canon["bulan"].to_numpy()
+    h = canon["_h"].to_numpy(np.uint64)
+    order = np.argsort(bulan, kind="stable")
+    bulan, h = bulan[order], h[order]
+    starts = np.flatnonzero(np.r_[True, bulan[1:] != bulan[:-1]])
+    sums = np.add.reduceat(h, starts)
+    counts = np.diff(np.r_[starts, len(bulan)])
+    return {b: (int(c), int(s)) for b, c, s in zip(bulan[starts], counts, sums)}
+
+# ------------------- BACA RANGED PER BULAN -------------------
+def _kosong_baku(sheet):
+    return canonical_rows(pd.DataFrame(columns=RECONCILE_SPECS[sheet]["cols"]), sheet).assign(_row=pd.Series(dtype="int64"))
+
+def _sheet_layout(sheet):
+    """
+    (ws, header, Series bulan, Series teks tanggal) per nomor baris sheet —
+    hanya kolom tanggal yang diunduh.
+    """
+    spec = RECONCILE_SPECS[sheet]
+    ws = get_worksheet(sheet)
+    header = ws.row_values(1)
+    if spec["date"] not in header:
+        return ws, header, pd.Series(dtype=object), pd.Series(dtype=object)
+    L = col_letter(header.index(spec["date"]) + 1)
+    tanggal = pd.Series([r[0] if r else "" for r in ws.get(f"{L}2:{L}")], dtype=object)
+    tgl = pd.to_datetime(_tanggal(tanggal, "%d/%m/%Y").str.split(" - ").str[0], format="%d/%m/%Y", errors="coerce")
+    bulan = tgl.dt.strftime("%Y-%m").fillna("????")
+    bulan.index = tanggal.index = bulan.index + 2
+    return ws, header, bulan, tanggal
+
+def _read_rows(ws, header, sheet, rows):
+    """Baris lengkap nomor rows (satu batch_get, baris berurutan digabung per blok) → frame baku + '_row'."""
+    if not rows:
+        return _kosong_baku(sheet)
+    blocks = []
+    for r in rows:
+        if blocks and r == blocks[-1][1] + 1:
+            blocks[-1][1] = r
+        else:
+            blocks.append([r, r])
+    last = col_letter(len(header))
+    res = ws.batch_get([f"A{a}:{last}{b}" for a, b in blocks], value_render_option=render_option(sheet))
+    records, nomor = [], []
+    for (a, b), vr in zip(blocks, res):
+        for i in range(b - a + 1):
+            values = vr[i] if i < len(vr) else []
+            records.append(dict(zip(header, values)))
+            nomor.append(a + i)
+    canon = canonical_rows(pd.DataFrame(records, columns=header), sheet)
+    canon["_row"] = nomor
+    return canon
+
+def read_month_rows(sheet, months):
+    """
+    DRILL-DOWN: baris sheet LIVE untuk bulan tertentu saja. Satu kolom tanggal dibaca
+    untuk memetakan bulan → nomor baris, lalu hanya blok baris bulan itu yang diunduh.
+    Return frame baku + '_row' (nomor baris sheet).
+    """
+    ws, header, bulan, _ = _sheet_layout(sheet)
+    rows = bulan.index[bulan.isin(months)].tolist()
+    canon = _read_rows(ws, header, sheet, rows)
+    return canon[canon["bulan"].isin(months)]
+
+@st.cache_resource(show_spinner=False)
+def _month_cache():
+    """{sheet: (modifiedTime spreadsheet, {bulan: frame baku})} per proses — isi bulan sheet yang sudah dibaca."""
+    return {"lock": threading.Lock(), "sheets": {}}
+
+def _sheet_token():
+    """modifiedTime spreadsheet (Drive); None bila tidak bisa dicek → cache bulan tidak dipakai."""
+    try:
+        return drive_modified_time(get_spreadsheet())
+    except Exception as e:
+        print("Cek modifiedTime gagal:", e)
+        return None
+
+def sheet_month_rows(sheet, months, fresh=False):
+    """
+    Frame baku baris sheet untuk bulan months, untuk digest sisi sheet.
+    Isi bulan yang sudah pernah dibaca dipakai ulang selama modifiedTime spreadsheet
+    sama (tidak ada tulis / edit sel apa pun sejak dibaca). Berubah, tidak bisa dicek,
+    atau fresh=True → bulan dibaca ulang: kolom tanggal untuk peta bulan → nomor baris,
+    lalu hanya blok baris bulan yang diminta (ranged).
+    """
+    months = sorted(months)
+    cache = _month_cache()
+    token = _sheet_token()  # sebelum isi dibaca: tulis di tengah jalan → token berikutnya beda
+    with cache["lock"]:
+        tok, per_bulan = cache["sheets"].get(sheet, (None, {}))
+        per_bulan = {} if fresh or token is None or tok != token else dict(per_bulan)
+    baca = [b for b in months if b not in per_bulan]
+    if baca:
+        ws, header, bulan, _ = _sheet_layout(sheet)
+        canon = _read_rows(ws, header, sheet, bulan.index[bulan.isin(baca)].tolist())
+        for b in baca:
+            per_bulan[b] = canon[canon["_row"].isin(bulan.index[bulan == b])]
+        if token is not None:
+            with cache["lock"]:
+                tok, lama = cache["sheets"].get(sheet, (None, {}))
+                cache["sheets"][sheet] = (token, {**(lama if tok == token else {}), **per_bulan})
+    frames = [per_bulan[b] for b in months]
+    return pd.concat(frames, ignore_index=True) if frames else _kosong_baku(sheet)
+
+# ------------------- BANDINGKAN -------------------
+def _issue(bulan, jenis, kunci, detail, local_raw=None, i=None, sheet_rows=(), h=None, keep=0):
+    """Satu masalah; GANDA membawa nomor baris yang dihapus + hash isinya + jumlah salinan yang disisakan."""
+    row = local_raw.loc[i].to_dict() if i is not None else None
+    return {
+        "Bulan": bulan, "Masalah": jenis, "Kunci": kunci, "Detail": detail, "_local": row, "_idx": i,
+        "_rows": [int(r) for r in sheet_rows], "_h": None if h is None else int(h), "_keep": keep,
+    }
+
+def diff_month(sheet, bulan, local, remote, local_raw):
+    """Bandingkan baris satu bulan (frame baku) → list masalah."""
+    key = RECONCILE_SPECS[sheet]["key"]
+    issues = []
+    if key:
+        lg = local.groupby(key)
+        rg = {k: g for k, g in remote.groupby(key)}
+        for k, g in lg:
+            r = rg.get(k)
+            if r is None:
+                issues.append(_issue(bulan, HILANG, k, "ada di lokal, tidak ada di sheet", local_raw, g.index[0]))
+                continue
+            if len(r) > 1:
+                sama = r["_h"].nunique() == 1
+                issues.append(_issue(bulan, GANDA, k, f"{len(r)} baris di sheet" + ("" if sama else " (isi berbeda)"),
+                                     sheet_rows=r["_row"].tolist()[1:] if sama else (), h=r["_h"].iloc[0], keep=1))
+            if not r["_h"].isin(g["_h"]).any():
+                beda = [c for c in RECONCILE_SPECS[sheet]["cols"] if str(g[c].iloc[0]) != str(r[c].iloc[0])]
+                issues.append(_issue(bulan, BEDA, k, "kolom: " + ", ".join(beda), local_raw, g.index[0]))
+        return issues
+
+    # tanpa kunci: bandingkan multiset hash isi baris
+    lc = local["_h"].value_counts()
+    rc = remote["_h"].value_counts()
+    label = lambda df, h: " | ".join(str(v) for v in df.loc[df["_h"] == h, RECONCILE_SPECS[sheet]["cols"]].iloc[0])
+    for h, n in lc.items():
+        m = int(rc.get(h, 0))
+        if m < n:
+            idx = local.index[local["_h"] == h]
+            for i in idx[: n - m]:
+                issues.append(_issue(bulan, HILANG, label(local, h), "ada di lokal, tidak ada di sheet", local_raw, i))
+        elif m > n:
+            rows = remote.loc[remote["_h"] == h, "_row"].tolist()
+            issues.append(_issue(bulan, GANDA, label(remote, h), f"{m} baris di sheet, {n} di lokal",
+                                 sheet_rows=rows[n:], h=h, keep=n))
+    return issues
+
+def reconcile_source(src, fresh=False):
+    """
+    Satu sumber lokal: digest per bulan lokal vs sheet. Sisi sheet dibaca ranged hanya
+    untuk bulan yang ada di lokal (sheet_month_rows: dari cache bila sheet tidak berubah),
+    digest hanya atas baris sheet yang hash-nya ada di lokal (sheet boleh punya baris lain).
+    Bulan yang berbeda dibaca live dan dibandingkan per baris.
+    """
+    sheet = src["sheet"]
+    local_raw = src["loader"]()
+    if local_raw is None or local_raw.empty:
+        return {"sumber": src["name"], "sheet": sheet, "bulan": 0, "beda": [], "issues": []}
+    local_raw = local_raw.reset_index(drop=True)
+    local = canonical_rows(local_raw, sheet)
+    local_dig = month_digests(local)
+    months = set(local_dig)
+    remote_canon = sheet_month_rows(sheet, months, fresh=fresh)
+    remote_dig = month_digests(remote_canon[remote_canon["_h"].isin(local["_h"])])
+    beda = sorted(b for b in months if local_dig.get(b) != remote_dig.get(b))
+
+    issues = []
+    if beda:
+        live = read_month_rows(sheet, beda)
+        for b in beda:
+            issues += diff_month(sheet, b, local[local["bulan"] == b], live[live["bulan"] == b], local_raw)
+    return {"sumber": src["name"], "sheet": sheet, "bulan": len(months), "beda": beda, "issues": issues}
+
+def run_reconcile(fresh=False):
+    return [reconcile_source(src, fresh=fresh) for src in LOCAL_SOURCES]
+
+# ------------------- PERBAIKI -------------------
+class SheetMoved(RuntimeError):
+    """Sheet berubah sejak cek (baris ditambah / dihapus / diedit) → perbaikan dibatalkan."""
+
+def _blocks(rows):
+    """Nomor baris → blok berurutan [(awal, akhir)], dari bawah (hapus tidak menggeser blok berikutnya)."""
+    blocks = []
+    for r in sorted(rows):
+        if blocks and r == blocks[-1][1] + 1:
+            blocks[-1][1] = r
+        else:
+            blocks.append([r, r])
+    return [tuple(b) for b in reversed(blocks)]
+
+def delete_duplicates(sheet, ganda):
+    """
+    Hapus baris ganda hasil cek. Bulan terkait dibaca ulang live dulu: tiap baris yang
+    akan dihapus harus masih berisi hash yang sama dan salinan yang tersisa ≥ _keep;
+    bila tidak → SheetMoved, tidak ada yang dihapus. Dihapus per blok dari bawah,
+    lalu jumlah salinan dicek sekali lagi. Return (jumlah dihapus, cek akhir cocok).
+    """
+    months = sorted({it["Bulan"] for it in ganda})
+    live = read_month_rows(sheet, months)
+    isi = {int(r): int(h) for r, h in zip(live["_row"], live["_h"])}
+    jumlah = Counter(isi.values())
+    hapus, keep = {}, {}
+    for it in ganda:
+        for r in it["_rows"]:
+            if isi.get(r) != it["_h"]:
+                raise SheetMoved(f"Baris {r} di sheet {sheet} sudah berubah sejak dicek")
+        hapus.setdefault(it["_h"], set()).update(it["_rows"])
+        keep[it["_h"]] = max(keep.get(it["_h"], 0), it["_keep"])
+    for h, rows in hapus.items():
+        if jumlah[h] - len(rows) < max(keep[h], 1):
+            raise SheetMoved(f"Salinan di sheet {sheet} tinggal {jumlah[h]}, tidak ada yang ganda lagi")
+    ws = get_worksheet(sheet)
+    rows = set().union(*hapus.values())
+    for a, b in _blocks(rows):
+        ws.delete_rows(a, b)
+    sisa = Counter(int(h) for h in read_month_rows(sheet, months)["_h"])
+    return len(rows), all(sisa[h] == jumlah[h] - len(rs) for h, rs in hapus.items())
+
+def repair(result, fix_missing=True, fix_duplicates=True):
+    """
+    Baris hilang ditulis lewat storage (write sumber), baris ganda identik dihapus
+    sesudah dicek ulang (delete_duplicates), lalu snapshot sheet dimuat ulang.
+    Return ringkasan jumlah tindakan.
+    """
+    sheet = result["sheet"]
+    src = next((s for s in LOCAL_SOURCES if s["name"] == result["sumber"]), None)
+    done = {"ditulis": 0, "dihapus": 0, "dimuat_ulang": False, "cek_akhir": True}
+    try:
+        if fix_missing and src:
+            ditulis = []
+            try:
+                for it in result["issues"]:
+                    if it["Masalah"] == HILANG and it["_local"] and src["write"](sheet, it["_local"]):
+                        ditulis.append(it["_idx"])
+            finally:
+                done["ditulis"] = len(ditulis)
+                if ditulis and src.get("on_written"):
+                    src["on_written"](ditulis)
+        if fix_duplicates:
+            ganda = [it for it in result["issues"] if it["Masalah"] == GANDA and it["_rows"]]
+            if ganda:
+                done["dihapus"], done["cek_akhir"] = delete_duplicates(sheet, ganda)
+    finally:
+        if done["ditulis"] or done["dihapus"]:
+            get_store().bump(sheet)
+            done["dimuat_ulang"] = True
+    return done
+
+# ------------------- TAMPILAN -------------------
+def show_reconcile():
+    """Bagian Rekonsiliasi di halaman Admin."""
+    st.subheader("🔍 Rekonsiliasi Sheet vs Data Lokal")
+    st.caption(
+        "Digest isi per bulan dibandingkan dulu; hanya bulan yang berbeda yang dibaca ulang dari sheet "
+        "dan dicek per baris (hilang, ganda, isi berbeda)."
+    )
+    c1, c2 = st.columns(2)
+    cek = c1.button("🔍 Cek Rekonsiliasi")
+    penuh = c2.button("🔁 Cek Ulang Penuh", help="Abaikan cache bulan: semua bulan dibaca ulang dari sheet")
+    if cek or penuh:
+        with st.spinner("Membandingkan..."):
+            try:
+                st.session_state["rekonsiliasi"] = run_reconcile(fresh=penuh)
+            except Exception as e:
+                st.error(f"❌ Gagal rekonsiliasi: {e}")
+    hasil = st.session_state.get("rekonsiliasi")
+    if not hasil:
+        return
+    for i, res in enumerate(hasil):
+        st.markdown(f"**{res['sumber']}** → sheet {res['sheet']}: {res['bulan']} bulan dicek, {len(res['beda'])} berbeda")
+        if not res["issues"]:
+            st.success("✅ Cocok.")
+            continue
+        tabel = pd.DataFrame([{k: v for k, v in it.items() if not k.startswith("_")} for it in res["issues"]])
+        st.dataframe(tabel, use_container_width=True, hide_index=True)
+        c1, c2 = st.columns(2)
+        fix_missing = c1.checkbox("Tulis baris yang hilang ke sheet", value=True, key=f"rek_hilang_{i}")
+        fix_dup = c2.checkbox("Hapus baris ganda identik di sheet", value=False, key=f"rek_ganda_{i}")
+        if st.button("🛠️ Perbaiki", key=f"rek_fix_{i}"):
+            try:
+                done = repair(res, fix_missing=fix_missing, fix_duplicates=fix_dup)
+                st.success(f"✅ {done['ditulis']} baris ditulis, {done['dihapus']} baris ganda dihapus"
+                           + (", data dimuat ulang." if done["dimuat_ulang"] else "."))
+                if not done["cek_akhir"]:
+                    st.warning("⚠️ Jumlah baris sesudah hapus tidak sesuai perkiraan (sheet diubah bersamaan?) — cek ulang.")
+                st.session_state.pop("rekonsiliasi", None)
+            except SheetMoved as e:
+                st.warning(f"⚠️ {e}. Tidak ada baris yang dihapus — jalankan Cek Rekonsiliasi lagi.")
+                st.session_state.pop("rekonsiliasi", None)
+            except Exception as e:
+                st.error(f"❌ Gagal memperbaiki: {e}")
@@ -4,94 +4,68 @@ import pandas as pd
 import datetime
 import json
 import os
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import requests
 from Setting import load_config as load_setting_config
+from Storage import get_storage
+from Schema import memory_report, as_str_frame
+from Snapshot import get_store, show_data_age
+from Table import render_table
+from Customer import customer_analytics
 # ------------------- CONFIG -------------------
 CONFIG_FILE = "config.json"
-SPREADSHEET_ID = "1v_3sXsGw9lNmGPSbIHytYzHzPTxa4yp4HhfS9tgXweA"
 SHEET_ORDER = "Order"
 SHEET_PENGELUARAN = "Pengeluaran"
 
-# ------------------- AUTH GOOGLE -------------------
-# ------------------- AUTH GOOGLE (FAST + CACHE) -------------------
-@st.cache_resource(show_spinner=False)
-def authenticate_google():
-    """
-    Auth Google hanya sekali (di-cache) → tidak lemot tiap reload.
-    """
-    creds_dict = st.secrets["gcp_service_account"]
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    credentials = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-    client = gspread.authorize(credentials)
-    return client
-
-def get_worksheet(sheet_name):
-    client = authenticate_google()
-    sh = client.open_by_key(SPREADSHEET_ID)
-    return sh.worksheet(sheet_name)
-
-def read_sheet(sheet_name):
+# Kolom yang dipakai laporan (hanya kolom ini yang diunduh)
+ORDER_COLS = [
+    "No Nota", "Tanggal Masuk", "Nama Pelanggan", "No HP", "Jenis Pakaian", "Jenis Layanan",
+    "Berat (Kg)", "Harga per Kg", "Total", "Parfum", "Jenis Transaksi", "Status"
+]
+PENGELUARAN_COLS = ["Tanggal", "Keterangan", "Nominal", "Jenis Transaksi"]
+
+# ------------------- BACA DATA (1x round trip) -------------------
+def berat_display(f):
+    # 2,5 → "2,5" ; 3,0 → "3" (koma desimal, nol di belakang dibuang)
+    s = f"{float(f):.2f}".rstrip("0").rstrip(".")
+    return s.replace(".", ",")
+
+def read_report_data():
     """
-    Membaca sheet Google dan memastikan angka desimal.
-    Untuk kolom 'Berat (Kg)', paksa 2 digit jadi koma jika perlu.
+    Order + Pengeluaran dalam satu values_batch_get (storage Sheets), hanya kolom laporan.
+    Angka sudah dibersihkan (termasuk fix berat koma). Disimpan di snapshot bersama.
     """
     try:
-        ws = get_worksheet(sheet_name)
-        all_values = ws.get_all_values()
-        if not all_values:
-            return pd.DataFrame()
-        
-        header = all_values[0]
-        data = all_values[1:]
-        df = pd.DataFrame(data, columns=header)
-
-        def normalize_angka(x, is_berat=False):
-            s = str(x).strip().replace(",", ".")
-            s = "".join([c for c in s if c.isdigit() or c == "."])
-            if s == "":
-                return 0.0
-            f = float(s)
-            if is_berat:
-                # paksa koma jika dua digit tanpa titik
-                if f >= 10 and f < 100 and "." not in s:
-                    f = f / 10
-            return f
-
-        for col in ["Berat (Kg)", "Harga", "Total", "Subtotal", "Diskon", "Nominal", "Harga per Kg"]:
-            if col in df.columns:
-                is_berat = col == "Berat (Kg)"
-                df[col] = df[col].apply(lambda x: normalize_angka(x, is_berat=is_berat))
-
-        # Buat kolom display Berat (Kg) dengan koma
-        if "Berat (Kg)" in df.columns:
-            def berat_display(f):
-                if f < 10:
-                    return str(int(f))  # 1 digit → tampil apa adanya
-                else:
-                    # 2 digit atau lebih → paksa koma
-                    s = f"{f:.1f}".replace(".", ",")
-                    return s
-            df["BeratDisplay"] = df["Berat (Kg)"].apply(berat_display)
-
-        # Pastikan kolom string tetap aman
-        for col in df.columns:
-            if df[col].dtype == object:
-                df[col] = df[col].astype(str)
-
-        return df
-
+        df_order, df_pengeluaran = get_store().get_many(
+            [(f"{SHEET_ORDER}:report", SHEET_ORDER, ORDER_COLS), (f"{SHEET_PENGELUARAN}:report", SHEET_PENGELUARAN, PENGELUARAN_COLS)],
+            lambda: get_storage().read_many([
+                (SHEET_ORDER, ORDER_COLS),
+                (SHEET_PENGELUARAN, PENGELUARAN_COLS),
+            ]),
+        )
     except Exception as e:
-        st.warning(f"Gagal membaca sheet {sheet_name}: {e}")
-        return pd.DataFrame()
+        st.warning(f"Gagal membaca sheet: {e}")
+        return pd.DataFrame(), pd.DataFrame()
+    return df_order, df_pengeluaran
 
 # ------------------- UTIL -------------------
 
 
+@st.cache_resource(max_entries=4, show_spinner=False)
+def laporan_csv(_df, filter_key, snapshot_id):
+    """CSV laporan sekali per (filter, versi data), bukan di setiap rerun."""
+    df_csv = _df.assign(**{"Berat (Kg)": _df["Berat (Kg)"].apply(berat_display)})
+    return df_csv.to_csv(index=False, sep=";", decimal=",").encode("utf-8")
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def analitik_pelanggan(_df, snapshot_id, today):
+    """Analitik pelanggan seluruh riwayat, dihitung sekali per (versi data, hari)."""
+    return customer_analytics(_df, today)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def laporan_memori(_df, snapshot_id):
+    """Perbandingan memori tipe ringkas vs semua str, sekali per versi data (bukan tiap rerun)."""
+    return memory_report(as_str_frame(_df), _df)
+
 def format_rp(n):
     try:
         nnum = float(n)
@@ -116,41 +90,41 @@ def show():
     st.title(f"📊 Laporan Laundry — {cfg['nama_toko']}")
 
     today = get_internet_date()
-    df_order = read_sheet(SHEET_ORDER)
-    df_pengeluaran = read_sheet(SHEET_PENGELUARAN)
+    df_order, df_pengeluaran = read_report_data()
+    show_data_age(f"{SHEET_ORDER}:report", f"{SHEET_PENGELUARAN}:report")
 
     if df_order.empty and df_pengeluaran.empty:
         st.info("Belum ada data transaksi laundry.")
         return
 
-    # Parse tanggal
-    if not df_order.empty and "Tanggal Masuk" in df_order.columns:
-        df_order["Tanggal Parsed"] = pd.to_datetime(
-            df_order["Tanggal Masuk"].str.split(" - ").str[0],
-            dayfirst=True, errors="coerce"
-        ).dt.date
-
-    if not df_pengeluaran.empty and "Tanggal" in df_pengeluaran.columns:
-        df_pengeluaran["Tanggal"] = pd.to_datetime(df_pengeluaran["Tanggal"], dayfirst=True, errors="coerce").dt.date
-
-    # Filter
+    # Filter (Tanggal Parsed sudah datetime64 dari Schema.compact_frame)
     st.sidebar.header("📅 Filter Data")
     mode = st.sidebar.radio("Mode Filter", ["Per Hari", "Per Bulan"], index=0)
 
+    def filter_hari(df, tgl):
+        return df[df["Tanggal Parsed"] == tgl] if not df.empty else pd.DataFrame()
+
+    def filter_bulan(df, th, bln):
+        if df.empty:
+            return pd.DataFrame()
+        return df[(df["Tanggal Parsed"].dt.year == th) & (df["Tanggal Parsed"].dt.month == bln)]
+
     if mode == "Per Hari":
-        tgl = st.sidebar.date_input("Tanggal", value=today)
-        df_order_f = df_order[df_order["Tanggal Parsed"] == tgl] if not df_order.empty else pd.DataFrame()
-        df_pengeluaran_f = df_pengeluaran[df_pengeluaran["Tanggal"] == tgl] if not df_pengeluaran.empty else pd.DataFrame()
+        tgl = pd.Timestamp(st.sidebar.date_input("Tanggal", value=today))
+        filter_key = ("hari", str(tgl.date()))
+        df_order_f = filter_hari(df_order, tgl)
+        df_pengeluaran_f = filter_hari(df_pengeluaran, tgl)
     else:
-        bulan_list = sorted(set(df_order["Tanggal Parsed"].dropna().map(lambda d: d.strftime("%Y-%m"))) if not df_order.empty else [])
+        bulan_list = sorted(df_order["Tanggal Parsed"].dropna().dt.strftime("%Y-%m").unique()) if not df_order.empty else []
         pilih_bulan = st.sidebar.selectbox("Pilih Bulan", ["Semua Bulan"] + bulan_list, index=0)
+        filter_key = ("bulan", pilih_bulan)
 
         if pilih_bulan == "Semua Bulan":
-            df_order_f, df_pengeluaran_f = df_order.copy(), df_pengeluaran.copy()
+            df_order_f, df_pengeluaran_f = df_order, df_pengeluaran
         else:
             th, bln = map(int, pilih_bulan.split("-"))
-            df_order_f = df_order[df_order["Tanggal Parsed"].apply(lambda d: pd.notna(d) and d.year == th and d.month == bln)]
-            df_pengeluaran_f = df_pengeluaran[df_pengeluaran["Tanggal"].apply(lambda d: pd.notna(d) and d.year == th and d.month == bln)]
+            df_order_f = filter_bulan(df_order, th, bln)
+            df_pengeluaran_f = filter_bulan(df_pengeluaran, th, bln)
 
     # Hitung laba
     total_cash = total_transfer = total_pengeluaran = 0
@@ -191,22 +165,18 @@ def show():
 
     st.divider()
 
-    # Tabel order
+    # Tabel order (per halaman, Arrow di-cache per filter + versi snapshot)
+    order_id = get_store().info(f"{SHEET_ORDER}:report")[:2]
     st.subheader("🧾 Data Transaksi Laundry")
     if not df_order_f.empty:
-        # ganti Berat (Kg) di tabel dengan display berkomanya
-        df_table = df_order_f.copy()
-        # Pakai BeratDisplay hanya untuk tampilan (jangan ubah kolom asli)
-        if "BeratDisplay" in df_table.columns:
-            df_table["Berat (Kg) (Tampil)"] = df_table["BeratDisplay"].astype(str)
-        else:
-            df_table["Berat (Kg) (Tampil)"] = df_table["Berat (Kg)"].apply(lambda x: f"{x:.1f}".replace(".", ","))
-
-        st.dataframe(df_table[[
-            "No Nota","Tanggal Masuk","Nama Pelanggan","Jenis Pakaian",
-            "Jenis Layanan","Berat (Kg) (Tampil)","Harga per Kg","Total",
-            "Parfum","Jenis Transaksi","Status"
-        ]], use_container_width=True)
+        # Berat tampil dengan koma hanya untuk tampilan (urut tetap pakai kolom angka asli)
+        render_table(
+            df_order_f, "tabel_order", filter_key, order_id,
+            ["No Nota", "Tanggal Masuk", "Nama Pelanggan", "Jenis Pakaian",
+             "Jenis Layanan", "Berat (Kg) (Tampil)", "Harga per Kg", "Total",
+             "Parfum", "Jenis Transaksi", "Status"],
+            display={"Berat (Kg) (Tampil)": ("Berat (Kg)", berat_display)},
+        )
 
     else:
         st.info("Tidak ada transaksi laundry pada periode ini.")
@@ -215,18 +185,72 @@ def show():
     st.divider()
     st.subheader("💸 Data Pengeluaran")
     if not df_pengeluaran_f.empty:
-        st.dataframe(df_pengeluaran_f[["Tanggal", "Keterangan", "Nominal", "Jenis Transaksi"]], use_container_width=True)
+        render_table(
+            df_pengeluaran_f, "tabel_pengeluaran", filter_key,
+            get_store().info(f"{SHEET_PENGELUARAN}:report")[:2],
+            ["Tanggal", "Keterangan", "Nominal", "Jenis Transaksi"],
+        )
     else:
         st.info("Tidak ada data pengeluaran.")
 
+    # Analitik pelanggan (seluruh riwayat, tidak ikut filter)
+    st.divider()
+    show_customer_analytics(df_order, order_id, today)
+
     # CSV download
     st.divider()
     if not df_order_f.empty:
-        df_csv = df_order_f.copy()
-        if "BeratDisplay" in df_csv.columns:
-            df_csv["Berat (Kg)"] = df_csv["BeratDisplay"]
-        csv = df_csv.to_csv(index=False, sep=";", decimal=",").encode("utf-8")
+        csv = laporan_csv(df_order_f, filter_key, order_id)
         st.download_button("⬇️ Download Laporan Laundry (CSV)", csv, "laporan_laundry.csv", "text/csv")
 
+    # Memori data (tipe ringkas vs semua kolom str)
+    if not df_order.empty:
+        with st.expander("🧠 Memori Data Order (per 100rb order)"):
+            rep = laporan_memori(df_order, order_id)
+            total = rep.iloc[-1]
+            st.caption(
+                f"Tipe ringkas: {total['Ringkas (MB)']:.1f} MB vs semua str: {total['Lama (MB)']:.1f} MB "
+                f"→ hemat {total['Hemat (%)']:.0f}% per 100.000 order"
+            )
+            st.dataframe(rep, use_container_width=True, hide_index=True)
+
+# ------------------- ANALITIK PELANGGAN -------------------
+def show_customer_analytics(df_order, snapshot_id, today):
+    st.subheader("👥 Analitik Pelanggan")
+    pelanggan, retensi, kurva = analitik_pelanggan(df_order, snapshot_id, today)
+    if pelanggan.empty:
+        st.info("Belum ada order dengan No HP yang valid.")
+        return
+
+    kembali = int((pelanggan["Kunjungan"] > 1).sum())
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Pelanggan", f"{len(pelanggan):,}".replace(",", "."))
+    c2.metric("Datang Lagi", f"{kembali / len(pelanggan):.0%}")
+    c3.metric("Order / Pelanggan", f"{pelanggan['Jumlah Order'].mean():.1f}")
+    c4.metric("Aktif 30 Hari", f"{int((pelanggan['Hari Sejak Terakhir'] <= 30).sum()):,}".replace(",", "."))
+
+    cols = ["Nama Pelanggan", "No HP", "Total Belanja", "Total Kg", "Kunjungan", "Hari Sejak Terakhir"]
+    t1, t2 = st.columns(2)
+    with t1:
+        st.markdown("**🏆 Top 10 Belanja**")
+        st.dataframe(pelanggan.nlargest(10, "Total Belanja")[cols], use_container_width=True, hide_index=True)
+    with t2:
+        st.markdown("**🧺 Top 10 Kg**")
+        st.dataframe(pelanggan.nlargest(10, "Total Kg")[cols], use_container_width=True, hide_index=True)
+
+    with st.expander("📋 Semua Pelanggan"):
+        render_table(
+            pelanggan, "tabel_pelanggan", ("pelanggan", str(today)), snapshot_id,
+            ["Nama Pelanggan", "No HP", "Total Belanja", "Total Kg", "Jumlah Order", "Kunjungan",
+             "Jeda Rata-rata (hari)", "Kunjungan Terakhir", "Hari Sejak Terakhir"],
+        )
+
+    st.markdown("**📈 Retensi per Kohort** (bulan order pertama → % pelanggan yang datang lagi di bulan ke-n)")
+    st.line_chart(kurva.rename("Rata-rata retensi (%)"))
+    persen = retensi.div(retensi[0], axis=0).mul(100).round(0)
+    persen.columns = [f"Bulan {c}" for c in persen.columns]
+    persen.insert(0, "Pelanggan Baru", retensi[0].astype("Int64"))
+    st.dataframe(persen.iloc[::-1], use_container_width=True)
+
 if __name__ == "__main__":
     show()
@@ -0,0 +1,209 @@
+# ===================== SCHEMA.PY (Tipe Kolom Ringkas untuk Riwayat Order) =====================
+import datetime
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (ikut terpasang bersama streamlit)
+    ARROW_STRING = pd.StringDtype("pyarrow")
+except ImportError:
+    ARROW_STRING = pd.StringDtype()
+
+# ------------------- TIPE PER KOLOM -------------------
+# Nilai berulang (sedikit variasi) → category
+CATEGORY_COLS = ["Status", "Status Antrian", "Jenis Layanan", "Jenis Pakaian", "Parfum", "Jenis Transaksi", "Jenis"]
+# Rupiah selalu bulat → int64
+RUPIAH_COLS = ["Harga", "Total", "Subtotal", "Diskon", "Nominal", "Harga per Kg"]
+# Berat cukup presisi float32
+KG_COLS = ["Berat (Kg)"]
+# Teks unik per baris → string Arrow (tanpa objek str Python per sel)
+TEXT_COLS = ["No Nota", "Nama Pelanggan", "No HP", "Keterangan", "Tanggal Masuk", "Estimasi Selesai", "Tanggal Siap", "Tanggal"]
+# Kolom tanggal teks → kolom datetime64 "Tanggal Parsed"
+DATE_COLS = ["Tanggal Masuk", "Tanggal"]
+
+# ------------------- KONVERSI -------------------
+def parse_tanggal(s):
+    """'dd/mm/YYYY' atau 'dd/mm/YYYY - HH:MM' → datetime64 (jam dibuang)."""
+    tgl = s.astype(str).str.split(" - ").str[0].str.strip()
+    parsed = pd.to_datetime(tgl, format="%d/%m/%Y", errors="coerce")
+    sisa = parsed.isna() & (tgl != "")
+    if sisa.any():
+        parsed[sisa] = pd.to_datetime(tgl[sisa], dayfirst=True, errors="coerce")
+    return parsed
+
+def compact_frame(df):
+    """
+    Ubah frame hasil baca sheet ke tipe ringkas:
+    category untuk status/jenis/parfum, int64 rupiah, float32 kg,
+    datetime64 'Tanggal Parsed', string Arrow untuk nama/nota/HP.
+    """
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            out[col] = s
+        elif col in RUPIAH_COLS:
+            out[col] = pd.to_numeric(s, errors="coerce").fillna(0).round().astype("int64")
+        elif col in KG_COLS:
+            out[col] = pd.to_numeric(s, errors="coerce").fillna(0).astype("float32")
+        elif col in CATEGORY_COLS:
+            out[col] = s.fillna("").astype(str).astype("category")
+        elif col.endswith(" ISO"):
+            out[col] = s
+        elif col in TEXT_COLS or s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+            out[col] = s.fillna("").astype(str).astype(ARROW_STRING)
+        else:
+            out[col] = s
+    res = pd.DataFrame(out, index=df.index)
+    # kolom ISO (sheet format baku) → datetime64 langsung, tanpa tebak format
+    for col in [c for c in res.columns if c.endswith(" ISO")]:
+        res[col] = pd.to_datetime(res[col].astype(str), format="ISO8601", errors="coerce")
+    for col in DATE_COLS:
+        if col in res.columns and "Tanggal Parsed" not in res.columns:
+            iso = f"{col} ISO"
+            res["Tanggal Parsed"] = res[iso].dt.normalize() if iso in res.columns else parse_tanggal(res[col])
+    return res
+
+def as_str_frame(df):
+    """Bentuk lama: semua kolom objek str Python (untuk pembanding memori)."""
+    return df.drop(columns=["Tanggal Parsed"], errors="ignore").astype(str).astype(object)
+
+# ------------------- LAPORAN MEMORI -------------------
+def memory_report(df_raw, df_compact, per_rows=100_000):
+    """
+    Bandingkan memori per kolom (deep) lalu skalakan ke per_rows baris.
+    Return DataFrame: Kolom, Tipe, Lama (MB), Ringkas (MB), Hemat (%).
+    """
+    n = max(len(df_compact), 1)
+    raw = df_raw.memory_usage(deep=True, index=False)
+    compact = df_compact.memory_usage(deep=True, index=False)
+    rows = []
+    for col in compact.index:
+        lama = raw.get(col, 0) / n * per_rows / 1e6
+        baru = compact[col] / n * per_rows / 1e6
+        rows.append({
+            "Kolom": col,
+            "Tipe": str(df_compact[col].dtype),
+            "Lama (MB)": round(lama, 2),
+            "Ringkas (MB)": round(baru, 2),
+            "Hemat (%)": round((1 - baru / lama) * 100, 1) if lama else 0.0,
+        })
+    rep = pd.DataFrame(rows)
+    total_lama, total_baru = rep["Lama (MB)"].sum(), rep["Ringkas (MB)"].sum()
+    total = {
+        "Kolom": "TOTAL", "Tipe": "",
+        "Lama (MB)": round(total_lama, 2), "Ringkas (MB)": round(total_baru, 2),
+        "Hemat (%)": round((1 - total_baru / total_lama) * 100, 1) if total_lama else 0.0,
+    }
+    return pd.concat([rep, pd.DataFrame([total])], ignore_index=True)
+
+# ------------------- SKEMA TULIS -------------------
+# Tipe: text | rupiah (int) | kg (float 3 desimal) | bool | tanggal ('dd/mm/YYYY') | waktu ('dd/mm/YYYY - HH:MM')
+# Semua dikirim RAW: angka tetap angka (tidak diparse ulang oleh locale sheet).
+WRITE_SCHEMA = {
+    "Order": {
+        "No Nota": "text", "Tanggal Masuk": "waktu", "Estimasi Selesai": "waktu",
+        "Nama Pelanggan": "text", "No HP": "text", "Jenis Pakaian": "text", "Jenis Layanan": "text",
+        "Berat (Kg)": "kg", "Harga per Kg": "rupiah", "Subtotal": "rupiah", "Diskon": "rupiah", "Total": "rupiah",
+        "Parfum": "text", "Jenis Transaksi": "text", "Status": "text", "Uploaded": "bool", "Status Antrian": "text",
+        "Tanggal Siap": "waktu",
+    },
+    "Pengeluaran": {
+        "Tanggal": "tanggal", "Keterangan": "text", "Nominal": "rupiah", "Jenis": "text",
+        "uploaded": "bool", "Jenis Transaksi": "text",
+    },
+    "Admin": {
+        "Jenis Pakaian": "text", "Jenis Layanan": "text", "Harga per Kg": "rupiah", "Parfum": "text",
+    },
+}
+REQUIRED = {
+    "Order": ["No Nota", "Tanggal Masuk", "Nama Pelanggan", "No HP", "Berat (Kg)", "Total"],
+    "Pengeluaran": ["Tanggal", "Keterangan", "Nominal"],
+    "Admin": ["Jenis Layanan", "Harga per Kg"],
+}
+DEFAULTS = {"Order": {"Status Antrian": "Antrian"}}
+# Kolom ISO (timestamp baku) di samping kolom tampilan; adanya kolom ini = sheet sudah dimigrasi
+ISO_COLS = {
+    "Order": {"Tanggal Masuk ISO": "Tanggal Masuk", "Estimasi Selesai ISO": "Estimasi Selesai"},
+    "Pengeluaran": {"Tanggal ISO": "Tanggal"},
+}
+
+def is_canonical(sheet, header):
+    """Sheet sudah format baku (angka RAW + kolom ISO) → pembaca boleh lewati pembersihan per sel."""
+    iso = ISO_COLS.get(sheet)
+    return bool(iso) and all(c in header for c in iso)
+
+def parse_waktu(v):
+    """datetime/date atau 'dd/mm/YYYY[ - HH:MM]' → datetime. ValueError jika tidak valid."""
+    if isinstance(v, datetime.datetime):
+        return v
+    if isinstance(v, datetime.date):
+        return datetime.datetime(v.year, v.month, v.day)
+    s = str(v).strip()
+    for fmt in ("%d/%m/%Y - %H:%M", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(s, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"format tanggal tidak dikenal: {s!r}")
+
+def _kosong(v):
+    return v is None or (isinstance(v, float) and v != v) or str(v).strip() == ""
+
+def canonical_value(tipe, v):
+    """Satu nilai → bentuk baku sesuai tipe. ValueError jika tidak valid."""
+    if tipe == "text":
+        return "" if _kosong(v) else str(v).strip()
+    if tipe == "bool":
+        return v if isinstance(v, bool) else str(v).strip().lower() in ("true", "1", "ya")
+    if tipe in ("rupiah", "kg"):
+        f = float(v)
+        if f != f or f < 0:
+            raise ValueError(f"angka tidak valid: {v!r}")
+        return int(round(f)) if tipe == "rupiah" else round(f, 3)
+    if tipe == "tanggal":
+        return parse_waktu(v).strftime("%d/%m/%Y")
+    if tipe == "waktu":
+        return parse_waktu(v).strftime("%d/%m/%Y - %H:%M")
+    raise ValueError(f"tipe skema tidak dikenal: {tipe}")
+
+def validate_row(sheet, data: dict):
+    """
+    Validasi + bakukan satu baris sesuai WRITE_SCHEMA[sheet].
+    Return dict {kolom: nilai baku} termasuk kolom ISO. ValueError bila wajib kosong / tidak valid.
+    """
+    schema = WRITE_SCHEMA[sheet]
+    data = {**DEFAULTS.get(sheet, {}), **data}
+    out = {}
+    for col in REQUIRED.get(sheet, []):
+        if _kosong(data.get(col)):
+            raise ValueError(f"kolom '{col}' wajib diisi")
+    for col, tipe in schema.items():
+        if col not in data or (tipe != "text" and _kosong(data[col])):
+            continue
+        try:
+            out[col] = canonical_value(tipe, data[col])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"kolom '{col}': {e}")
+    for iso_col, src in ISO_COLS.get(sheet, {}).items():
+        if src in out:
+            out[iso_col] = parse_waktu(out[src]).isoformat(timespec="minutes")
+    return out
+
+def validate_update(sheet, updates: dict):
+    """
+    Bakukan sebagian kolom (update sel) sesuai WRITE_SCHEMA[sheet], termasuk kolom ISO
+    untuk kolom tanggal yang berubah. ValueError bila kolom tidak dikenal / nilai tidak valid.
+    """
+    schema = WRITE_SCHEMA[sheet]
+    out = {}
+    for col, v in updates.items():
+        if col not in schema:
+            raise ValueError(f"kolom '{col}' tidak ada di skema {sheet}")
+        try:
+            out[col] = "" if schema[col] != "text" and _kosong(v) else canonical_value(schema[col], v)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"kolom '{col}': {e}")
+    for iso_col, src in ISO_COLS.get(sheet, {}).items():
+        if src in out:
+            out[iso_col] = parse_waktu(out[src]).isoformat(timespec="minutes") if out[src] else ""
+    return out
@@ -1,6 +1,9 @@
 import streamlit as st
 import json
+import pandas as pd
 import os
+from Sheets import migrate_sheet
+from Snapshot import get_store
 
 CONFIG_FILE = "config.json"
 
@@ -11,7 +14,9 @@ def load_config():
     return {
         "nama_toko": "TR Laundry",
         "alamat": "Jl. Buluh Cina, Panam",
-        "telepon": "0851-7217-4759"
+        "telepon": "0851-7217-4759",
+        "lat": 0.4657,
+        "lon": 101.3723
     }
 
 def save_config(cfg):
@@ -25,8 +30,39 @@ def show():
     nama_toko = st.text_input("Nama Toko", cfg["nama_toko"])
     alamat = st.text_area("Alamat", cfg["alamat"])
     telepon = st.text_input("Nomor HP / WhatsApp", cfg["telepon"])
+    c1, c2 = st.columns(2)
+    lat = c1.number_input("Lokasi Toko — Latitude", value=float(cfg.get("lat", 0.4657)), format="%.6f")
+    lon = c2.number_input("Lokasi Toko — Longitude", value=float(cfg.get("lon", 101.3723)), format="%.6f")
 
     if st.button("💾 Simpan Pengaturan"):
-        new_cfg = {"nama_toko": nama_toko, "alamat": alamat, "telepon": telepon}
+        new_cfg = {**cfg, "nama_toko": nama_toko, "alamat": alamat, "telepon": telepon, "lat": lat, "lon": lon}
         save_config(new_cfg)
         st.success("Pengaturan disimpan.")
+
+    # ---------- MIGRASI FORMAT DATA (sekali) ----------
+    st.markdown("---")
+    st.subheader("🛠️ Migrasi Format Data")
+    st.caption(
+        "Sekali saja: angka lama (berat, harga, total, nominal) ditulis ulang sebagai angka baku, "
+        "tanggal diberi kolom ISO. Sesudahnya laporan tidak perlu lagi menebak format angka."
+    )
+    if st.button("🛠️ Jalankan Migrasi Order & Pengeluaran"):
+        for sheet in ["Order", "Pengeluaran"]:
+            try:
+                n, ragu = migrate_sheet(sheet)
+                get_store().bump(sheet)
+                if n:
+                    st.success(f"✅ {sheet}: {n} baris dibakukan.")
+                else:
+                    st.info(f"ℹ️ {sheet}: sudah format baku / kosong.")
+                if ragu:
+                    st.warning(
+                        f"⚠️ {sheet}: {len(ragu)} berat tidak diubah karena maknanya tidak pasti "
+                        f"(mis. '12' = 12 Kg atau 1,2 Kg?). Nilainya disalin ke kolom '(Cek)' — periksa lalu perbaiki manual."
+                    )
+                    st.dataframe(
+                        pd.DataFrame(ragu, columns=["Baris", "Kolom", "Nilai"]).head(200),
+                        use_container_width=True, hide_index=True,
+                    )
+            except Exception as e:
+                st.error(f"❌ Gagal migrasi {sheet}: {e}")
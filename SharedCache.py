@@ -0,0 +1,310 @@
+# ===================== SHAREDCACHE.PY (Cache Bersama Lintas Replika) =====================
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+import streamlit as st
+
+# st.cache_data / st.cache_resource / SnapshotStore hanya hidup di satu proses.
+# Bila app dijalankan beberapa replika (beberapa proses / container), backend di
+# sini dipakai bersama untuk:
+#   version(name) / bump(name)  → stempel versi per sheet (invalidasi lintas replika)
+#   get / set                   → snapshot sheet & katalog harga (bytes)
+#   counter(name, floor)        → reservasi nomor nota atomik
+#   add(key, value)             → klaim sekali pakai (set hanya jika belum ada)
+#
+# CCKASIR_SHARED_CACHE = none (default) | memory | sqlite:/path/shared.db | redis://host:6379/0
+
+def _json_default(o):
+    # angka numpy (int64/float64) → angka Python
+    return o.item() if hasattr(o, "item") else str(o)
+
+# ------------------- BASE -------------------
+class SharedBackend(ABC):
+    """Antarmuka bersama; subclass wajib mengisi semua metode primitif (abstract)."""
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value: bytes, ttl=None):
+        ...
+
+    @abstractmethod
+    def add(self, key, value: bytes, ttl=None):
+        """Set hanya jika key belum ada. True bila berhasil (pemanggil pertama)."""
+        ...
+
+    @abstractmethod
+    def delete(self, key):
+        ...
+
+    @abstractmethod
+    def versions(self, names):
+        """dict name → versi (0 bila belum pernah di-bump)."""
+        ...
+
+    @abstractmethod
+    def bump(self, name):
+        """Naikkan versi name, return versi baru."""
+        ...
+
+    @abstractmethod
+    def counter(self, name, floor=0):
+        """Atomik: c = max(c, floor) + 1, return c."""
+        ...
+
+    @abstractmethod
+    def count(self, name):
+        """Nilai counter name saat ini (0 bila belum pernah dipakai)."""
+        ...
+
+    def version(self, name):
+        return self.versions([name]).get(name, 0)
+
+    def get_json(self, key):
+        raw = self.get(key)
+        return None if raw is None else json.loads(raw)
+
+    def set_json(self, key, value, ttl=None):
+        self.set(key, json.dumps(value, default=_json_default).encode(), ttl)
+
+# ------------------- MEMORY (stand-in lokal / tes) -------------------
+class MemoryBackend(SharedBackend):
+    """Dict dalam proses. Beberapa SnapshotStore yang memegang instance yang sama berperilaku seperti replika."""
+
+    def __init__(self):
+        self._kv = {}         # key -> (value, kedaluwarsa | None)
+        self._ver = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        item = self._kv.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] < time.time():
+            del self._kv[key]
+            return None
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._alive(key)
+            return None if item is None else item[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._kv[key] = (value, time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._alive(key) is not None:
+                return False
+            self._kv[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._kv.pop(key, None)
+
+    def versions(self, names):
+        with self._lock:
+            return {n: self._ver.get(n, 0) for n in names}
+
+    def bump(self, name):
+        with self._lock:
+            self._ver[name] = self._ver.get(name, 0) + 1
+            return self._ver[name]
+
+    def counter(self, name, floor=0):
+        with self._lock:
+            c = max(self._ver.get("#" + name, 0), int(floor)) + 1
+            self._ver["#" + name] = c
+            return c
+
+    def count(self, name):
+        with self._lock:
+            return self._ver.get("#" + name, 0)
+
+# ------------------- SQLITE (file di volume bersama) -------------------
+def sqlite_connect(path):
+    """Koneksi autocommit + WAL (pembaca tidak menunggu penulis). Satu koneksi per thread."""
+    db = sqlite3.connect(path, timeout=30, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+class SQLiteTx:
+    """BEGIN IMMEDIATE … COMMIT (ROLLBACK bila exception): kunci tulis diambil di awal."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+class SQLiteBackend(SharedBackend):
+    """
+    Satu file SQLite (WAL) yang dibuka semua replika. Tulis memakai
+    BEGIN IMMEDIATE sehingga bump/counter/add atomik antar proses.
+    Koneksi per thread (objek sqlite3 tidak boleh dibagi antar thread).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        with self._tx() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS ver (name TEXT PRIMARY KEY, v INTEGER NOT NULL)")
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite_connect(self.path)
+        return db
+
+    def _tx(self):
+        return SQLiteTx(self._db())
+
+    def get(self, key):
+        row = self._db().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires >= ?)", (key, time.time())
+        ).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._tx() as db:
+            db.execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires < ?", (now,))
+            db.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), now + ttl if ttl else None),
+            )
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        with self._tx() as db:
+            db.execute("DELETE FROM kv WHERE key = ? AND expires IS NOT NULL AND expires < ?", (key, now))
+            cur = db.execute(
+                "INSERT OR IGNORE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), now + ttl if ttl else None),
+            )
+            return cur.rowcount == 1
+
+    def delete(self, key):
+        with self._tx() as db:
+            db.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def versions(self, names):
+        names = list(names)
+        if not names:
+            return {}
+        marks = ",".join("?" * len(names))
+        rows = self._db().execute(f"SELECT name, v FROM ver WHERE name IN ({marks})", names).fetchall()
+        out = {n: 0 for n in names}
+        out.update(dict(rows))
+        return out
+
+    def bump(self, name):
+        with self._tx() as db:
+            db.execute("INSERT INTO ver (name, v) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET v = v + 1", (name,))
+            return db.execute("SELECT v FROM ver WHERE name = ?", (name,)).fetchone()[0]
+
+    def counter(self, name, floor=0):
+        name = "#" + name
+        with self._tx() as db:
+            row = db.execute("SELECT v FROM ver WHERE name = ?", (name,)).fetchone()
+            c = max(row[0] if row else 0, int(floor)) + 1
+            db.execute("INSERT OR REPLACE INTO ver (name, v) VALUES (?, ?)", (name, c))
+            return c
+
+    def count(self, name):
+        row = self._db().execute("SELECT v FROM ver WHERE name = ?", ("#" + name,)).fetchone()
+        return row[0] if row else 0
+
+# ------------------- REDIS -------------------
+_COUNTER_LUA = """
+local c = tonumber(redis.call('GET', KEYS[1]) or '0')
+local f = tonumber(ARGV[1])
+if f > c then c = f end
+c = c + 1
+redis.call('SET', KEYS[1], c)
+return c
+"""
+
+class RedisBackend(SharedBackend):
+    """Redis (atau server kompatibel: Valkey, KeyDB, Dragonfly). Butuh paket `redis`."""
+
+    def __init__(self, url, prefix="cckasir:"):
+        import redis  # opsional, hanya saat backend ini dipilih
+        self.r = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._counter = self.r.register_script(_COUNTER_LUA)
+
+    def _k(self, key):
+        return self.prefix + key
+
+    def get(self, key):
+        return self.r.get(self._k(key))
+
+    def set(self, key, value, ttl=None):
+        self.r.set(self._k(key), value, ex=int(ttl) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.r.set(self._k(key), value, nx=True, ex=int(ttl) if ttl else None))
+
+    def delete(self, key):
+        self.r.delete(self._k(key))
+
+    def versions(self, names):
+        names = list(names)
+        if not names:
+            return {}
+        vals = self.r.mget([self._k("ver:" + n) for n in names])
+        return {n: int(v) if v is not None else 0 for n, v in zip(names, vals)}
+
+    def bump(self, name):
+        return int(self.r.incr(self._k("ver:" + name)))
+
+    def counter(self, name, floor=0):
+        return int(self._counter(keys=[self._k("cnt:" + name)], args=[int(floor)]))
+
+    def count(self, name):
+        return int(self.r.get(self._k("cnt:" + name)) or 0)
+
+# ------------------- PILIH BACKEND -------------------
+def make_shared_cache(spec=None):
+    """Backend dari spesifikasi CCKASIR_SHARED_CACHE, atau None (cache per proses saja)."""
+    spec = (spec if spec is not None else os.environ.get("CCKASIR_SHARED_CACHE", "none")).strip()
+    if spec.lower() in ("", "none"):
+        return None
+    if spec.lower() == "memory":
+        return MemoryBackend()
+    if spec.startswith("sqlite:"):
+        return SQLiteBackend(spec[len("sqlite:"):] or "shared_cache.db")
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(spec)
+    raise ValueError(f"CCKASIR_SHARED_CACHE tidak dikenal: {spec}")
+
+@st.cache_resource(show_spinner=False)
+def get_shared_cache():
+    return make_shared_cache()
+
+# Tanpa backend bersama, reservasi nota & klaim aksi tetap atomik di dalam satu proses
+_LOKAL = MemoryBackend()
+
+def shared_or_local():
+    return get_shared_cache() or _LOKAL
+
+def reserve_counter(name, floor=0):
+    """Nomor berikutnya untuk name (≥ floor + 1), unik di semua sesi/replika yang berbagi backend."""
+    return shared_or_local().counter(name, floor)
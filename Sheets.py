@@ -0,0 +1,336 @@
+# ===================== SHEETS.PY (Baca Batch Multi-Sheet + Proyeksi Kolom) =====================
+import re
+import gspread
+import pandas as pd
+import streamlit as st
+from oauth2client.service_account import ServiceAccountCredentials
+from Customer import parse_rp
+from Schema import compact_frame, is_canonical, validate_row, validate_update, parse_waktu, WRITE_SCHEMA, ISO_COLS
+
+# ------------------- CONFIG -------------------
+SPREADSHEET_ID = "1v_3sXsGw9lNmGPSbIHytYzHzPTxa4yp4HhfS9tgXweA"
+
+# Kolom penanda replika: id entri outbox SQLite yang menulis baris (Storage.Replicator)
+REPLICA_COL = "ID Replika"
+
+# Kolom angka yang dibersihkan saat dibaca (format lokal sheet: koma / titik ribuan)
+NUMERIC_COLS = ["Berat (Kg)", "Harga", "Total", "Subtotal", "Diskon", "Nominal", "Harga per Kg"]
+
+# ------------------- AUTH GOOGLE (CACHE) -------------------
+@st.cache_resource(show_spinner=False)
+def authenticate_google():
+    creds_dict = st.secrets["gcp_service_account"]
+    scope = [
+        "https://spreadsheets.google.com/feeds",
+        "https://www.googleapis.com/auth/drive"
+    ]
+    credentials = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+    client = gspread.authorize(credentials)
+    return client
+
+@st.cache_resource(show_spinner=False)
+def get_spreadsheet():
+    return authenticate_google().open_by_key(SPREADSHEET_ID)
+
+def get_worksheet(sheet_name):
+    return get_spreadsheet().worksheet(sheet_name)
+
+# ------------------- UTIL -------------------
+def col_letter(n):
+    """Nomor kolom (1-based) → huruf A1 ('A', 'Q', 'AB')."""
+    return re.sub(r"\d", "", gspread.utils.rowcol_to_a1(1, n))
+
+def normalize_angka(x, is_berat=False):
+    """
+    Angka dari sheet → float. Koma dianggap desimal.
+    Untuk 'Berat (Kg)': 2 digit tanpa titik (mis. '25') dianggap 2,5 Kg.
+    """
+    s = str(x).strip().replace(",", ".")
+    s = "".join([c for c in s if c.isdigit() or c == "."])
+    if s == "":
+        return 0.0
+    f = float(s)
+    if is_berat:
+        # paksa koma jika dua digit tanpa titik
+        if f >= 10 and f < 100 and "." not in s:
+            f = f / 10
+    return f
+
+def to_typed_frame(df, canonical=False):
+    """
+    Kolom angka → float lalu ke tipe ringkas (Schema.compact_frame).
+    canonical=True (sheet format baku, dibaca UNFORMATTED_VALUE): angka sudah angka,
+    cukup pd.to_numeric sekali per kolom. Selain itu pembersihan per sel (normalize_angka).
+    """
+    for col in NUMERIC_COLS:
+        if col in df.columns:
+            if canonical:
+                df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+            else:
+                is_berat = col == "Berat (Kg)"
+                df[col] = df[col].apply(lambda x: normalize_angka(x, is_berat=is_berat))
+    return compact_frame(df)
+
+# ------------------- HEADER MAP -------------------
+@st.cache_data(ttl=600, show_spinner=False)
+def get_header_map(sheet_names: tuple):
+    """{sheet: {nama kolom: huruf kolom}} — header semua sheet dalam satu values_batch_get."""
+    res = get_spreadsheet().values_batch_get([f"'{s}'!1:1" for s in sheet_names])
+    out = {}
+    for s, vr in zip(sheet_names, res.get("valueRanges", [])):
+        header = (vr.get("values") or [[]])[0]
+        out[s] = {h: col_letter(i + 1) for i, h in enumerate(header) if h}
+    return out
+
+# ------------------- BACA BATCH -------------------
+def read_batch(specs):
+    """
+    Baca beberapa (sheet, kolom[, (baris_awal, baris_akhir)]) dalam SATU values_batch_get.
+    Hanya kolom yang diminta yang diunduh; huruf kolom diambil dari header map (cache).
+    Return list DataFrame bertipe, urut sesuai specs. Kolom yang tidak ada di sheet diisi "".
+    """
+    specs = [(s[0], list(s[1]), s[2] if len(s) > 2 else None) for s in specs]
+    headers = get_header_map(tuple(sorted({s[0] for s in specs})))
+    # semua sheet sudah format baku → baca nilai mentah, ikutkan kolom ISO tanggal
+    canonical = all(is_canonical(sheet, headers.get(sheet, {})) for sheet, _, _ in specs)
+    if canonical:
+        specs = [
+            (sheet, cols + [iso for iso, src in ISO_COLS.get(sheet, {}).items() if src in cols and iso not in cols], rows)
+            for sheet, cols, rows in specs
+        ]
+
+    ranges, plan = [], []
+    for sheet, cols, rows in specs:
+        hmap = headers.get(sheet, {})
+        present = [c for c in cols if c in hmap]
+        awal, akhir = rows if rows else (2, "")
+        for c in present:
+            L = hmap[c]
+            ranges.append(f"'{sheet}'!{L}{awal}:{L}{akhir}")
+        plan.append((cols, present))
+
+    value_ranges = []
+    if ranges:
+        params = {"majorDimension": "COLUMNS"}
+        if canonical:
+            params["valueRenderOption"] = "UNFORMATTED_VALUE"
+        res = get_spreadsheet().values_batch_get(ranges, params=params)
+        value_ranges = res.get("valueRanges", [])
+
+    frames, pos = [], 0
+    for cols, present in plan:
+        data = {}
+        for c in present:
+            vals = (value_ranges[pos].get("values") or [[]])[0] if pos < len(value_ranges) else []
+            data[c] = vals
+            pos += 1
+        n = max((len(v) for v in data.values()), default=0)
+        df = pd.DataFrame({c: list(data.get(c, [])) + [""] * (n - len(data.get(c, []))) for c in cols})
+        frames.append(to_typed_frame(df, canonical=canonical))
+    return frames
+
+def read_row_numbers(sheet_name, rows):
+    """
+    Baris lengkap untuk nomor baris sheet tertentu, urut sesuai rows: satu
+    values_batch_get, nomor berurutan digabung per blok. Header dari header map (cache).
+    Nomor yang kosong / di luar sheet → baris kosong. Return DataFrame bertipe.
+    """
+    hmap = get_header_map((sheet_name,)).get(sheet_name, {})
+    nomor = {gspread.utils.a1_to_rowcol(f"{L}1")[1]: c for c, L in hmap.items()}
+    header = list(hmap)
+    if not rows or not nomor:
+        return pd.DataFrame(columns=header)
+    last = col_letter(max(nomor))
+    blocks = []
+    for r in sorted(set(rows)):
+        if blocks and r == blocks[-1][1] + 1:
+            blocks[-1][1] = r
+        else:
+            blocks.append([r, r])
+    canonical = is_canonical(sheet_name, hmap)
+    params = {"valueRenderOption": "UNFORMATTED_VALUE"} if canonical else {}
+    res = get_spreadsheet().values_batch_get([f"'{sheet_name}'!A{a}:{last}{b}" for a, b in blocks], params=params)
+    by_row = {}
+    for (a, b), vr in zip(blocks, res.get("valueRanges", [])):
+        for i, values in enumerate(vr.get("values", [])):
+            by_row[a + i] = {nomor[j + 1]: v for j, v in enumerate(values) if j + 1 in nomor}
+    records = [by_row.get(r, {}) for r in rows]
+    return to_typed_frame(pd.DataFrame(records, columns=header), canonical=canonical)
+
+def sheet_is_canonical(sheet_name):
+    return is_canonical(sheet_name, get_header_map((sheet_name,)).get(sheet_name, {}))
+
+def render_option(sheet_name):
+    """value_render_option untuk get_all_records/batch_get sesuai status migrasi sheet."""
+    return "UNFORMATTED_VALUE" if sheet_is_canonical(sheet_name) else None
+
+# ------------------- TULIS (skema baku) -------------------
+def append_typed(sheet_name, data: dict, ws=None, marker=None):
+    """
+    Tulis satu baris lewat skema (Schema.validate_row): angka dikirim sebagai angka,
+    tanggal tampilan + ISO, value_input_option RAW (tidak diparse locale sheet).
+    Kolom skema yang belum ada di header ditambahkan, kecuali kolom ISO
+    (penanda migrasi; hanya ditambahkan oleh migrate_sheet).
+    marker (opsional) ditulis ke REPLICA_COL → pengiriman ulang bisa dicek (find_marker).
+    Return dict baris yang ditulis (tanpa marker).
+    """
+    row = validate_row(sheet_name, data)
+    ws = ws or get_worksheet(sheet_name)
+    headers = ws.row_values(1)
+    iso_cols = ISO_COLS.get(sheet_name, {})
+    baru = [c for c in WRITE_SCHEMA[sheet_name] if c in row and c not in headers and c not in iso_cols]
+    if marker is not None and REPLICA_COL not in headers:
+        baru.append(REPLICA_COL)
+    for col in baru:
+        ws.update_cell(1, len(headers) + 1, col)
+        headers.append(col)
+    if baru:
+        get_header_map.clear()  # pembaca header map (read_batch / read_row_numbers) melihat kolom baru
+    values = {**row, REPLICA_COL: marker} if marker is not None else row
+    ws.append_row([values.get(h, "") for h in headers], value_input_option="RAW")
+    return row
+
+def find_marker(sheet_name, marker, ws=None):
+    """True bila baris dengan REPLICA_COL = marker sudah ada di sheet."""
+    ws = ws or get_worksheet(sheet_name)
+    headers = ws.row_values(1)
+    if REPLICA_COL not in headers:
+        return False
+    return ws.find(str(marker), in_column=headers.index(REPLICA_COL) + 1) is not None
+
+def update_typed(sheet_name, key_col, key_val, updates: dict, ws=None):
+    """
+    Update sel baris berkunci key_col = key_val lewat skema (Schema.validate_update),
+    satu batch_update RAW. Kolom skema baru ditambahkan ke header (kecuali ISO, sama
+    seperti append_typed). Return dict nilai baku. ValueError bila kunci tidak ada.
+    """
+    row = validate_update(sheet_name, updates)
+    ws = ws or get_worksheet(sheet_name)
+    headers = ws.row_values(1)
+    if key_col not in headers:
+        raise ValueError(f"Kolom {key_col} tidak ada di sheet {sheet_name}")
+    cell = ws.find(str(key_val), in_column=headers.index(key_col) + 1)
+    if not cell:
+        raise ValueError(f"Tidak ditemukan {key_col} {key_val}")
+    iso_cols = ISO_COLS.get(sheet_name, {})
+    n_lama = len(headers)
+    data = []
+    for col, v in row.items():
+        if col not in headers:
+            if col in iso_cols:
+                continue
+            headers.append(col)
+            data.append({"range": f"{col_letter(len(headers))}1", "values": [[col]]})
+        data.append({"range": f"{col_letter(headers.index(col) + 1)}{cell.row}", "values": [[v]]})
+    ws.batch_update(data, value_input_option="RAW")
+    if len(headers) > n_lama:
+        get_header_map.clear()
+    return row
+
+# ------------------- MIGRASI SEKALI -------------------
+def kolom_cek(col):
+    """Kolom tinjauan untuk nilai col yang maknanya tidak pasti (tidak ditulis ulang)."""
+    return f"{col} (Cek)"
+
+def _berat_pasti(tampil, mentah):
+    """
+    Berat yang maknanya pasti, atau None. '2,5' / 2.5 pasti; '12' / 25 (dua digit
+    tanpa pemisah) tidak: heuristik baca lama membacanya 1,2 / 2,5 Kg.
+    """
+    if normalize_angka(tampil, is_berat=True) != normalize_angka(tampil):
+        return None
+    if isinstance(mentah, (int, float)) and not isinstance(mentah, bool):
+        return float(mentah)
+    return normalize_angka(tampil)
+
+def migrate_sheet(sheet_name):
+    """
+    Bakukan baris lama: angka ditulis ulang RAW sebagai angka, tanggal tampilan
+    ditulis ulang sebagai teks, kolom ISO diisi. Header ISO ditulis paling akhir
+    sebagai penanda selesai.
+    Berat yang maknanya tidak pasti (mis. '12': 12 Kg atau 1,2 Kg?) TIDAK diubah;
+    nilai tampilnya disalin ke kolom kolom_cek(...) untuk diperiksa manual.
+    Return (jumlah baris diproses, [(nomor baris, kolom, nilai), ...] yang perlu dicek).
+    """
+    schema = WRITE_SCHEMA[sheet_name]
+    ws = get_worksheet(sheet_name)
+    values = ws.get_all_values()
+    if not values:
+        return 0, []
+    header, rows = values[0], values[1:]
+    if not rows or is_canonical(sheet_name, header):
+        return 0, []
+    mentah = ws.get_all_values(value_render_option="UNFORMATTED_VALUE")[1:]
+    n = len(rows)
+    updates, ragu = [], []
+    next_col = len(header) + 1
+
+    def sel(data, i, ci):
+        return data[i][ci] if i < len(data) and ci < len(data[i]) else ""
+
+    for col, tipe in schema.items():
+        if col not in header or tipe == "text":
+            continue
+        ci = header.index(col)
+        out, cek = [], []
+        for i, r in enumerate(rows):
+            v, raw = sel(rows, i, ci), sel(mentah, i, ci)
+            if tipe == "rupiah":
+                out.append([int(round(raw)) if isinstance(raw, (int, float)) and not isinstance(raw, bool) else parse_rp(v)])
+            elif tipe == "kg":
+                f = _berat_pasti(v, raw)
+                if f is None:
+                    out.append([raw])  # tidak disentuh
+                    cek.append([v])
+                    ragu.append((i + 2, col, v))
+                else:
+                    out.append([round(f, 3)])
+                    cek.append([""])
+            elif tipe == "bool":
+                out.append([str(v).strip().lower() in ("true", "1", "ya")])
+            else:
+                try:
+                    dt = parse_waktu(v)
+                    out.append([dt.strftime("%d/%m/%Y") if tipe == "tanggal" else dt.strftime("%d/%m/%Y - %H:%M")])
+                except ValueError:
+                    out.append([v])
+        L = col_letter(ci + 1)
+        updates.append({"range": f"{L}2:{L}{n + 1}", "values": out})
+        if any(c[0] for c in cek):
+            nama = kolom_cek(col)
+            pos = header.index(nama) + 1 if nama in header else next_col
+            if nama not in header:
+                next_col += 1
+            L = col_letter(pos)
+            updates.append({"range": f"{L}1:{L}{n + 1}", "values": [[nama]] + cek})
+
+    iso_pos = {}
+    for iso_col, src in ISO_COLS.get(sheet_name, {}).items():
+        if src not in header:
+            continue
+        iso_pos[iso_col] = header.index(iso_col) + 1 if iso_col in header else next_col
+        if iso_col not in header:
+            next_col += 1
+        si = header.index(src)
+        out = []
+        for r in rows:
+            try:
+                out.append([parse_waktu(r[si] if si < len(r) else "").isoformat(timespec="minutes")])
+            except ValueError:
+                out.append([""])
+        L = col_letter(iso_pos[iso_col])
+        updates.append({"range": f"{L}2:{L}{n + 1}", "values": out})
+
+    if next_col - 1 > ws.col_count:
+        ws.add_cols(next_col - 1 - ws.col_count)
+    if updates:
+        ws.batch_update(updates, value_input_option="RAW")
+    # penanda migrasi: header ISO terakhir
+    for iso_col, pos in iso_pos.items():
+        if iso_col not in header:
+            ws.update_cell(1, pos, iso_col)
+    try:
+        get_header_map.clear()
+    except Exception:
+        pass
+    return n, ragu
@@ -0,0 +1,544 @@
+# ===================== SNAPSHOT.PY (Snapshot Data Bersama per Proses) =====================
+import datetime
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import pandas as pd
+import streamlit as st
+from Freshness import make_probe
+from SharedCache import get_shared_cache
+
+SNAPSHOT_DIR = "snapshots"
+# Naikkan bila bentuk frame hasil Schema.compact_frame / to_typed_frame berubah:
+# snapshot disk & bersama dengan format lama dibuang, tidak dipakai sebagai data basi.
+FRAME_FORMAT = 1
+
+# Copy-on-write (pandas 3 selalu; pandas 2 dinyalakan di streamlit_app.py): view dangkal
+# aman dibagi antar sesi, perubahan di sisi pembaca otomatis membuat salinan sendiri.
+# Tanpa copy-on-write setiap sesi mendapat salinan penuh.
+def _cow():
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except Exception:
+        return False
+
+def _view(frame):
+    return frame.copy(deep=not _cow())
+
+def schema_hash(schema=None):
+    """Sidik bentuk frame: kolom yang diminta loader (None = semua kolom sheet) + FRAME_FORMAT."""
+    return hashlib.sha1(json.dumps([FRAME_FORMAT, schema], default=str).encode()).hexdigest()[:12]
+
+# ------------------- UTIL FRAME -------------------
+def _set_cells(df, mask, updates: dict):
+    """Frame baru dengan kolom updates diganti pada baris mask (aman untuk kolom category)."""
+    new_cols = {}
+    for col, val in updates.items():
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            if val not in s.cat.categories:
+                s = s.cat.add_categories([val])
+        new_cols[col] = s.mask(mask, val)
+    return df.assign(**new_cols)
+
+def _append_rows(df, new):
+    """Gabung baris baru; kolom category disatukan kategorinya agar tidak jadi object."""
+    new = new.reindex(columns=df.columns)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            cats = df[col].cat.categories.union(pd.Index(new[col].dropna().astype(str).unique()))
+            df = df.assign(**{col: df[col].cat.set_categories(cats)})
+            new[col] = pd.Categorical(new[col].astype(str), categories=cats)
+        else:
+            try:
+                new[col] = new[col].astype(df[col].dtype)
+            except (TypeError, ValueError):
+                pass
+    return pd.concat([df, new], ignore_index=True)
+
+# ------------------- STORE -------------------
+class SnapshotStore:
+    """
+    Snapshot frame per key (mis. 'Order', 'Order:report') dengan versi naik terus.
+    - Versi dipegang per sheet: tulis ke 'Order' menaikkan versi semua key sheet itu.
+    - Pembaca dapat view dangkal (zero-copy) dari frame yang tidak pernah diubah di tempat.
+    - Penulis menerapkan perubahan langsung ke snapshot (apply_update/apply_append),
+      sesi lain melihat data baru di rerun berikutnya tanpa fetch ulang.
+    - Stale-while-revalidate: tiap hasil fetch disimpan ke Parquet di snapshot_dir.
+      Saat start dingin / snapshot kedaluwarsa, data lama langsung dipakai
+      dan fetch baru berjalan di thread latar.
+    - Gerbang perubahan: tanpa TTL buta. Snapshot dipakai terus selama probe
+      (Freshness.*Probe) bilang sheet belum berubah; probe paling sering sekali
+      per probe_interval detik per key.
+    - Replika (opsional, SharedCache): versi per sheet juga dicap di backend
+      bersama. Tulis di replika lain → snapshot lokal dibuang, lalu diambil
+      dari snapshot bersama (parquet) bila versinya cocok, baru fetch sheet.
+    """
+
+    def __init__(self, probe=None, probe_interval=15, max_age=None, snapshot_dir=SNAPSHOT_DIR,
+                 shared=None, shared_interval=1.0, shared_ttl=86400):
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.max_age = max_age
+        self.snapshot_dir = snapshot_dir
+        self.shared = shared
+        self.shared_interval = shared_interval
+        self.shared_ttl = shared_ttl
+        self.stats = {"probe": 0, "probe_sama": 0, "fetch": 0, "bersama_pakai": 0, "bersama_simpan": 0}
+        self._shared_seen = {}      # sheet -> versi bersama yang sudah tercermin di snapshot lokal
+        self._shared_checked = {}   # sheet -> waktu cek versi bersama terakhir
+        self._entries = {}      # key -> {"frame", "version", "sheet", "fetched_at", "stale", "token", "checked_at"}
+        self._versions = {}     # sheet -> versi terbaru
+        self._counter = itertools.count(self._last_disk_version() + 1)
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self._revalidating = set()
+        self._schemas = {}      # key -> schema_hash loader terakhir
+        self._disk_lock = threading.Lock()
+
+    def version(self, sheet):
+        with self._lock:
+            return self._versions.get(sheet, 0)
+
+    def info(self, key):
+        """(versi, waktu fetch, sedang revalidasi?) snapshot key, atau (0, None, False)."""
+        with self._lock:
+            e = self._entries.get(key)
+            if not e:
+                return (0, None, False)
+            return (e["version"], e["fetched_at"], any(key in ks for ks in self._revalidating))
+
+    def pending(self, keys=None):
+        """True bila masih ada revalidasi latar (untuk keys tertentu atau semua)."""
+        with self._lock:
+            if keys is None:
+                return bool(self._revalidating)
+            return any(k in ks for ks in self._revalidating for k in keys)
+
+    def _current(self, key):
+        """Entry dengan versi terkini (boleh sudah tua), atau None."""
+        e = self._entries.get(key)
+        if e is None or e["version"] != self._versions.get(e["sheet"], 0):
+            return None
+        return e
+
+    def _still_valid(self, key, e):
+        """
+        Snapshot masih sama dengan sheet? Tanpa probe: valid kecuali basi/kedaluwarsa.
+        Dengan probe: tanya probe paling sering sekali per probe_interval.
+        Probe gagal (mis. offline) dianggap tidak berubah.
+        """
+        now = time.time()
+        if self.max_age is not None and now - e["fetched_at"] > self.max_age:
+            return False
+        if self.probe is None:
+            return not e.get("stale")
+        if now - e.get("checked_at", 0) < self.probe_interval:
+            return not e.get("stale")
+        self.stats["probe"] += 1
+        try:
+            same = self.probe.unchanged(e["sheet"], e.get("token"), e["frame"])
+        except Exception as ex:
+            print(f"Probe {key} gagal:", ex)
+            same = True
+        with self._lock:
+            e["checked_at"] = now
+            if same:
+                e["stale"] = False
+                self.stats["probe_sama"] += 1
+        return same
+
+    def _tokens(self, specs):
+        """Token probe per sheet, diambil SEBELUM fetch (perubahan selama fetch tetap terdeteksi)."""
+        if self.probe is None:
+            return [None] * len(specs)
+        out = []
+        for _, sheet in specs:
+            try:
+                out.append(self.probe.token(sheet))
+            except Exception as ex:
+                print(f"Token probe {sheet} gagal:", ex)
+                out.append(None)
+        return out
+
+    def _publish(self, key, sheet, frame, version, token=None, fetched_at=None):
+        """
+        Simpan hasil fetch dengan versi saat fetch dimulai; bila ada tulis di tengah fetch, snapshot langsung basi.
+        Dipanggil di dalam _lock; return (key, entry) untuk _save_disk SESUDAH lock dilepas.
+        """
+        v = version
+        if v == 0 and self._versions.get(sheet, 0) == 0:
+            v = self._versions[sheet] = next(self._counter)
+        now = time.time()
+        self._entries[key] = {
+            "frame": frame, "version": v, "sheet": sheet, "fetched_at": fetched_at or now,
+            "stale": False, "token": token, "checked_at": now,
+        }
+        return key, self._entries[key]
+
+    # ---------- DISK (Parquet) ----------
+    def _path(self, key):
+        return os.path.join(self.snapshot_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", key))
+
+    def _last_disk_version(self):
+        v = 0
+        if os.path.isdir(self.snapshot_dir):
+            for name in os.listdir(self.snapshot_dir):
+                if name.endswith(".json"):
+                    try:
+                        with open(os.path.join(self.snapshot_dir, name)) as f:
+                            v = max(v, int(json.load(f).get("version", 0)))
+                    except Exception:
+                        pass
+        return v
+
+    def _save_disk(self, saved):
+        """saved: list (key, entry) dari _publish. I/O di luar _lock; entry yang sudah tergantikan dilewati."""
+        for key, e in saved:
+            with self._disk_lock:
+                if self._entries.get(key) is not e:
+                    continue
+                try:
+                    os.makedirs(self.snapshot_dir, exist_ok=True)
+                    path = self._path(key)
+                    e["frame"].to_parquet(path + ".parquet.tmp", index=False)
+                    os.replace(path + ".parquet.tmp", path + ".parquet")
+                    with open(path + ".json", "w") as f:
+                        json.dump({
+                            "key": key, "sheet": e["sheet"], "version": e["version"], "fetched_at": e["fetched_at"],
+                            "token": e.get("token"), "schema": self._schemas.get(key, schema_hash()),
+                        }, f)
+                except Exception as ex:
+                    print(f"Gagal simpan snapshot {key}:", ex)
+
+    def _load_disk(self, key, sheet):
+        """Pasang snapshot dari disk sebagai data basi (stale). True jika berhasil."""
+        path = self._path(key)
+        if not (os.path.exists(path + ".parquet") and os.path.exists(path + ".json")):
+            return False
+        try:
+            with open(path + ".json") as f:
+                meta = json.load(f)
+            if meta.get("schema") != self._schemas.get(key, schema_hash()):
+                return False  # kolom loader berubah sejak snapshot ditulis → jangan dipakai
+            frame = pd.read_parquet(path + ".parquet")
+        except Exception as ex:
+            print(f"Gagal baca snapshot {key}:", ex)
+            return False
+        v = self._versions.get(sheet, 0)
+        if v == 0:
+            v = self._versions[sheet] = next(self._counter)
+        self._entries[key] = {
+            "frame": frame, "version": v, "sheet": sheet, "fetched_at": meta.get("fetched_at", 0),
+            "stale": True, "token": meta.get("token"), "checked_at": 0,
+        }
+        return True
+
+    # ---------- REVALIDASI LATAR ----------
+    def _revalidate(self, specs, loader):
+        keys = tuple(k for k, _ in specs)
+        with self._lock:
+            if keys in self._revalidating:
+                return
+            self._revalidating.add(keys)
+            versions = [self._versions.get(sheet, 0) for _, sheet in specs]
+            shared_versions = [self._shared_seen.get(sheet, 0) for _, sheet in specs]
+
+        def run():
+            try:
+                tokens = self._tokens(specs)
+                frames = loader()
+                self.stats["fetch"] += 1
+                with self._lock:
+                    saved = [
+                        self._publish(key, sheet, frame, v, tok)
+                        for (key, sheet), frame, v, tok in zip(specs, frames, versions, tokens)
+                    ]
+                    items = [
+                        (key, sv, self._entries[key]["frame"], tok, self._entries[key]["fetched_at"])
+                        for (key, _), sv, tok in zip(specs, shared_versions, tokens)
+                    ]
+                self._save_disk(saved)
+                self._share_frames(items)
+            except Exception as ex:
+                print(f"Gagal revalidasi {keys}:", ex)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(keys)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    # ---------- BERSAMA (lintas replika) ----------
+    def _sync_shared(self, sheets):
+        """
+        Baca versi bersama (paling sering sekali per shared_interval per sheet).
+        Sheet yang ditulis replika lain → versi lokal naik, snapshot lokal tidak dipakai lagi.
+        """
+        if self.shared is None:
+            return
+        now = time.time()
+        with self._lock:
+            todo = [s for s in dict.fromkeys(sheets) if now - self._shared_checked.get(s, 0) >= self.shared_interval]
+        if not todo:
+            return
+        try:
+            remote = self.shared.versions(todo)
+        except Exception as ex:
+            print("Cek versi bersama gagal:", ex)
+            return
+        with self._lock:
+            for sheet in todo:
+                self._shared_checked[sheet] = now
+                v = remote.get(sheet, 0)
+                if sheet not in self._shared_seen:
+                    self._shared_seen[sheet] = v  # pertama kali: belum ada yang perlu dibuang
+                elif v > self._shared_seen[sheet]:
+                    self._shared_seen[sheet] = v
+                    self._versions[sheet] = next(self._counter)
+
+    def _shared_bump(self, sheet):
+        if self.shared is None:
+            return None
+        try:
+            return self.shared.bump(sheet)
+        except Exception as ex:
+            print(f"Bump versi bersama {sheet} gagal:", ex)
+            return None
+
+    def _shared_frames(self, specs):
+        """Snapshot bersama (frame, meta) untuk semua specs bila versinya = versi bersama terkini, atau None."""
+        if self.shared is None:
+            return None
+        out = []
+        for key, sheet in specs:
+            try:
+                raw = self.shared.get("snap:" + key)
+                if raw is None:
+                    return None
+                head, _, body = bytes(raw).partition(b"\n")
+                meta = json.loads(head)
+                if meta.get("v") != self._shared_seen.get(sheet) or meta.get("schema") != self._schemas.get(key, schema_hash()):
+                    return None
+                out.append((pd.read_parquet(io.BytesIO(body)), meta))
+            except Exception as ex:
+                print(f"Gagal baca snapshot bersama {key}:", ex)
+                return None
+        self.stats["bersama_pakai"] += 1
+        return out
+
+    def _share_frames(self, items):
+        """items: list (key, versi bersama, frame, token, fetched_at) → disimpan untuk replika lain."""
+        if self.shared is None:
+            return
+        for key, sv, frame, token, fetched_at in items:
+            try:
+                buf = io.BytesIO()
+                frame.to_parquet(buf, index=False)
+                head = json.dumps(
+                    {"v": sv, "token": token, "fetched_at": fetched_at, "schema": self._schemas.get(key, schema_hash())},
+                    default=str,
+                ).encode()
+                self.shared.set("snap:" + key, head + b"\n" + buf.getvalue(), ttl=self.shared_ttl)
+                self.stats["bersama_simpan"] += 1
+            except Exception as ex:
+                print(f"Gagal simpan snapshot bersama {key}:", ex)
+
+    def _cold_start(self, specs):
+        """Key yang belum ada: snapshot bersama (versi cocok) bila ada, kalau tidak snapshot disk (basi)."""
+        saved = []
+        for key, sheet in specs:
+            found = self._shared_frames([(key, sheet)])
+            with self._lock:
+                if key in self._entries:
+                    continue
+                if found:
+                    frame, meta = found[0]
+                    saved.append(self._publish(key, sheet, frame, self._versions.get(sheet, 0), meta.get("token"), meta.get("fetched_at")))
+                else:
+                    self._load_disk(key, sheet)
+        self._save_disk(saved)
+
+    # ---------- BACA ----------
+    def get_many(self, specs, loader):
+        """
+        specs: list (key, sheet[, schema]). loader() → list frame sesuai urutan specs (satu fetch).
+        schema: kolom yang diminta loader (mis. INDEX_COLS); snapshot disk/bersama dengan
+        schema lain tidak dipakai. Return list view frame. Loader hanya dipanggil bila
+        snapshot belum ada, versinya dinaikkan (bump), atau probe bilang sheet berubah.
+        """
+        for spec in specs:
+            self._schemas[spec[0]] = schema_hash(spec[2] if len(spec) > 2 else None)
+        specs = [(spec[0], spec[1]) for spec in specs]
+        keys = tuple(k for k, _ in specs)
+        self._sync_shared([sheet for _, sheet in specs])
+        with self._lock:
+            missing = [(k, s) for k, s in specs if k not in self._entries]
+        if missing:
+            # start dingin: snapshot bersama / disk
+            self._cold_start(missing)
+        with self._lock:
+            current = [self._current(k) for k in keys]
+        if all(current):
+            # probe di luar lock (request jaringan)
+            if all([self._still_valid(k, e) for k, e in zip(keys, current)]):
+                return [_view(e["frame"]) for e in current]
+            # berubah / basi → tampilkan yang ada, fetch di latar
+            self._revalidate(specs, loader)
+            return [_view(e["frame"]) for e in current]
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(keys, threading.Lock())
+        shared_items = []
+        with load_lock:
+            # sesi lain mungkin sudah memuat selagi kita menunggu
+            with self._lock:
+                current = [self._current(k) for k in keys]
+                if all(current):
+                    return [_view(e["frame"]) for e in current]
+                versions = [self._versions.get(sheet, 0) for _, sheet in specs]
+                shared_versions = [self._shared_seen.get(sheet, 0) for _, sheet in specs]
+            # replika lain sudah memuat versi ini → tanpa fetch sheet
+            found = self._shared_frames(specs)
+            if found is not None:
+                with self._lock:
+                    saved = [
+                        self._publish(key, sheet, frame, v, meta.get("token"), meta.get("fetched_at"))
+                        for (key, sheet), (frame, meta), v in zip(specs, found, versions)
+                    ]
+                    out = [_view(self._entries[k]["frame"]) for k in keys]
+                self._save_disk(saved)
+                return out
+            tokens = self._tokens(specs)
+            frames = loader()
+            self.stats["fetch"] += 1
+            with self._lock:
+                saved = [
+                    self._publish(key, sheet, frame, v, tok)
+                    for (key, sheet), frame, v, tok in zip(specs, frames, versions, tokens)
+                ]
+                out = [_view(self._entries[k]["frame"]) for k in keys]
+                shared_items = [
+                    (key, sv, self._entries[key]["frame"], tok, self._entries[key]["fetched_at"])
+                    for (key, _), sv, tok in zip(specs, shared_versions, tokens)
+                ]
+            self._save_disk(saved)
+        self._share_frames(shared_items)
+        return out
+
+    def get(self, key, loader, sheet=None, schema=None):
+        return self.get_many([(key, sheet or key, schema)], lambda: [loader()])[0]
+
+    def recheck(self, sheet):
+        """Lewati jeda probe_interval: get berikutnya untuk sheet ini langsung bertanya ke probe."""
+        with self._lock:
+            self._shared_checked.pop(sheet, None)
+            for e in self._entries.values():
+                if e["sheet"] == sheet:
+                    e["checked_at"] = 0
+
+    def wait(self, keys, timeout=30):
+        """Tunggu revalidasi latar keys selesai (maks timeout detik). True bila selesai."""
+        batas = time.time() + timeout
+        while self.pending(keys):
+            if time.time() > batas:
+                return False
+            time.sleep(0.2)
+        return True
+
+    # ---------- TULIS ----------
+    def bump(self, sheet):
+        """Tandai semua snapshot sheet basi (fetch ulang saat dibaca berikutnya), juga di replika lain."""
+        v_shared = self._shared_bump(sheet)
+        with self._lock:
+            if v_shared is not None:
+                self._shared_seen[sheet] = v_shared
+            self._versions[sheet] = next(self._counter)
+            return self._versions[sheet]
+
+    def _apply(self, sheet, fn):
+        prev = self._shared_seen.get(sheet)
+        v_shared = self._shared_bump(sheet)
+        share = []
+        with self._lock:
+            v = self._versions[sheet] = next(self._counter)
+            for key, e in list(self._entries.items()):
+                if e["sheet"] != sheet:
+                    continue
+                frame = fn(e["frame"])
+                if frame is None:
+                    del self._entries[key]
+                else:
+                    self._entries[key] = dict(e, frame=frame, version=v)
+            if v_shared is not None:
+                if prev is not None and v_shared == prev + 1:
+                    # patch kita berada tepat di atas versi yang sudah kita lihat → bagikan
+                    self._shared_seen[sheet] = v_shared
+                    share = [
+                        (key, v_shared, e["frame"], e.get("token"), e["fetched_at"])
+                        for key, e in self._entries.items() if e["sheet"] == sheet and not e.get("stale")
+                    ]
+                else:
+                    # replika lain ikut menulis: patch lokal belum lengkap → cek berikutnya fetch ulang
+                    self._shared_seen[sheet] = v_shared - 1
+                    self._shared_checked[sheet] = 0
+        self._share_frames(share)
+        return v
+
+    def apply_update(self, sheet, key_col, key_val, updates: dict):
+        """Terapkan update sel (mis. Status Antrian) ke semua snapshot sheet, versi naik."""
+        def fn(df):
+            if key_col not in df.columns:
+                return None
+            return _set_cells(df, df[key_col].astype(str) == str(key_val), updates)
+        return self._apply(sheet, fn)
+
+    def apply_append(self, sheet, row: dict, typer=None):
+        """Tambah baris baru ke semua snapshot sheet. Snapshot ber-'_row' dibuang (nomor baris tidak pasti)."""
+        def fn(df):
+            if "_row" in df.columns:
+                return None
+            # kolom turunan (Tanggal Parsed) dibentuk ulang oleh typer
+            new = pd.DataFrame([{c: row.get(c, "") for c in df.columns if c != "Tanggal Parsed"}])
+            if typer is not None:
+                new = typer(new)
+            return _append_rows(df, new)
+        return self._apply(sheet, fn)
+
+# ------------------- STORE BERSAMA -------------------
+@st.cache_resource(show_spinner=False)
+def get_store():
+    return SnapshotStore(probe=make_probe(), shared=get_shared_cache())
+
+# ------------------- PENANDA UMUR DATA -------------------
+def show_data_age(*keys):
+    """
+    Caption 'data per …' untuk snapshot keys. Selama revalidasi latar berjalan,
+    fragment kecil mengecek tiap 2 detik lalu rerun halaman saat data baru masuk.
+    """
+    store = get_store()
+    infos = [store.info(k) for k in keys]
+    times = [t for _, t, _ in infos if t]
+    if not times:
+        return
+    tz = datetime.timezone(datetime.timedelta(hours=7))
+    waktu = datetime.datetime.fromtimestamp(min(times), tz).strftime("%d/%m/%Y %H:%M:%S")
+    if any(p for _, _, p in infos):
+        st.caption(f"🕒 Data per {waktu} WIB — memuat data terbaru di latar…")
+        fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+        if fragment is not None:
+            @fragment(run_every=2)
+            def _tunggu_revalidasi():
+                if not store.pending(keys):
+                    st.rerun()
+            _tunggu_revalidasi()
+    else:
+        st.caption(f"🕒 Data per {waktu} WIB")
@@ -0,0 +1,553 @@
+# ===================== STORAGE.PY (Penyimpanan: Google Sheet / SQLite Lokal) =====================
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+import pandas as pd
+import streamlit as st
+from Schema import validate_row, validate_update, ISO_COLS
+from Sheets import (
+    get_worksheet, read_batch, read_row_numbers, to_typed_frame, render_option, sheet_is_canonical,
+    append_typed, update_typed, find_marker, col_letter, REPLICA_COL,
+)
+from SharedCache import reserve_counter, sqlite_connect, SQLiteTx
+
+# Antarmuka yang dipakai Order, Pelanggan, Expense, Admin, Report:
+#   read(sheet, cols=None)                        → frame bertipe (to_typed_frame)
+#   read_many([(sheet, cols), ...])               → list frame (satu round trip bila bisa)
+#   read_rows(sheet, rows)                        → baris lengkap nomor tertentu (nomor = posisi read + 2)
+#   append(sheet, data)                           → dict baris baku yang ditulis
+#   update_by_key(sheet, key_col, key_val, upd)   → dict nilai baku (ValueError bila kunci tidak ada)
+#   next_nota(sheet, prefix)                      → nota berikutnya, unik
+#   version(sheet)                                → token perubahan (None = tidak tahu)
+#   header(sheet) / rows_after(sheet, n)          → baca baris baru saja (indeks pelanggan)
+#
+# CCKASIR_STORAGE = sheets (default) | sqlite[:path]
+#   sheets : Google Sheet sumber kebenaran (perilaku lama)
+#   sqlite : SQLite lokal sumber kebenaran, tulis dalam milidetik & tetap jalan
+#            saat offline; Replicator mengirim outbox ke Google Sheet di latar.
+
+SQLITE_FILE = "cckasir.db"
+KEY_COLS = {"Order": "No Nota"}
+MAX_TRIES = 5   # gagal permanen sebanyak ini → entri outbox masuk daftar gagal (dead letter)
+
+def storage_kind():
+    spec = os.environ.get("CCKASIR_STORAGE", "sheets").strip()
+    return "sqlite" if spec.lower().startswith("sqlite") else "sheets"
+
+# ------------------- GOOGLE SHEETS -------------------
+class SheetsStorage:
+    """Google Sheet langsung (gspread); tiap tulis = panggilan API."""
+
+    name = "sheets"
+    remote = True   # baca penuh mahal → halaman memakai indeks / paging
+
+    def read(self, sheet, cols=None):
+        if cols:
+            return read_batch([(sheet, cols)])[0]
+        ws = get_worksheet(sheet)
+        df = pd.DataFrame(ws.get_all_records(value_render_option=render_option(sheet)))
+        return to_typed_frame(df, canonical=sheet_is_canonical(sheet))
+
+    def read_many(self, specs):
+        return read_batch(specs)
+
+    def read_rows(self, sheet, rows):
+        return read_row_numbers(sheet, rows)
+
+    def append(self, sheet, data: dict, marker=None):
+        return append_typed(sheet, data, ws=get_worksheet(sheet), marker=marker)
+
+    def update_by_key(self, sheet, key_col, key_val, updates: dict):
+        return update_typed(sheet, key_col, key_val, updates, ws=get_worksheet(sheet))
+
+    def sent(self, sheet, marker):
+        """True bila baris bertanda marker (REPLICA_COL) sudah ada di sheet."""
+        return find_marker(sheet, marker, ws=get_worksheet(sheet))
+
+    def next_nota(self, sheet, prefix):
+        """
+        Nota terakhir di sheet jadi batas bawah, nomor berikutnya direservasi atomik
+        (SharedCache.reserve_counter) → dua kasir yang menyimpan bersamaan tidak
+        mendapat nota yang sama, juga antar replika bila backend bersama dipasang.
+        Gagal baca sheet dilempar ke pemanggil (bukan mulai dari 0 → nota bisa dobel).
+        """
+        num = 0
+        data = get_worksheet(sheet).col_values(1)
+        last_nota = None
+        for val in reversed(data[1:]):
+            if val.strip():
+                last_nota = val.strip()
+                break
+        if last_nota and last_nota.startswith(prefix):
+            num = int(last_nota.replace(prefix, ""))
+        num = reserve_counter(f"nota:{sheet}:{prefix}", num)
+        return f"{prefix}{num:07d}"
+
+    def version(self, sheet):
+        return None  # perubahan sheet dideteksi Freshness.DriveProbe / RowCountProbe
+
+    def header(self, sheet):
+        return get_worksheet(sheet).row_values(1)
+
+    def rows_after(self, sheet, n, header):
+        """Baris data ke-(n+1) dst. sebagai list nilai sesuai header."""
+        last_col = col_letter(len(header))
+        return get_worksheet(sheet).get(f"A{n + 2}:{last_col}")
+
+# ------------------- SQLITE (utama) + OUTBOX -------------------
+class SQLiteStorage:
+    """
+    Satu file SQLite: baris per sheet disimpan sebagai JSON (kolom = header sheet).
+    Setiap tulis + entri outbox dalam SATU transaksi; Replicator meneruskan outbox
+    ke Google Sheet sesuai urutan. Sheet diimpor sekali (baris asal 'sheet') saat
+    pertama dibaca, sesudahnya SQLite yang jadi acuan.
+    """
+
+    name = "sqlite"
+    remote = False
+
+    def __init__(self, path=SQLITE_FILE, sheets=None):
+        self.path = path
+        self.sheets = sheets or SheetsStorage()
+        self._local = threading.local()
+        self._import_lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        with self._tx() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS rows (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, sheet TEXT NOT NULL, origin INTEGER NOT NULL,
+                key TEXT, data TEXT NOT NULL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS rows_sheet ON rows (sheet, origin, id)")
+            db.execute("CREATE INDEX IF NOT EXISTS rows_key ON rows (sheet, key)")
+            db.execute("""CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, sheet TEXT NOT NULL, op TEXT NOT NULL,
+                key_col TEXT, key_val TEXT, data TEXT NOT NULL, created REAL NOT NULL,
+                tries INTEGER NOT NULL DEFAULT 0, error TEXT, done REAL, dead REAL)""")
+            if "dead" not in {r[1] for r in db.execute("PRAGMA table_info(outbox)")}:
+                db.execute("ALTER TABLE outbox ADD COLUMN dead REAL")  # file DB versi sebelumnya
+            db.execute("CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (done, id)")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, v INTEGER NOT NULL)")
+            db.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('instance', ?)", (uuid.uuid4().hex[:12],))
+        self.instance = self._meta("instance")
+
+    # ---------- KONEKSI ----------
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite_connect(self.path)
+        return db
+
+    def _tx(self):
+        return SQLiteTx(self._db())
+
+    def _meta(self, name, default=None):
+        row = self._db().execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def _set_meta(db, name, value):
+        db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, str(value)))
+
+    @staticmethod
+    def _bump(db, sheet):
+        db.execute(
+            "INSERT INTO counters (name, v) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET v = v + 1",
+            (f"versi:{sheet}",),
+        )
+
+    # ---------- IMPOR AWAL ----------
+    def imported(self, sheet):
+        return self._meta(f"impor:{sheet}") is not None
+
+    def ensure_imported(self, sheet):
+        """Salin isi sheet ke SQLite sekali. False bila belum bisa (mis. offline)."""
+        if self.imported(sheet):
+            return True
+        with self._import_lock:
+            if self.imported(sheet):
+                return True
+            try:
+                ws = get_worksheet(sheet)
+                canonical = sheet_is_canonical(sheet)
+                records = ws.get_all_records(value_render_option="UNFORMATTED_VALUE" if canonical else None)
+            except Exception as e:
+                print(f"Impor {sheet} dari Google Sheet gagal:", e)
+                return False
+            key_col = KEY_COLS.get(sheet)
+            milik = f"{self.instance}-"
+            with self._tx() as db:
+                ada = {r[0] for r in db.execute("SELECT key FROM rows WHERE sheet = ? AND key IS NOT NULL", (sheet,))}
+                for rec in records:
+                    if str(rec.pop(REPLICA_COL, "")).startswith(milik):
+                        continue  # ditulis lokal oleh file DB ini lalu terkirim
+                    key = str(rec.get(key_col, "")).strip() if key_col else None
+                    if key_col and (not key or key in ada):
+                        continue  # baris kosong / sudah ditulis lokal lalu terkirim
+                    db.execute(
+                        "INSERT INTO rows (sheet, origin, key, data) VALUES (?, 0, ?, ?)",
+                        (sheet, key, json.dumps(rec, default=str)),
+                    )
+                self._set_meta(db, f"impor:{sheet}", "baku" if canonical else "lama")
+                self._bump(db, sheet)
+            return True
+
+    # ---------- BACA ----------
+    def _records(self, sheet):
+        self.ensure_imported(sheet)
+        cur = self._db().execute("SELECT data FROM rows WHERE sheet = ? ORDER BY origin, id", (sheet,))
+        return [json.loads(r[0]) for r in cur]
+
+    def read(self, sheet, cols=None):
+        df = pd.DataFrame(self._records(sheet))
+        if cols:
+            iso = [i for i, src in ISO_COLS.get(sheet, {}).items() if src in cols and i not in cols]
+            df = df.reindex(columns=list(cols) + [c for c in iso if c in df.columns]).fillna("")
+        # baris impor dari sheet lama (belum dibakukan) → pembersihan angka per sel
+        return to_typed_frame(df, canonical=self._meta(f"impor:{sheet}") == "baku")
+
+    def read_many(self, specs):
+        return [self.read(s[0], s[1]) for s in specs]
+
+    def read_rows(self, sheet, rows):
+        """Baris ke-n sesuai urutan read (baris 2 = pertama), tanpa memuat seluruh sheet."""
+        self.ensure_imported(sheet)
+        wanted = sorted({int(r) for r in rows})
+        if not wanted:
+            return pd.DataFrame()
+        cur = self._db().execute(
+            "SELECT n, data FROM (SELECT ROW_NUMBER() OVER (ORDER BY origin, id) + 1 AS n, data FROM rows WHERE sheet = ?)"
+            f" WHERE n IN ({','.join('?' * len(wanted))})",
+            (sheet, *wanted),
+        )
+        by_row = {n: json.loads(d) for n, d in cur}
+        df = pd.DataFrame([by_row.get(int(r), {}) for r in rows])
+        return to_typed_frame(df, canonical=self._meta(f"impor:{sheet}") == "baku")
+
+    def header(self, sheet):
+        cols = {}
+        for rec in self._records(sheet):
+            cols.update(dict.fromkeys(rec))
+        return list(cols)
+
+    def rows_after(self, sheet, n, header):
+        cur = self._db().execute(
+            "SELECT data FROM rows WHERE sheet = ? ORDER BY origin, id LIMIT -1 OFFSET ?", (sheet, int(n))
+        )
+        out = []
+        for (data,) in cur:
+            rec = json.loads(data)
+            out.append([rec.get(h, "") for h in header])
+        return out
+
+    def version(self, sheet):
+        row = self._db().execute("SELECT v FROM counters WHERE name = ?", (f"versi:{sheet}",)).fetchone()
+        return row[0] if row else 0
+
+    # ---------- TULIS ----------
+    def append(self, sheet, data: dict):
+        row = validate_row(sheet, data)
+        key_col = KEY_COLS.get(sheet)
+        key = str(row.get(key_col, "")).strip() if key_col else None
+        payload = json.dumps(row, default=str)
+        with self._tx() as db:
+            db.execute("INSERT INTO rows (sheet, origin, key, data) VALUES (?, 1, ?, ?)", (sheet, key, payload))
+            db.execute(
+                "INSERT INTO outbox (sheet, op, key_col, key_val, data, created) VALUES (?, 'append', ?, ?, ?, ?)",
+                (sheet, key_col, key, payload, time.time()),
+            )
+            self._bump(db, sheet)
+        wake_replicator()
+        return row
+
+    def update_by_key(self, sheet, key_col, key_val, updates: dict):
+        key_val = str(key_val).strip()
+        row = validate_update(sheet, updates)
+        kirim = {k: row[k] for k in updates}  # tanpa ISO: sheet replika membakukan ulang sendiri
+        with self._tx() as db:
+            if key_col == KEY_COLS.get(sheet):
+                found = db.execute("SELECT id, data FROM rows WHERE sheet = ? AND key = ?", (sheet, key_val)).fetchall()
+            else:
+                found = db.execute(
+                    "SELECT id, data FROM rows WHERE sheet = ? AND CAST(json_extract(data, ?) AS TEXT) = ?",
+                    (sheet, f'$."{key_col}"', key_val),
+                ).fetchall()
+            if not found:
+                raise ValueError(f"Tidak ditemukan {key_col} {key_val}")
+            for rid, data in found:
+                db.execute("UPDATE rows SET data = ? WHERE id = ?", (json.dumps({**json.loads(data), **row}, default=str), rid))
+            db.execute(
+                "INSERT INTO outbox (sheet, op, key_col, key_val, data, created) VALUES (?, 'update', ?, ?, ?, ?)",
+                (sheet, key_col, key_val, json.dumps(kirim, default=str), time.time()),
+            )
+            self._bump(db, sheet)
+        wake_replicator()
+        return row
+
+    def resend(self, sheet, row_id):
+        """
+        Antrikan ulang baris lokal rows.id (mis. rekonsiliasi: hilang di sheet) tanpa
+        menggandakan baris SQLite; pengiriman tetap lewat Replicator (urutan, penanda
+        replika, dead letter). Return dict baris.
+        """
+        with self._tx() as db:
+            found = db.execute("SELECT key, data FROM rows WHERE id = ? AND sheet = ?", (row_id, sheet)).fetchone()
+            if not found:
+                raise ValueError(f"Baris lokal {row_id} tidak ada di {sheet}")
+            db.execute(
+                "INSERT INTO outbox (sheet, op, key_col, key_val, data, created) VALUES (?, 'append', ?, ?, ?, ?)",
+                (sheet, KEY_COLS.get(sheet), found[0], found[1], time.time()),
+            )
+        wake_replicator()
+        return json.loads(found[1])
+
+    def next_nota(self, sheet, prefix):
+        """Nomor terbesar di SQLite (termasuk hasil impor) jadi batas bawah; counter dalam transaksi yang sama."""
+        if not self.ensure_imported(sheet):
+            # tanpa isi sheet, nomor bisa bentrok dengan nota lama → butuh online sekali di awal
+            raise ConnectionError(f"Sheet {sheet} belum pernah diimpor; sambungkan internet sekali untuk impor awal")
+        name = f"nota:{sheet}:{prefix}"
+        with self._tx() as db:
+            top = db.execute(
+                "SELECT MAX(CAST(substr(key, ?) AS INTEGER)) FROM rows WHERE sheet = ? AND key LIKE ?",
+                (len(prefix) + 1, sheet, prefix.replace("%", "") + "%"),
+            ).fetchone()[0] or 0
+            row = db.execute("SELECT v FROM counters WHERE name = ?", (name,)).fetchone()
+            num = max(row[0] if row else 0, int(top)) + 1
+            db.execute("INSERT OR REPLACE INTO counters (name, v) VALUES (?, ?)", (name, num))
+        return f"{prefix}{num:07d}"
+
+    # ---------- OUTBOX ----------
+    def marker(self, oid):
+        """Penanda baris replika untuk entri outbox oid (unik antar file DB)."""
+        return f"{self.instance}-{oid}"
+
+    def pending(self, limit=50):
+        """
+        Entri belum terkirim sesuai urutan, tanpa entri gagal permanen dan tanpa
+        entri berkunci sama di belakangnya (update nota yang append-nya gagal ditahan).
+        """
+        cur = self._db().execute(
+            "SELECT id, sheet, op, key_col, key_val, data, tries FROM outbox o"
+            " WHERE done IS NULL AND dead IS NULL AND NOT EXISTS ("
+            "  SELECT 1 FROM outbox d WHERE d.dead IS NOT NULL AND d.done IS NULL"
+            "  AND d.sheet = o.sheet AND d.key_val = o.key_val AND d.id < o.id)"
+            " ORDER BY id LIMIT ?",
+            (limit,),
+        )
+        return [
+            {"id": i, "sheet": s, "op": op, "key_col": kc, "key_val": kv, "data": json.loads(d), "tries": t}
+            for i, s, op, kc, kv, d, t in cur
+        ]
+
+    def mark_attempt(self, oid):
+        """Catat percobaan SEBELUM mengirim → sesudah crash, tries > 0 berarti mungkin sudah sampai."""
+        with self._tx() as db:
+            db.execute("UPDATE outbox SET tries = tries + 1 WHERE id = ?", (oid,))
+
+    def mark_done(self, oid):
+        with self._tx() as db:
+            db.execute("UPDATE outbox SET done = ?, error = NULL WHERE id = ?", (time.time(), oid))
+            self._set_meta(db, "replikasi_terakhir", time.time())
+
+    def mark_failed(self, oid, error, dead=False):
+        with self._tx() as db:
+            db.execute(
+                "UPDATE outbox SET error = ?, dead = ? WHERE id = ?",
+                (str(error)[:500], time.time() if dead else None, oid),
+            )
+
+    def dead_letters(self):
+        """Entri yang gagal permanen (ditahan, tidak dikirim lagi sampai retry_dead)."""
+        cur = self._db().execute(
+            "SELECT id, sheet, op, key_val, tries, error, dead FROM outbox"
+            " WHERE done IS NULL AND dead IS NOT NULL ORDER BY id"
+        )
+        return pd.DataFrame(cur.fetchall(), columns=["id", "sheet", "op", "kunci", "percobaan", "error", "gagal"])
+
+    def retry_dead(self):
+        """
+        Kembalikan semua entri gagal ke antrian (mis. sesudah header sheet dibetulkan).
+        tries tidak di-nol-kan: cek penanda tetap jalan, gagal lagi → langsung dead letter.
+        """
+        with self._tx() as db:
+            return db.execute("UPDATE outbox SET dead = NULL WHERE done IS NULL AND dead IS NOT NULL").rowcount
+
+    def acquire_lease(self, owner, ttl=60):
+        """Satu replicator per file DB (beberapa proses boleh berbagi file)."""
+        now = time.time()
+        with self._tx() as db:
+            row = db.execute("SELECT value FROM meta WHERE name = 'replicator'").fetchone()
+            if row:
+                holder, until = row[0].rsplit("|", 1)
+                if holder != owner and float(until) > now:
+                    return False
+            self._set_meta(db, "replicator", f"{owner}|{now + ttl}")
+            return True
+
+    def outbox_status(self):
+        db = self._db()
+        n, tertua = db.execute("SELECT COUNT(*), MIN(created) FROM outbox WHERE done IS NULL AND dead IS NULL").fetchone()
+        mati = db.execute("SELECT COUNT(*) FROM outbox WHERE done IS NULL AND dead IS NOT NULL").fetchone()[0]
+        err = db.execute(
+            "SELECT error, tries FROM outbox WHERE done IS NULL AND dead IS NULL AND error IS NOT NULL ORDER BY id LIMIT 1"
+        ).fetchone()
+        terakhir = self._meta("replikasi_terakhir")
+        return {
+            "antri": n, "tertua": tertua, "error": err[0] if err else None, "percobaan": err[1] if err else 0,
+            "mati": mati, "terakhir": float(terakhir) if terakhir else None,
+        }
+
+    def local_rows(self, sheet):
+        """Baris tulis lokal (bukan hasil impor) tanpa tulis tertunda → sumber rekonsiliasi ('_id' = rows.id)."""
+        cur = self._db().execute(
+            "SELECT r.id, r.data FROM rows r WHERE r.sheet = ? AND r.origin = 1 AND NOT EXISTS ("
+            " SELECT 1 FROM outbox o WHERE o.sheet = r.sheet AND o.done IS NULL"
+            " AND (o.key_val = r.key OR (r.key IS NULL AND o.data = r.data)))",
+            (sheet,),
+        )
+        return pd.DataFrame([{**json.loads(data), "_id": rid} for rid, data in cur])
+
+# ------------------- REPLIKASI KE GOOGLE SHEET -------------------
+def _sementara(ex):
+    """Gagal karena jaringan / kuota / server → tunggu, jangan dianggap gagal permanen."""
+    if isinstance(ex, OSError):  # ConnectionError, timeout (requests ikut OSError)
+        return True
+    status = getattr(getattr(ex, "response", None), "status_code", None)
+    return status in (408, 429, 500, 502, 503, 504)
+
+class Replicator:
+    """
+    Thread latar: kirim outbox SQLite ke Google Sheet berurutan.
+    Gagal sementara (offline / kuota) → berhenti di entri itu dan coba lagi nanti
+    (urutan tetap). Gagal permanen MAX_TRIES kali → entri jadi dead letter, antrian
+    jalan terus (entri berkunci sama di belakangnya ikut ditahan).
+    Tiap append membawa penanda outbox (REPLICA_COL); percobaan dicatat sebelum
+    kirim, jadi pengiriman ulang sesudah timeout / crash dicek dulu di sheet.
+    Update menimpa nilai yang sama → aman diulang.
+    """
+
+    def __init__(self, storage, interval=5, retry=30):
+        self.storage = storage
+        self.interval = interval
+        self.retry = retry
+        self.owner = uuid.uuid4().hex[:12]
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()  # flush manual ("Kirim Sekarang") vs thread latar
+        self.stats = {"terkirim": 0, "gagal": 0}
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name="cckasir-replicator").start()
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            tunggu = self.interval
+            try:
+                if self.flush() is False:
+                    tunggu = self.retry
+            except Exception as e:
+                print("Replikasi gagal:", e)
+                tunggu = self.retry
+            self._wake.wait(tunggu)
+            self._wake.clear()
+
+    def flush(self, limit=50):
+        """Kirim sampai limit entri. Return jumlah terkirim, atau False bila berhenti karena gagal."""
+        with self._flush_lock:
+            return self._flush(limit)
+
+    def _flush(self, limit):
+        st_ = self.storage
+        if not st_.acquire_lease(self.owner):
+            return 0
+        sent = 0
+        tahan = set()  # (sheet, kunci) yang entrinya baru jadi dead letter di putaran ini
+        for e in st_.pending(limit):
+            if e["key_val"] is not None and (e["sheet"], e["key_val"]) in tahan:
+                continue
+            try:
+                if not st_.ensure_imported(e["sheet"]):
+                    raise ConnectionError("impor awal belum berhasil")
+                st_.mark_attempt(e["id"])
+                if e["op"] == "append":
+                    marker = st_.marker(e["id"])
+                    if e["tries"] and st_.sheets.sent(e["sheet"], marker):
+                        pass  # percobaan sebelumnya sudah sampai ke sheet
+                    else:
+                        st_.sheets.append(e["sheet"], e["data"], marker=marker)
+                else:
+                    st_.sheets.update_by_key(e["sheet"], e["key_col"], e["key_val"], e["data"])
+            except Exception as ex:
+                self.stats["gagal"] += 1
+                if _sementara(ex) or e["tries"] + 1 < MAX_TRIES:
+                    st_.mark_failed(e["id"], ex)
+                    return False
+                st_.mark_failed(e["id"], ex, dead=True)
+                tahan.add((e["sheet"], e["key_val"]))
+                print(f"Outbox {e['id']} ({e['sheet']} {e['op']}) gagal permanen:", ex)
+                continue
+            st_.mark_done(e["id"])
+            self.stats["terkirim"] += 1
+            sent += 1
+        return sent
+
+# ------------------- PILIH BACKEND -------------------
+@st.cache_resource(show_spinner=False)
+def _replicator(path):
+    return Replicator(SQLiteStorage(path)).start()
+
+@st.cache_resource(show_spinner=False)
+def get_storage():
+    spec = os.environ.get("CCKASIR_STORAGE", "sheets").strip()
+    if storage_kind() == "sqlite":
+        path = spec.split(":", 1)[1] if ":" in spec else SQLITE_FILE
+        storage = SQLiteStorage(path or SQLITE_FILE)
+        _replicator(storage.path)
+        return storage
+    return SheetsStorage()
+
+def wake_replicator():
+    if storage_kind() == "sqlite":
+        try:
+            path = get_storage().path
+            _replicator(path).wake()
+        except Exception:
+            pass
+
+# ------------------- TAMPILAN -------------------
+def show_storage_status():
+    """Status replikasi SQLite → Google Sheet (halaman Admin)."""
+    storage = get_storage()
+    if storage.remote:
+        return
+    st.subheader("📤 Replikasi ke Google Sheet")
+    s = storage.outbox_status()
+    tz = _wib
+    c1, c2 = st.columns(2)
+    c1.metric("Antrian kirim", s["antri"])
+    c2.metric("Terakhir terkirim", tz(s["terakhir"]) if s["terakhir"] else "-")
+    if s["antri"] and s["tertua"]:
+        st.caption(f"Entri tertua menunggu sejak {tz(s['tertua'])} WIB.")
+    if s["error"]:
+        st.warning(f"⚠️ Gagal kirim ({s['percobaan']}x): {s['error']}")
+    if s["mati"]:
+        st.error(f"❌ {s['mati']} entri gagal permanen ({MAX_TRIES}x) dan tidak dikirim lagi.")
+        st.dataframe(storage.dead_letters(), hide_index=True)
+        if st.button("🔁 Antrikan Ulang Entri Gagal"):
+            n = storage.retry_dead()
+            wake_replicator()
+            st.toast(f"{n} entri diantrikan ulang.")
+    if st.button("📤 Kirim Sekarang"):
+        wake_replicator()
+        st.toast("Replikasi dijalankan di latar.")
+
+def _wib(t):
+    tz = datetime.timezone(datetime.timedelta(hours=7))
+    return datetime.datetime.fromtimestamp(float(t), tz).strftime("%d/%m/%Y %H:%M:%S")
@@ -0,0 +1,87 @@
+# ===================== TABLE.PY (Tabel Besar: Arrow Cache + Per Halaman) =====================
+import math
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+
+# st.dataframe(frame_penuh) menserialisasi SEMUA baris ke browser setiap rerun.
+# Di sini frame hasil filter diubah ke pyarrow.Table sekali per
+# (tabel, filter, versi snapshot); urut dan pilih kolom dikerjakan di server,
+# yang dikirim hanya satu halaman (slice Arrow, tanpa salin).
+
+PAGE_SIZES = [50, 100, 250, 500]
+
+# ------------------- ARROW (di-cache) -------------------
+def _to_arrow(df):
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # kolom object campuran (angka + teks) → teks
+        obj = df.select_dtypes(include="object").columns
+        return pa.Table.from_pandas(df.astype({c: str for c in obj}), preserve_index=False)
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def arrow_table(_df, table_key, filter_key, snapshot_id, _display=None):
+    """
+    Frame → pyarrow.Table sekali per (tabel, filter, versi data).
+    _display: {kolom tampil: (kolom asal, fungsi)}, dibentuk sekali di sini.
+    """
+    df = _df
+    if _display:
+        df = df.assign(**{
+            col: df[src].map(fn) for col, (src, fn) in _display.items() if src in df.columns
+        })
+    return _to_arrow(df)
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def sorted_table(_tbl, table_key, filter_key, snapshot_id, sort_col, ascending):
+    """Urutan baris stabil per kolom; kosong (null) selalu di bawah."""
+    if not sort_col or sort_col not in _tbl.column_names:
+        return _tbl
+    col = _tbl[sort_col]
+    if pa.types.is_dictionary(col.type):
+        col = col.cast(col.type.value_type)
+    idx = pc.array_sort_indices(
+        col.combine_chunks(), order="ascending" if ascending else "descending", null_placement="at_end"
+    )
+    return _tbl.take(idx)
+
+# ------------------- TAMPILAN -------------------
+def render_table(df, table_key, filter_key, snapshot_id, cols, display=None, page_size=100):
+    """
+    Tabel per halaman untuk frame besar.
+    table_key   : nama unik tabel (juga awalan key widget)
+    filter_key  : apa pun yang membedakan hasil filter (mis. ("bulan", "2025-01"))
+    snapshot_id : versi data (SnapshotStore.info(key)[:2])
+    cols        : kolom yang ditampilkan (urutan default)
+    display     : {kolom tampil: (kolom asal, fungsi)}; urut kolom tampil memakai kolom asal
+    """
+    display = display or {}
+    tbl = arrow_table(df, table_key, filter_key, snapshot_id, display)
+    cols = [c for c in cols if c in tbl.column_names]
+
+    with st.expander("⚙️ Kolom & Urutan"):
+        tampil = st.multiselect("Kolom", cols, default=cols, key=f"{table_key}_kolom") or cols
+        c1, c2, c3 = st.columns([2, 1, 1])
+        urut = c1.selectbox("Urutkan", ["(asli)"] + tampil, key=f"{table_key}_urut")
+        turun = c2.toggle("Terbesar dulu", value=False, key=f"{table_key}_turun")
+        size = c3.selectbox(
+            "Baris/halaman", PAGE_SIZES,
+            index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 0, key=f"{table_key}_size",
+        )
+
+    sort_col = None if urut == "(asli)" else display.get(urut, (urut, None))[0]
+    view = sorted_table(tbl, table_key, filter_key, snapshot_id, sort_col, not turun)
+
+    n = view.num_rows
+    pages = max(1, math.ceil(n / size))
+    page_key = f"{table_key}_hal"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages  # filter berubah → hasil lebih sedikit
+    if pages > 1:
+        hal = st.number_input(f"Halaman (dari {pages})", min_value=1, max_value=pages, value=1, step=1, key=page_key)
+    else:
+        hal = 1
+    start = (hal - 1) * size
+    st.dataframe(view.slice(start, size).select(tampil), use_container_width=True, hide_index=True)
+    st.caption(f"Baris {start + 1 if n else 0:,}–{min(start + size, n):,} dari {n:,}".replace(",", "."))
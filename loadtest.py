@@ -0,0 +1,286 @@
+# ===================== loadtest.py (Tes Beban Multi-Sesi) =====================
+# Jalankan:  python loadtest.py --users 4 --iterations 10 --latency 0.05
+#
+# N pengguna simulasi (thread) masing-masing memegang sesi AppTest sendiri dan
+# menjalankan campuran aksi kasir terhadap backend Sheets palsu (FakeSheets):
+#   order  → streamlit_app.py (halaman default Order), isi form, Simpan Transaksi
+#   ready  → halaman Pelanggan, klik "✅ Siap Diambil" pada kartu Antrian pertama
+#   report → halaman Report
+# Semua sesi berbagi cache proses yang sama (st.cache_*, SnapshotStore),
+# sama seperti beberapa tablet yang membuka satu instance app.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+import FakeSheets  # noqa: E402
+
+APP = os.path.join(ROOT, "streamlit_app.py")
+PAGE_SCRIPT = """
+import {module}
+{module}.show()
+"""
+
+# ------------------- UTIL -------------------
+def _offline_get(url, *args, **kwargs):
+    # jam internet (worldtimeapi) tidak dipakai saat tes → fallback ke jam lokal
+    raise requests.ConnectionError("offline (loadtest)")
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    vals = sorted(values)
+    k = min(len(vals) - 1, max(0, int(round(p / 100 * (len(vals) - 1)))))
+    return vals[k]
+
+def seed(backend):
+    admin = backend.sheets["Admin"]
+    for layanan, harga in [("Cuci Lipat", 7000), ("Cuci Setrika", 9000), ("Cuci Lipat Express", 12000), ("Cuci Setrika Express", 15000)]:
+        admin.append(["Baju Biasa", layanan, harga, ""])
+
+def prepare_apptest():
+    """
+    AppTest dibuat untuk satu sesi per proses: tiap run memasang lalu melepas
+    Runtime palsu, flag config global.appTest dan st.secrets. Dengan banyak
+    thread, run yang selesai mencabut semua itu dari run lain yang masih jalan.
+    Di sini dipasang sekali untuk seluruh proses (seperti satu server Streamlit
+    dengan banyak sesi): satu Runtime palsu bersama (cache_data ikut bersama),
+    flag appTest tetap menyala, secrets dibaca dari .streamlit/secrets.toml.
+    """
+    import contextlib
+    import types
+    from unittest.mock import MagicMock
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    try:
+        from streamlit.dataframe.lazy_df_source import DataframeSourceManager
+        runtime.dataframe_source_mgr = DataframeSourceManager()
+    except ImportError:
+        pass
+    Runtime._instance = runtime
+    config.set_option("global.appTest", True)
+    app_test.Runtime = types.SimpleNamespace()  # penugasan _instance per run tidak lagi menyentuh Runtime asli
+    app_test.patch_config_options = lambda options: contextlib.nullcontext()
+
+def _new_session(path=None, module=None):
+    from streamlit.testing.v1 import AppTest
+    if path:
+        return AppTest.from_file(path, default_timeout=60)
+    return AppTest.from_string(PAGE_SCRIPT.format(module=module), default_timeout=60)
+
+def _widget(elements, label=None, key=None):
+    for w in elements:
+        if (label is not None and w.label == label) or (key is not None and w.key == key):
+            return w
+    raise LookupError(label or key)
+
+# ------------------- SIMULASI PENGGUNA -------------------
+class SimUser:
+    """Satu tablet kasir: sesi AppTest per halaman, dibuat saat pertama dipakai."""
+
+    def __init__(self, uid, results, double=0.0):
+        self.uid = uid
+        self.results = results
+        self.double = double
+        self.sessions = {}
+        self.seq = 0
+
+    def session(self, name):
+        if name not in self.sessions:
+            self.sessions[name] = (
+                _new_session(path=APP) if name == "order" else _new_session(module=name.capitalize())
+            )
+        return self.sessions[name]
+
+    def _record(self, action, seconds, ok, error=None):
+        with self.results["lock"]:
+            self.results["latency"].setdefault(action, []).append(seconds)
+            if not ok:
+                self.results["errors"].append(f"{action} (user {self.uid}): {error}")
+
+    def order(self):
+        at = self.session("order")
+        self.seq += 1
+        nama = f"LT-{self.uid}-{self.seq}"
+        t = time.perf_counter()
+        try:
+            at.run()
+            # rincian harga (fragment) dan isian form dikirim bersama saat Simpan
+            _widget(at.number_input, key="berat_kg").set_value(random.randint(1, 8))
+            _widget(at.text_input, key="nama_pelanggan").input(nama)
+            _widget(at.text_input, key="no_hp").input(f"0812{self.uid:03d}{self.seq:05d}")
+            _widget(at.button, label="💾 Simpan Transaksi").click().run()
+            ok = [s.value for s in at.success if "berhasil disimpan" in s.value]
+            if ok:
+                nota = ok[0].split("Laundry ", 1)[1].split(" ", 1)[0]
+                with self.results["lock"]:
+                    self.results["orders"].append((nota, nama))
+                if random.random() < self.double:
+                    # klik ganda: kirim form yang sama sekali lagi
+                    _widget(at.button, label="💾 Simpan Transaksi").click().run()
+                    with self.results["lock"]:
+                        self.results["double"] += 1
+            self._record("order", time.perf_counter() - t, bool(ok), None if ok else [e.value for e in at.error])
+        except Exception as e:
+            self._record("order", time.perf_counter() - t, False, e)
+
+    def ready(self):
+        at = self.session("pelanggan")
+        t = time.perf_counter()
+        try:
+            at.run()
+            buttons = [b for b in at.button if (b.key or "").startswith("ambil_")]
+            if buttons:
+                nota = buttons[0].key[len("ambil_"):].rsplit("_", 1)[0]
+                buttons[0].click().run()
+                if any("Siap Diambil" in s.value for s in at.success):
+                    with self.results["lock"]:
+                        self.results["ready"].append(nota)
+            self._record("ready", time.perf_counter() - t, not at.exception, at.exception or None)
+        except Exception as e:
+            self._record("ready", time.perf_counter() - t, False, e)
+
+    def report(self):
+        at = self.session("report")
+        t = time.perf_counter()
+        try:
+            at.run()
+            self._record("report", time.perf_counter() - t, not at.exception, at.exception or None)
+        except Exception as e:
+            self._record("report", time.perf_counter() - t, False, e)
+
+    def run(self, iterations, mix):
+        actions = [a for a, w in mix.items() for _ in range(w)]
+        for _ in range(iterations):
+            getattr(self, random.choice(actions))()
+
+# ------------------- VERIFIKASI -------------------
+def verify(backend, results):
+    """Hitung nota ganda dan tulis hilang dari isi sheet palsu."""
+    rows = backend.sheets["Order"]
+    header = rows[0]
+    i_nota, i_nama, i_status = header.index("No Nota"), header.index("Nama Pelanggan"), header.index("Status Antrian")
+    by_nota = {}
+    for r in rows[1:]:
+        by_nota.setdefault(r[i_nota], []).append(r)
+    duplicate = sum(len(v) - 1 for v in by_nota.values() if len(v) > 1)
+    lost_orders = sum(
+        1 for nota, nama in results["orders"]
+        if not any(r[i_nama] == nama for r in by_nota.get(nota, []))
+    )
+    lost_ready = sum(
+        1 for nota in set(results["ready"])
+        if not any(r[i_status] == "Siap Diambil" for r in by_nota.get(nota, []))
+    )
+    return {"rows": len(rows) - 1, "duplicate_nota": duplicate, "lost_orders": lost_orders, "lost_ready": lost_ready}
+
+# ------------------- MAIN -------------------
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, w = part.split("=")
+        mix[name.strip()] = int(w)
+    return mix
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tes beban multi-sesi TR Laundry (backend Sheets palsu).")
+    ap.add_argument("--users", type=int, default=4)
+    ap.add_argument("--iterations", type=int, default=10, help="aksi per pengguna")
+    ap.add_argument("--latency", type=float, default=0.05, help="jeda per panggilan API palsu (detik)")
+    ap.add_argument("--mix", default="order=5,ready=3,report=2")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--double", type=float, default=0.0, help="peluang klik ganda Simpan Transaksi (0–1)")
+    ap.add_argument("--shared", default="none", help="CCKASIR_SHARED_CACHE: none | memory | sqlite (file di folder tes) | redis://…")
+    ap.add_argument("--storage", default="sheets", help="CCKASIR_STORAGE: sheets | sqlite (file di folder tes)")
+    ap.add_argument("--drain-timeout", type=float, default=60.0, help="batas waktu menunggu outbox SQLite habis (detik)")
+    args = ap.parse_args(argv)
+    random.seed(args.seed)
+
+    # file lokal (config.json, snapshots/, cache CSV) ke folder sementara
+    os.chdir(tempfile.mkdtemp(prefix="cckasir-loadtest-"))
+    os.makedirs(".streamlit", exist_ok=True)
+    with open(os.path.join(".streamlit", "secrets.toml"), "w") as f:
+        f.write('[gcp_service_account]\ntype = "service_account"\n')
+    prepare_apptest()
+    os.environ.setdefault("CCKASIR_PROBE", "drive")
+    os.environ["CCKASIR_SHARED_CACHE"] = "sqlite:shared_cache.db" if args.shared == "sqlite" else args.shared
+    os.environ["CCKASIR_STORAGE"] = "sqlite:cckasir.db" if args.storage == "sqlite" else args.storage
+    requests.get = _offline_get
+    backend = FakeSheets.install(FakeSheets.FakeBackend(latency=args.latency))
+    seed(backend)
+
+    results = {"lock": threading.Lock(), "latency": {}, "errors": [], "orders": [], "ready": [], "double": 0}
+    mix = parse_mix(args.mix)
+
+    # pemanasan: import modul + isi cache proses, tidak diukur
+    warm = SimUser(0, {"lock": threading.Lock(), "latency": {}, "errors": [], "orders": [], "ready": [], "double": 0})
+    for name in mix:
+        getattr(warm, name)()
+
+    tracemalloc.start()
+    base_mem = tracemalloc.get_traced_memory()[0]
+    users = [SimUser(i + 1, results, args.double) for i in range(args.users)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as ex:
+        list(ex.map(lambda u: u.run(args.iterations, mix), users))
+    wall = time.perf_counter() - t0
+    mem_per_session = (tracemalloc.get_traced_memory()[0] - base_mem) / max(1, sum(len(u.sessions) for u in users))
+    tracemalloc.stop()
+
+    total = sum(len(v) for v in results["latency"].values())
+    print(f"\n=== Tes beban: {args.users} pengguna x {args.iterations} aksi, latensi API {args.latency * 1000:.0f} ms ===")
+    print(f"Durasi           : {wall:.2f} s")
+    print(f"Throughput       : {total / wall:.2f} aksi/detik")
+    print(f"{'Aksi':<10}{'n':>6}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for action, vals in sorted(results["latency"].items()):
+        print(f"{action:<10}{len(vals):>6}{percentile(vals, 50) * 1000:>12.0f}{percentile(vals, 99) * 1000:>12.0f}")
+    print(f"Memori per sesi  : {mem_per_session / 1024:.0f} KiB (tracemalloc)")
+    print(f"Panggilan API    : {sum(backend.calls.values())} {dict(sorted(backend.calls.items()))}")
+    from Snapshot import get_store
+    print(f"Cache bersama    : {os.environ['CCKASIR_SHARED_CACHE']} {get_store().stats}")
+    if args.storage == "sqlite":
+        # sheet = replika: tunggu outbox habis terkirim sebelum dicek
+        from Storage import get_storage, _replicator
+        storage = get_storage()
+        batas = time.time() + args.drain_timeout
+        while storage.outbox_status()["antri"] and time.time() < batas:
+            if _replicator(storage.path).flush() is False:
+                time.sleep(0.5)  # gagal sementara: beri jeda sebelum coba lagi
+        s = storage.outbox_status()
+        print(f"Storage          : sqlite {_replicator(storage.path).stats}, "
+              f"masih antri {s['antri']}, gagal permanen {s['mati']}")
+        if s["antri"]:
+            print(f"  ! outbox belum habis dalam {args.drain_timeout:.0f} s; order yang belum terkirim terhitung hilang")
+    check = verify(backend, results)
+    print(f"Baris Order      : {check['rows']}")
+    print(f"Nota ganda       : {check['duplicate_nota']}")
+    print(f"Order hilang     : {check['lost_orders']} dari {len(results['orders'])}")
+    print(f"Siap Diambil hilang: {check['lost_ready']} dari {len(set(results['ready']))}")
+    from Idempotency import suppressed_counts
+    print(f"Klik ganda       : {results['double']} dikirim, dicegah {suppressed_counts()}")
+    if results["errors"]:
+        print(f"Error            : {len(results['errors'])}")
+        for e in results["errors"][:10]:
+            print("  -", e)
+    return check
+
+if __name__ == "__main__":
+    main()
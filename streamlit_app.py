@@ -1,7 +1,13 @@
 # ========================== app.py (Laundry v2.1) - Dengan Login Admin ==========================
+import pandas as pd
 import streamlit as st
 from streamlit_option_menu import option_menu
-import Order, Report, Setting, Admin, Expense, Pelanggan
+
+# Copy-on-write untuk pandas 2 (pandas 3 selalu aktif): snapshot bersama dibagi
+# antar sesi sebagai view dangkal (lihat Snapshot._view)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+import Order, Report, Setting, Admin, Expense, Pelanggan, Delivery
 
 # ---------------------- KONFIGURASI HALAMAN ----------------------
 st.set_page_config(
@@ -52,11 +58,13 @@ with st.sidebar:
             [
                 "🧾 Order Laundry",
                 "✅ Pelanggan",
+                "🛵 Antar Jemput",
                 "🔐 Login Admin"
             ],
             icons=[
                 "file-earmark-plus",
                 "person-check",
+                "bicycle",
                 "lock"
             ],
             menu_icon="shop",
@@ -69,6 +77,7 @@ with st.sidebar:
             [
                 "🧾 Order Laundry",
                 "✅ Pelanggan",
+                "🛵 Antar Jemput",
                 "💸 Pengeluaran",   # Hanya admin
                 "📈 Report",
                 "📦 Admin",
@@ -78,6 +87,7 @@ with st.sidebar:
             icons=[
                 "file-earmark-plus",
                 "person-check",
+                "bicycle",
                 "cash-coin",
                 "bar-chart-line",
                 "box-seam",
@@ -94,6 +104,8 @@ if not st.session_state.logged_in:
         Order.show()
     elif selected == "✅ Pelanggan":
         Pelanggan.show()
+    elif selected == "🛵 Antar Jemput":
+        Delivery.show()
     elif selected == "🔐 Login Admin":
         login_form()
 else:
@@ -101,6 +113,8 @@ else:
         Order.show()
     elif selected == "✅ Pelanggan":
         Pelanggan.show()
+    elif selected == "🛵 Antar Jemput":
+        Delivery.show()
     elif selected == "💸 Pengeluaran":
         Expense.show()  # Admin akses Pengeluaran
     elif selected == "📈 Report":
@@ -0,0 +1,24 @@
+# ===================== CONFTEST.PY (Fixture Tes: Backend Sheets Palsu) =====================
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import FakeSheets  # noqa: E402
+import SharedCache  # noqa: E402
+import Sheets  # noqa: E402
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path):
+    """FakeBackend baru per tes; get_worksheet/get_spreadsheet diarahkan ke sana."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("CCKASIR_STORAGE", raising=False)
+    monkeypatch.delenv("CCKASIR_SHARED_CACHE", raising=False)
+    fake = FakeSheets.FakeBackend()
+    monkeypatch.setattr(Sheets, "get_spreadsheet", lambda: FakeSheets.FakeSpreadsheet(fake, Sheets.SPREADSHEET_ID))
+    monkeypatch.setattr(SharedCache, "_LOKAL", SharedCache.MemoryBackend())
+    Sheets.get_header_map.clear()
+    yield fake
+    Sheets.get_header_map.clear()
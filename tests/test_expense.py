@@ -0,0 +1,43 @@
+# ===================== TEST_EXPENSE.PY (Sinkronisasi Cache CSV Tanpa Ganda) =====================
+import pandas as pd
+import pytest
+import Expense
+from Storage import SheetsStorage
+from test_storage import pengeluaran, rows
+
+@pytest.fixture
+def cache(backend, monkeypatch):
+    monkeypatch.setattr(Expense, "get_storage", lambda: SheetsStorage())
+    lama = [dict(pengeluaran(k), uploaded=False, **{"Jenis Transaksi": "Cash"}) for k in ("Sabun", "Plastik")]
+    pd.DataFrame(lama).to_csv(Expense.CACHE_FILE, index=False)  # format lama: tanpa ID Lokal
+    return backend
+
+def test_legacy_rows_get_stable_ids(cache):
+    ids = list(Expense.load_local_data()[Expense.ID_COL])
+    assert len(set(ids)) == 2
+    assert list(Expense.load_local_data()[Expense.ID_COL]) == ids
+
+def test_sync_twice_uploads_once(cache):
+    Expense.sync_local_cache()
+    Expense.sync_local_cache()
+    assert [r["Keterangan"] for r in rows(cache, "Pengeluaran")] == ["Sabun", "Plastik"]
+    assert Expense.load_local_data()["uploaded"].all()
+
+def test_interrupted_or_parallel_sync_does_not_duplicate(cache):
+    # sesi lain sudah mengupload baris pertama tapi belum sempat menandai CSV
+    first = Expense.load_local_data().iloc[0].to_dict()
+    written, ganda = Expense.upload_row(first)
+    assert written and not ganda
+    Expense.sync_local_cache()
+    assert [r["Keterangan"] for r in rows(cache, "Pengeluaran")] == ["Sabun", "Plastik"]
+
+def test_failed_upload_is_retried_by_sync(cache, monkeypatch):
+    row = Expense.load_local_data().iloc[0].to_dict()
+    def offline(sheet, data):
+        raise ConnectionError("offline")
+    with monkeypatch.context() as m:
+        m.setattr(Expense, "append_to_sheet", offline)
+        with pytest.raises(ConnectionError):
+            Expense.upload_row(row)  # klaim dilepas → boleh dicoba lagi
+    Expense.sync_local_cache()
+    assert [r["Keterangan"] for r in rows(cache, "Pengeluaran")] == ["Sabun", "Plastik"]
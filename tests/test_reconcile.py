@@ -0,0 +1,137 @@
+# ===================== TEST_RECONCILE.PY (Digest per Bulan, Drill-down, Perbaikan) =====================
+import pandas as pd
+import pytest
+import Reconcile
+import Sheets
+from FakeSheets import FakeWorksheet
+from Reconcile import reconcile_source, repair, SheetMoved, HILANG, GANDA, BEDA
+from Sheets import REPLICA_COL
+from Storage import SheetsStorage, SQLiteStorage, Replicator
+from test_storage import order, pengeluaran, rows
+
+ORDERS = [
+    order("TRX/0000001", **{"Tanggal Masuk": "10/01/2026 - 08:00"}),
+    order("TRX/0000002", **{"Tanggal Masuk": "11/01/2026 - 08:00"}),
+    order("TRX/0000003", **{"Tanggal Masuk": "05/08/2026 - 08:00"}),
+]
+
+@pytest.fixture(autouse=True)
+def month_cache(backend, monkeypatch):
+    monkeypatch.setattr(Reconcile, "get_spreadsheet", Sheets.get_spreadsheet)  # modifiedTime dari backend palsu
+    Reconcile._month_cache.clear()
+    yield
+    Reconcile._month_cache.clear()
+
+def source(sheet, loader, name="tes", write=Reconcile._storage_append, on_written=None):
+    return {"sheet": sheet, "name": name, "loader": loader, "write": write, "on_written": on_written}
+
+def sheet_with(backend, records, sheet="Order"):
+    storage = SheetsStorage()
+    for rec in records:
+        storage.append(sheet, rec)
+    return storage
+
+def set_cell(backend, sheet, row, col, value, touch=True):
+    header = backend.sheets[sheet][0]
+    if touch:
+        backend.write_cell(sheet, row, header.index(col) + 1, value)
+    else:
+        backend.sheets[sheet][row - 1][header.index(col)] = value  # edit tanpa modifiedTime baru
+
+# ------------------- DIGEST + CACHE BULAN -------------------
+def test_matching_sheet_has_no_issues_and_reuses_month_cache(backend):
+    sheet_with(backend, ORDERS)
+    src = source("Order", lambda: pd.DataFrame(ORDERS))
+    res = reconcile_source(src)
+    assert res["bulan"] == 2 and res["beda"] == [] and res["issues"] == []
+    reads = backend.calls.get("batch_get", 0)
+    assert reconcile_source(src)["issues"] == []
+    assert backend.calls.get("batch_get", 0) == reads  # sheet tidak berubah → tidak diunduh ulang
+
+def test_direct_edit_in_old_month_is_detected_after_cache(backend):
+    sheet_with(backend, ORDERS)
+    src = source("Order", lambda: pd.DataFrame(ORDERS))
+    assert reconcile_source(src)["issues"] == []
+    set_cell(backend, "Order", 2, "Total", 99000)  # Januari, jauh sebelum bulan terakhir
+    res = reconcile_source(src)
+    assert res["beda"] == ["2026-01"]
+    assert [(it["Masalah"], it["Kunci"]) for it in res["issues"]] == [(BEDA, "TRX/0000001")]
+    assert "Total" in res["issues"][0]["Detail"]
+
+def test_fresh_check_ignores_month_cache(backend):
+    sheet_with(backend, ORDERS)
+    src = source("Order", lambda: pd.DataFrame(ORDERS))
+    assert reconcile_source(src)["issues"] == []
+    set_cell(backend, "Order", 3, "Nama Pelanggan", "Diedit", touch=False)
+    assert reconcile_source(src)["issues"] == []
+    res = reconcile_source(src, fresh=True)
+    assert [(it["Masalah"], it["Kunci"]) for it in res["issues"]] == [(BEDA, "TRX/0000002")]
+
+# ------------------- HAPUS GANDA -------------------
+def test_repair_deletes_verified_duplicates(backend, monkeypatch):
+    sheet_with(backend, [ORDERS[0], ORDERS[0], ORDERS[1]])
+    src = source("Order", lambda: pd.DataFrame(ORDERS[:2]))
+    monkeypatch.setattr(Reconcile, "LOCAL_SOURCES", [src])
+    res = reconcile_source(src)
+    assert [(it["Masalah"], it["_rows"]) for it in res["issues"]] == [(GANDA, [3])]
+    done = repair(res, fix_missing=False, fix_duplicates=True)
+    assert done["dihapus"] == 1 and done["cek_akhir"]
+    assert [r["No Nota"] for r in rows(backend, "Order")] == ["TRX/0000001", "TRX/0000002"]
+
+@pytest.mark.parametrize("hapus_baris", [2, 3])
+def test_repair_aborts_when_sheet_moved(backend, monkeypatch, hapus_baris):
+    sheet_with(backend, [ORDERS[0], ORDERS[0], ORDERS[1]])
+    src = source("Order", lambda: pd.DataFrame(ORDERS[:2]))
+    monkeypatch.setattr(Reconcile, "LOCAL_SOURCES", [src])
+    res = reconcile_source(src)
+    # admin lain menghapus salah satu salinan sesudah cek → nomor baris lama tidak berlaku
+    FakeWorksheet(backend, "Order").delete_rows(hapus_baris)
+    with pytest.raises(SheetMoved):
+        repair(res, fix_missing=False, fix_duplicates=True)
+    assert [r["No Nota"] for r in rows(backend, "Order")] == ["TRX/0000001", "TRX/0000002"]
+
+def test_repair_deletes_keyless_duplicates_keeping_local_count(backend, monkeypatch):
+    data = [pengeluaran("Sabun"), pengeluaran("Sabun"), pengeluaran("Sabun"), pengeluaran("Plastik")]
+    sheet_with(backend, data, "Pengeluaran")
+    src = source("Pengeluaran", lambda: pd.DataFrame([pengeluaran("Sabun"), pengeluaran("Sabun"), pengeluaran("Plastik")]))
+    monkeypatch.setattr(Reconcile, "LOCAL_SOURCES", [src])
+    res = reconcile_source(src)
+    assert [(it["Masalah"], it["_rows"], it["_keep"]) for it in res["issues"]] == [(GANDA, [4], 2)]
+    assert repair(res, fix_missing=False)["dihapus"] == 1
+    assert [r["Keterangan"] for r in rows(backend, "Pengeluaran")] == ["Sabun", "Sabun", "Plastik"]
+
+# ------------------- TULIS BARIS HILANG -------------------
+def test_repair_writes_missing_rows_through_storage(backend, monkeypatch):
+    storage = SheetsStorage()
+    monkeypatch.setattr(Reconcile, "get_storage", lambda: storage)
+    sheet_with(backend, [pengeluaran("Sabun")], "Pengeluaran")
+    ditandai = []
+    src = source("Pengeluaran", lambda: pd.DataFrame([pengeluaran("Sabun"), pengeluaran("Plastik")]), on_written=ditandai.extend)
+    monkeypatch.setattr(Reconcile, "LOCAL_SOURCES", [src])
+    res = reconcile_source(src)
+    assert [it["Masalah"] for it in res["issues"]] == [HILANG]
+    assert repair(res)["ditulis"] == 1 and ditandai == [1]
+    assert [r["Keterangan"] for r in rows(backend, "Pengeluaran")] == ["Sabun", "Plastik"]
+    assert reconcile_source(src)["issues"] == []
+
+def test_repair_in_sqlite_mode_resends_through_outbox(backend, monkeypatch, tmp_path):
+    local = SQLiteStorage(str(tmp_path / "x.db"), sheets=SheetsStorage())
+    monkeypatch.setattr(Reconcile, "get_storage", lambda: local)
+    local.append("Order", ORDERS[0])
+    local.append("Order", ORDERS[2])
+    rep = Replicator(local)
+    assert rep.flush() == 2
+    FakeWorksheet(backend, "Order").delete_rows(2)  # baris TRX/0000001 terhapus manual di sheet
+    src = source("Order", lambda: local.local_rows("Order"), name="SQLite utama Order", write=Reconcile._sqlite_resend)
+    monkeypatch.setattr(Reconcile, "LOCAL_SOURCES", [src])
+    res = reconcile_source(src)
+    assert [(it["Masalah"], it["Kunci"]) for it in res["issues"]] == [(HILANG, "TRX/0000001")]
+    assert repair(res)["ditulis"] == 1
+    assert rows(backend, "Order")[-1]["No Nota"] == "TRX/0000003"  # belum ditulis langsung: lewat outbox
+    assert len(local.read("Order")) == 2  # baris SQLite tidak digandakan
+    assert reconcile_source(src)["issues"] == []  # tulis tertunda tidak dilaporkan ulang
+    assert rep.flush() == 1
+    sheet = rows(backend, "Order")
+    assert sorted(r["No Nota"] for r in sheet) == ["TRX/0000001", "TRX/0000003"]
+    assert all(r[REPLICA_COL].startswith(local.instance) for r in sheet)
+    assert reconcile_source(src)["issues"] == []
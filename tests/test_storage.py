@@ -0,0 +1,178 @@
+# ===================== TEST_STORAGE.PY (next_nota, update_by_key, Replicator) =====================
+import threading
+import pytest
+import requests
+import Storage
+from Sheets import REPLICA_COL
+from Storage import SheetsStorage, SQLiteStorage, Replicator, MAX_TRIES
+
+def order(nota, **extra):
+    return {
+        "No Nota": nota, "Tanggal Masuk": "05/08/2026 - 09:30", "Estimasi Selesai": "07/08/2026 - 09:30",
+        "Nama Pelanggan": "Budi", "No HP": "081234", "Berat (Kg)": 2.5, "Harga per Kg": 7000,
+        "Subtotal": 17500, "Diskon": 0, "Total": 17500, "Status": "Belum Lunas", **extra,
+    }
+
+def pengeluaran(ket):
+    return {"Tanggal": "05/08/2026", "Keterangan": ket, "Nominal": 25000, "Jenis": "Operasional"}
+
+def rows(backend, sheet):
+    data = backend.sheets[sheet]
+    return [dict(zip(data[0], r)) for r in data[1:]]
+
+class FlakySheets(SheetsStorage):
+    """SheetsStorage yang bisa dibuat gagal: sebelum kirim, atau SESUDAH baris sampai (timeout)."""
+
+    def __init__(self):
+        self.fail_before = []   # exception yang dilempar sebelum append / update
+        self.fail_after = []    # exception yang dilempar sesudah append berhasil
+
+    def append(self, sheet, data, marker=None):
+        if self.fail_before:
+            raise self.fail_before.pop(0)
+        row = super().append(sheet, data, marker=marker)
+        if self.fail_after:
+            raise self.fail_after.pop(0)
+        return row
+
+    def update_by_key(self, sheet, key_col, key_val, updates):
+        if self.fail_before:
+            raise self.fail_before.pop(0)
+        return super().update_by_key(sheet, key_col, key_val, updates)
+
+@pytest.fixture
+def local(backend, tmp_path):
+    return SQLiteStorage(str(tmp_path / "x.db"), sheets=FlakySheets())
+
+# ------------------- next_nota -------------------
+def test_sheets_next_nota_continues_after_last_and_is_unique(backend):
+    backend.sheets["Order"].append(["TRX/0000007"])
+    storage = SheetsStorage()
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(storage.next_nota("Order", "TRX/"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(out) == [f"TRX/{n:07d}" for n in range(8, 16)]
+
+def test_sheets_next_nota_raises_when_sheet_unreadable(backend, monkeypatch):
+    backend.sheets["Order"].append(["TRX/0000007"])
+    def offline(sheet_name):
+        raise requests.ConnectionError("offline")
+    monkeypatch.setattr(Storage, "get_worksheet", offline)
+    with pytest.raises(requests.ConnectionError):
+        SheetsStorage().next_nota("Order", "TRX/")  # bukan diam-diam mulai dari TRX/0000001
+
+def test_sqlite_next_nota_uses_imported_rows_and_local_writes(backend, local):
+    backend.sheets["Order"].append(["TRX/0000041"])
+    assert local.next_nota("Order", "TRX/") == "TRX/0000042"
+    local.append("Order", order("TRX/0000050"))
+    assert local.next_nota("Order", "TRX/") == "TRX/0000051"
+    assert local.next_nota("Order", "TRX/") == "TRX/0000052"
+
+def test_sqlite_next_nota_refuses_without_initial_import(backend, local, monkeypatch):
+    def offline(sheet_name):
+        raise requests.ConnectionError("offline")
+    monkeypatch.setattr(Storage, "get_worksheet", offline)
+    with pytest.raises(ConnectionError):
+        local.next_nota("Order", "TRX/")
+
+# ------------------- update_by_key -------------------
+def test_sheets_update_by_key_writes_typed_raw(backend):
+    storage = SheetsStorage()
+    storage.append("Order", order("TRX/0000001"))
+    row = storage.update_by_key("Order", "No Nota", "TRX/0000001", {"Status": "Lunas", "Estimasi Selesai": "09/08/2026 - 10:00"})
+    assert row["Estimasi Selesai ISO"] == "2026-08-09T10:00"
+    (r,) = rows(backend, "Order")
+    assert r["Status"] == "Lunas" and r["Estimasi Selesai ISO"] == "2026-08-09T10:00"
+    assert r["Total"] == 17500  # angka tetap angka
+    with pytest.raises(ValueError):
+        storage.update_by_key("Order", "No Nota", "TRX/0000099", {"Status": "Lunas"})
+
+def test_sqlite_update_by_key_updates_row_and_queues_without_iso(backend, local):
+    local.append("Order", order("TRX/0000001"))
+    row = local.update_by_key("Order", "No Nota", "TRX/0000001", {"Estimasi Selesai": "09/08/2026 - 10:00"})
+    assert row["Estimasi Selesai ISO"] == "2026-08-09T10:00"
+    df = local.read("Order")
+    assert df.loc[0, "Estimasi Selesai"] == "09/08/2026 - 10:00"
+    update = [e for e in local.pending() if e["op"] == "update"]
+    assert update[0]["data"] == {"Estimasi Selesai": "09/08/2026 - 10:00"}
+    with pytest.raises(ValueError):
+        local.update_by_key("Order", "No Nota", "TRX/0000099", {"Status": "Lunas"})
+    with pytest.raises(ValueError):
+        local.update_by_key("Order", "No Nota", "TRX/0000001", {"Kolom Asing": "x"})
+
+# ------------------- Replicator -------------------
+def test_replicator_sends_in_order_with_marker(backend, local):
+    local.append("Order", order("TRX/0000001"))
+    local.update_by_key("Order", "No Nota", "TRX/0000001", {"Status": "Lunas"})
+    assert Replicator(local).flush() == 2
+    (r,) = rows(backend, "Order")
+    assert r["Status"] == "Lunas" and r[REPLICA_COL].startswith(local.instance)
+    assert local.outbox_status()["antri"] == 0
+
+def test_replicator_crash_after_append_does_not_duplicate(backend, local, monkeypatch):
+    local.append("Order", order("TRX/0000001"))
+    mark_done = local.mark_done
+    def crash(oid):
+        raise SystemExit("proses mati sebelum mark_done")
+    monkeypatch.setattr(local, "mark_done", crash)
+    rep = Replicator(local)
+    with pytest.raises(SystemExit):
+        rep.flush()
+    monkeypatch.setattr(local, "mark_done", mark_done)
+    restart = Replicator(local)
+    restart.owner = rep.owner  # lease proses lama dianggap sudah habis
+    assert restart.flush() == 1
+    assert len(rows(backend, "Order")) == 1
+
+def test_replicator_timeout_after_keyless_append_does_not_duplicate(backend, local):
+    local.append("Pengeluaran", pengeluaran("Sabun"))
+    local.sheets.fail_after.append(requests.Timeout("timeout sesudah tulis"))
+    rep = Replicator(local)
+    assert rep.flush() is False
+    assert rep.flush() == 1
+    assert [r["Keterangan"] for r in rows(backend, "Pengeluaran")] == ["Sabun"]
+
+def test_replicator_transient_errors_keep_order_and_never_dead_letter(backend, local):
+    local.append("Pengeluaran", pengeluaran("Sabun"))
+    local.append("Pengeluaran", pengeluaran("Plastik"))
+    local.sheets.fail_before.extend(requests.ConnectionError("offline") for _ in range(MAX_TRIES + 2))
+    rep = Replicator(local)
+    for _ in range(MAX_TRIES + 2):
+        assert rep.flush() is False
+    assert local.outbox_status()["mati"] == 0 and rows(backend, "Pengeluaran") == []
+    assert rep.flush() == 2
+    assert [r["Keterangan"] for r in rows(backend, "Pengeluaran")] == ["Sabun", "Plastik"]
+
+def test_replicator_dead_letters_permanent_failure_and_moves_on(backend, local):
+    local.append("Order", order("TRX/0000001"))
+    local.update_by_key("Order", "No Nota", "TRX/0000001", {"Status": "Lunas"})
+    local.append("Pengeluaran", pengeluaran("Sabun"))
+    local.sheets.fail_before.extend(ValueError("header rusak") for _ in range(MAX_TRIES))
+    rep = Replicator(local)
+    for _ in range(MAX_TRIES - 1):
+        assert rep.flush() is False
+    assert rep.flush() == 1  # append Order mati; update nota yang sama ditahan; Pengeluaran jalan
+    assert rows(backend, "Order") == []
+    assert [r["Keterangan"] for r in rows(backend, "Pengeluaran")] == ["Sabun"]
+    s = local.outbox_status()
+    assert s["mati"] == 1 and s["antri"] == 1
+    assert list(local.dead_letters()["op"]) == ["append"]
+
+    assert local.retry_dead() == 1
+    assert rep.flush() == 2
+    (r,) = rows(backend, "Order")
+    assert r["Status"] == "Lunas"
+    assert local.outbox_status()["antri"] == 0
+
+# ------------------- read_rows (paging Pelanggan) -------------------
+@pytest.mark.parametrize("mode", ["sheets", "sqlite"])
+def test_read_rows_returns_requested_row_numbers_in_order(backend, local, mode):
+    storage = SheetsStorage() if mode == "sheets" else local
+    for n in range(1, 5):
+        storage.append("Order", order(f"TRX/{n:07d}"))
+    df = storage.read_rows("Order", [4, 2, 9])
+    assert list(df["No Nota"].fillna("")) == ["TRX/0000003", "TRX/0000001", ""]
+    assert list(df["Total"].iloc[:2]) == [17500, 17500]